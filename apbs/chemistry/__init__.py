@@ -1,4 +1,4 @@
 from .atom import Atom  # noqa F401
 from .atom_list import AtomList  # noqa F401
-from .cell_list import CellList  # noqa F401
-from .atom_complex_calc import AtomComplexCalc  # noqa F401
+from .cell_list import CellList, DomainMode  # noqa F401
+from .atom_complex_calc import AtomComplexCalc, AccessibilityFlag  # noqa F401
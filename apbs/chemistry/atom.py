@@ -3,6 +3,32 @@ import numpy as np
 from apbs.geometry import Coordinate
 
 
+class _Field:
+    """
+    Attribute of an Atom: kept on the atom itself until the atom belongs
+    to an AtomList, after which it reads and writes the list's column.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, atom, owner=None):
+        if atom is None:
+            return self
+        if atom._list is None:
+            try:
+                return atom._row[self.name]
+            except KeyError:
+                raise AttributeError(self.name) from None
+        return atom._list._get(self.name, atom._index)
+
+    def __set__(self, atom, value) -> None:
+        if atom._list is None:
+            atom._row[self.name] = value
+        else:
+            atom._list._set(self.name, atom._index, value)
+
+
 class Atom:
     """
     Attributes:
@@ -14,8 +40,27 @@ class Atom:
             assigned based on the index of the atom in a Valist atom array
         res_name (str): Residue name from PDB/PQR file
         name (str): Atom name from PDB/PDR file
+
+    An Atom stored in an AtomList is a view of one row of the list's
+    columns: reading an attribute reads the column and assigning one
+    writes it back. ``position`` is returned as a new Coordinate, so
+    assign the whole position (or x, y or z) rather than changing the
+    returned Coordinate in place.
     """
 
+    field_name = _Field("field_name")
+    atom_number = _Field("atom_number")
+    atom_name = _Field("atom_name")
+    residue_name = _Field("residue_name")
+    chain_id = _Field("chain_id")
+    residue_number = _Field("residue_number")
+    ins_code = _Field("ins_code")
+    position = _Field("position")
+    charge = _Field("charge")
+    radius = _Field("radius")
+    epsilon = _Field("epsilon")
+    id = _Field("id")
+
     def __init__(self, *args, **kwargs):
         """
         Arguments:
@@ -57,6 +102,9 @@ class Atom:
                 )
         """
 
+        self._list = None
+        self._index = None
+        self._row = {}
         if len(args) > 0:
             self.position = Coordinate(args[0], args[1], args[2])
 
@@ -111,24 +159,55 @@ class Atom:
         :rtype: float
         """
         if isinstance(other, Atom):
-            return np.sum((self.position._data - other.position._data) ** 2)
-        if isinstance(other, Coordinate):
-            return np.sum((self.position._data - other._data) ** 2)
-        elif isinstance(other, np.ndarray):
-            # TODO: Figure out how to apply
-            # https://numpy.org/doc/stable/reference/generated/numpy.dot.html
-            return np.sum((self.position._data - other) ** 2)
-        else:
+            other = other._xyz()
+        elif isinstance(other, Coordinate):
+            other = np.asarray(other._data, dtype=np.float64)
+        elif not isinstance(other, np.ndarray):
             raise TypeError
+        # TODO: Figure out how to apply
+        # https://numpy.org/doc/stable/reference/generated/numpy.dot.html
+        return np.sum((self._xyz() - other) ** 2)
+
+    def _xyz(self) -> np.ndarray:
+        """Position as a float64 array"""
+        if self._list is None:
+            return np.asarray(self.position._data, dtype=np.float64)
+        return self._list.positions[self._index]
+
+    @classmethod
+    def _view(cls, atoms, index: int) -> "Atom":
+        """Atom reading and writing row ``index`` of an AtomList"""
+        atom = cls.__new__(cls)
+        atom._list = atoms
+        atom._index = index
+        atom._row = None
+        return atom
 
     @property
     def x(self) -> float:
         return self.position.x
 
+    @x.setter
+    def x(self, value: float) -> None:
+        self._set_axis(0, value)
+
     @property
     def y(self) -> float:
         return self.position.y
 
+    @y.setter
+    def y(self, value: float) -> None:
+        self._set_axis(1, value)
+
     @property
     def z(self) -> float:
         return self.position.z
+
+    @z.setter
+    def z(self, value: float) -> None:
+        self._set_axis(2, value)
+
+    def _set_axis(self, axis: int, value: float) -> None:
+        position = self.position
+        position[axis] = value
+        self.position = position
@@ -1,9 +1,12 @@
 import numpy as np
 import sys  # noqa
+from typing import Iterator, Tuple, Union
 
 from apbs.geometry import (
     Coordinate,
+    CoordinateArray,
     Surface,
+    Sphere,
     Constants,
 )
 
@@ -12,10 +15,44 @@ from . import (
     AtomList,
     CellList,
 )
+from .cell_list import CLIST_INFLATE, MAX_HASH_DIM, MIN_HASH_DIM
+
+# Number of points tested against the cell list at once
+QUERY_POINTS = 1 << 16
+
+# Number of SASA probe point-neighbor tests made at once
+SASA_POINTS = 1 << 20
+
+
+class AccessibilityFlag:
+    """Enum class to select a Vacc characteristic function"""
+
+    # Vacc_vdwAcc: outside the van der Waals spheres
+    VanDerWaals = 0
+    # Vacc_ivdwAcc: outside the spheres inflated by the probe radius
+    InflatedVanDerWaals = 1
+    # Vacc_molAcc: outside the molecular surface
+    Molecular = 2
+    # Vacc_fastMolAcc: outside the molecular surface, for points already
+    # known to be between the van der Waals and inflated surfaces
+    FastMolecular = 3
+
+
+def _as_points(points) -> np.ndarray:
+    """(M, 3) float64 array of a Coordinate, CoordinateArray or array"""
+    if isinstance(points, Coordinate):
+        return np.array([[points.x, points.y, points.z]], dtype=np.float64)
+    return np.asarray(points, dtype=np.float64).reshape(-1, 3)
 
 
 class AtomComplexCalc:
-    """Port of Vacc."""
+    """Port of Vacc.
+
+    The characteristic functions take an (M, 3) array (or a
+    CoordinateArray) of points and return an (M,) array with 1.0 where
+    the point is accessible and 0.0 where it is not, testing each point
+    only against the atoms of its cell in the cell list.
+    """
 
     def __init__(
         self, alist: AtomList, clist: CellList, surface_density: float
@@ -33,100 +70,464 @@ class AtomComplexCalc:
         self.surface_density = surface_density
         max_radius = alist.max_radius + clist.max_radius
         max_area = 4.0 * (max_radius ** 2) * np.pi
-        nsphere = np.ceil(max_area * surface_density)  # noqa: F841
+        nsphere = int(np.ceil(max_area * surface_density))
 
-        # TODO: calculate reference shpere (see VaccSurf_refSphere)
+        self.ref_sphere = Sphere.spherical_distribution(nsphere)
+        self._dp = {}
 
     @property
     def stride(self) -> Coordinate:
         return self.clist.stride
 
+    def _check_radius(self, radius: float) -> None:
+        if radius > self.clist.max_radius:
+            raise RuntimeError(
+                f"Got radius {radius} greater than max radius "
+                f"{self.clist.max_radius} from cell list."
+            )
+
+    def _chunks(self, count: int) -> Iterator[slice]:
+        for start in range(0, count, QUERY_POINTS):
+            yield slice(start, min(start + QUERY_POINTS, count))
+
+    def _overlaps(
+        self,
+        points: np.ndarray,
+        radius: float,
+        exclude: Union[int, np.ndarray, None] = None,
+    ) -> np.ndarray:
+        """Which points lie within ``radius`` of an atom's vdW sphere
+
+        :param points: (M, 3) array of points
+        :param radius: Probe radius added to the atomic radii
+        :param exclude: ID of an atom to ignore, or an (M,) array with one
+                        ID per point
+        :returns: (M,) boolean array, True where an atom of the point's cell
+                  is closer than its radius plus ``radius``
+        """
+        positions = self.alist.positions
+        radii = self.alist.radii
+        ids = self.alist.ids
+        out = np.zeros(len(points), dtype=bool)
+        for chunk in self._chunks(len(points)):
+            pts = points[chunk]
+            offsets, atoms = self.clist.candidates(pts)
+            owner = np.repeat(np.arange(len(pts)), np.diff(offsets))
+            diff = pts[owner] - positions[atoms]
+            dist2 = np.einsum("ij,ij->i", diff, diff)
+            hit = dist2 < (radii[atoms] + radius) ** 2
+            if np.isscalar(exclude):
+                hit &= ids[atoms] != exclude
+            elif exclude is not None:
+                hit &= ids[atoms] != exclude[chunk][owner]
+            out[chunk] = np.bincount(owner[hit], minlength=len(pts)) > 0
+        return out
+
+    def vdw_acc(self, points) -> np.ndarray:
+        """Van der Waals accessibility of many points
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :returns: (M,) array, 1.0 outside every atom's vdW sphere, else 0.0
+
+        .. note:: port of Vacc::vdwAcc
+        """
+        return (~self._overlaps(_as_points(points), 0.0)).astype(np.float64)
+
+    def ivdw_acc(self, points, radius: float) -> np.ndarray:
+        """Inflated van der Waals accessibility of many points
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :param radius: Probe radius, at most the cell list max radius
+        :returns: (M,) array, 1.0 outside every atom's sphere inflated by
+                  the probe radius, else 0.0
+
+        .. note:: port of Vacc::ivdwAcc
+        """
+        self._check_radius(radius)
+        return (~self._overlaps(_as_points(points), radius)).astype(
+            np.float64
+        )
+
+    def mol_acc(self, points, radius: float) -> np.ndarray:
+        """Molecular accessibility of many points
+
+        Points outside the inflated surface are accessible and points
+        inside the vdW surface are not; only those in between are tested
+        against the solvent accessible surface points.
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :param radius: Probe radius, at most the cell list max radius
+        :returns: (M,) array, 1.0 outside the molecular surface, else 0.0
+
+        .. note:: port of Vacc::molAcc
+        """
+        points = _as_points(points)
+        acc = self.ivdw_acc(points, radius)
+        rest = np.flatnonzero(acc == 0.0)
+        between = rest[~self._overlaps(points[rest], 0.0)]
+        acc[between] = self.fast_mol_acc(points[between], radius)
+        return acc
+
+    def fast_mol_acc(self, points, radius: float) -> np.ndarray:
+        """Molecular accessibility of points known to be between the vdW
+        and inflated vdW surfaces
+
+        A point is accessible when it is within a probe radius of a
+        solvent accessible surface point of an atom of its cell.
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :param radius: Probe radius, at most the cell list max radius
+        :returns: (M,) array, 1.0 outside the molecular surface, else 0.0
+
+        .. note:: port of Vacc::fastMolAcc
+        """
+        points = _as_points(points)
+        surf_start, surf_points = self._surface_points(radius)
+        positions = self.alist.positions
+        out = np.zeros(len(points))
+        for chunk in self._chunks(len(points)):
+            pts = points[chunk]
+            found = self.clist.cell_index(pts) < 0
+            offsets, atoms = self.clist.candidates(pts)
+            owner = np.repeat(np.arange(len(pts)), np.diff(offsets))
+            # The surface points of an atom lie on its inflated sphere, so
+            # only atoms whose sphere passes within a probe radius of the
+            # point can have one close enough
+            diff = pts[owner] - positions[atoms]
+            dist = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+            rad = self.alist.radii[atoms] + radius
+            shell = np.abs(dist - rad) < radius
+            atoms, owner = atoms[shell], owner[shell]
+
+            # Test the points near each atom against all of its surface
+            # points at once: |v - w| < radius, with v and w relative to
+            # the atom center and |w| = rad, is 2 v.w > |v|^2 + rad^2 - r^2
+            order = np.argsort(atoms, kind="stable")
+            atoms, owner = atoms[order], owner[order]
+            bounds = np.flatnonzero(np.diff(atoms)) + 1
+            for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(atoms)]):
+                atom = atoms[lo]
+                surf = surf_points[surf_start[atom]:(surf_start[atom + 1])]
+                if not len(surf):
+                    continue
+                near = owner[lo:hi]
+                v = pts[near] - positions[atom]
+                w = surf - positions[atom]
+                rad2 = (self.alist.radii[atom] + radius) ** 2
+                limit = np.einsum("ij,ij->i", v, v) + rad2 - radius * radius
+                found[near] |= 2.0 * (v @ w.T).max(axis=1) > limit
+            # Points off the cell list grid are accessible (the C code
+            # reports these as unexpected)
+            out[chunk] = found
+        return out
+
+    def accessibility(
+        self, points, flag: int, radius: float = 0.0
+    ) -> np.ndarray:
+        """Evaluate a characteristic function selected by flag
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :param flag: AccessibilityFlag of the function
+        :param radius: Probe radius (unused for VanDerWaals)
+        :returns: (M,) array of 1.0 (accessible) and 0.0 values
+        """
+        if flag == AccessibilityFlag.VanDerWaals:
+            return self.vdw_acc(points)
+        if flag == AccessibilityFlag.InflatedVanDerWaals:
+            return self.ivdw_acc(points, radius)
+        if flag == AccessibilityFlag.Molecular:
+            return self.mol_acc(points, radius)
+        if flag == AccessibilityFlag.FastMolecular:
+            return self.fast_mol_acc(points, radius)
+        raise ValueError(f"Invalid accessibility flag {flag}")
+
+    def grid_accessibility(
+        self, dims, spaces, mins, flag: int, radius: float = 0.0
+    ) -> np.ndarray:
+        """Evaluate a characteristic function at every node of a lattice
+
+        Builds, e.g., the dielectric (Molecular with the solvent radius) or
+        ion accessibility (InflatedVanDerWaals with the ion radius) mask of
+        a grid. The nodes are evaluated a few x-planes at a time.
+
+        :param dims: Number of grid points in each direction
+        :param spaces: Grid spacing in each direction
+        :param mins: Grid lower corner
+        :param flag: AccessibilityFlag of the function
+        :param radius: Probe radius
+        :returns: (nx, ny, nz) array of 1.0 (accessible) and 0.0 values
+        """
+        nx, ny, nz = (int(n) for n in dims)
+        axes = [
+            float(lo) + float(h) * np.arange(n)
+            for n, h, lo in zip((nx, ny, nz), spaces, mins)
+        ]
+        plane = np.stack(
+            np.meshgrid(axes[1], axes[2], indexing="ij"), axis=-1
+        ).reshape(-1, 2)
+        step = max(1, QUERY_POINTS // max(1, len(plane)))
+        out = np.empty((nx, ny, nz))
+        for start in range(0, nx, step):
+            xs = axes[0][start:(start + step)]
+            points = np.empty((len(xs), len(plane), 3))
+            points[:, :, 0] = xs[:, np.newaxis]
+            points[:, :, 1:] = plane
+            values = self.accessibility(points, flag, radius)
+            out[start:(start + len(xs))] = values.reshape(len(xs), ny, nz)
+        return out
+
     def accessible_outside_inflated_vdw_radius(
         self, center: Coordinate, radius: float, atom_id_to_ignore: int
     ) -> bool:
         """
-        Determines if a point is within the union of the spheres centered
+        Determines if a point is outside the union of the spheres centered
         at the atomic centers with radii equal to the sum of their van der
         Waals radii and the probe radius.  Does not include contributions
         from the specified atom.
 
-        :returns: None if not found
+        :param center: Position to test
+        :param radius: Probe radius, at most the cell list max radius
+        :param atom_id_to_ignore: ID of the atom to leave out
+        :returns: True if the point is accessible
 
         .. note:: port of Vacc::ivdwAccExclus
         """
-        if radius > self.clist.max_radius:
-            raise RuntimeError(
-                f"Got radius {radius} greater than max radius "
-                f"{self.clist.max_radius} from cell list."
+        self._check_radius(radius)
+        return not self._overlaps(
+            _as_points(center), radius, atom_id_to_ignore
+        )[0]
+
+    def _surface_points(self, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Solvent accessible surface points of all atoms for a probe radius
+
+        :returns: tuple of (N + 1,) offsets and the surface points: those
+                  of atom i are ``points[offsets[i]:offsets[i + 1]]``
+        """
+        offsets, points, _ = self._surface(radius)
+        return offsets, points
+
+    def _surface(
+        self, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Solvent accessible surface of all atoms for a probe radius
+
+        Built on first use and rebuilt when the probe radius changes, as
+        Vacc::SASA does.
+
+        :returns: tuple of (N + 1,) offsets, the surface points (as in
+                  :meth:`_surface_points`) and the (N,) atomic areas
+        """
+        cached = self._dp.get("surf")
+        if cached is None or cached[0] != radius:
+            cached = self._dp["surf"] = (radius,) + self._build_surface(
+                radius
             )
+        return cached[1:]
+
+    def _atom_pairs(
+        self, atoms: np.ndarray, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Atoms whose spheres, inflated by radius, overlap those of others
+
+        Found with a coarse cell list whose probe reaches the largest
+        inflated sphere.
+
+        :param atoms: Sorted indices of the atoms to look around
+        :param radius: Probe radius added to the atomic radii
+        :returns: tuple of the (len(atoms) + 1,) offsets and the other
+                  atoms, in the layout of :meth:`CellList.candidates` (atoms
+                  with the same ID are left out)
+        """
+        alist = self.alist
+        reach = alist.max_radius + 2.0 * radius
+        spacing = alist.max_radius + radius
+        extent = np.ptp(alist.positions, axis=0) + 2.0 * CLIST_INFLATE * (
+            alist.max_radius + reach
+        )
+        npts = np.clip(
+            (extent / spacing).astype(int), MIN_HASH_DIM, MAX_HASH_DIM
+        )
+        coarse = CellList(alist, reach, npts)
+        offsets, others = coarse.neighbors(alist.positions[atoms], reach)
+        owner = np.repeat(np.arange(len(atoms)), np.diff(offsets))
+        rad = alist.radii + radius
+        diff = alist.positions[others] - alist.positions[atoms[owner]]
+        dist2 = np.einsum("ij,ij->i", diff, diff)
+        keep = (dist2 < (rad[others] + rad[atoms[owner]]) ** 2) & (
+            alist.ids[others] != alist.ids[atoms[owner]]
+        )
+        counts = np.bincount(owner[keep], minlength=len(atoms))
+        offsets = np.zeros(len(atoms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets, others[keep]
 
-        c = (center - self.lower_corner) / self.stride
+    def _build_surface(
+        self, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vacc::atomSurf for every atom, as batched queries
 
-        # Get cell and ensure exists in the cell list
-        for i in range(3):
-            if c[i] < 0 or c[i] >= self.npoints[i]:
-                # Could not find the cell within the constraints of the cell
-                # list
-                return False
+        The reference sphere, scaled and moved onto each atom, gives the
+        probe points of all atoms. Each atom's points are tested against
+        all of its overlapping neighbors at once, SASA_POINTS tests at a
+        time; points off the cell list grid stay on the surface, as in
+        Vacc::ivdwAccExclus.
+        """
+        self._check_radius(radius)
+        ref = self.ref_sphere.points.data
+        nref = len(ref)
+        positions = self.alist.positions
+        rad = self.alist.radii + radius
+        counts = np.zeros(len(self.alist), dtype=np.int64)
+        pieces = [np.zeros((0, 3))]
+        # Zero-radius atoms do not contribute
+        atoms = np.flatnonzero(self.alist.radii >= Constants.very_small_eps)
+        if nref and len(atoms):
+            pair_start, others = self._atom_pairs(atoms, radius)
+            npairs = np.diff(pair_start)
+            # Split the atoms so that each group has about SASA_POINTS
+            # point-neighbor tests
+            work = np.cumsum(np.maximum(npairs, 1)) * nref
+            cuts = np.searchsorted(
+                work, np.arange(SASA_POINTS, work[-1], SASA_POINTS)
+            )
+            groups = np.split(np.arange(len(atoms)), np.unique(cuts))
+        else:
+            groups = []
 
-        for atom in self.clist:
-            if atom.id == atom_id_to_ignore:
+        for group in groups:
+            if not len(group):
                 continue
+            lo, hi = pair_start[group[0]], pair_start[group[-1] + 1]
+            buried = np.zeros((len(group), nref), dtype=bool)
+            if hi > lo:
+                # A point c_i + rad_i u is inside the inflated sphere of
+                # atom j when 2 rad_i u.w > rad_i^2 + |w|^2 - rad_j^2,
+                # with w = c_j - c_i
+                owner = atoms[np.repeat(group, npairs[group])]
+                other = others[lo:hi]
+                w = positions[other] - positions[owner]
+                limit = (
+                    rad[owner] ** 2
+                    + np.einsum("ij,ij->i", w, w)
+                    - rad[other] ** 2
+                )
+                scaled = 2.0 * rad[owner, np.newaxis] * w
+                hit = scaled @ ref.T > limit[:, np.newaxis]
+                has = npairs[group] > 0
+                buried[has] = np.logical_or.reduceat(
+                    hit, pair_start[group][has] - lo, axis=0
+                )
+            members = atoms[group]
+            points = (
+                positions[members, np.newaxis, :]
+                + rad[members, np.newaxis, np.newaxis] * ref
+            ).reshape(-1, 3)
+            on_surf = ~buried.ravel() | (self.clist.cell_index(points) < 0)
+            counts[members] = on_surf.reshape(len(group), nref).sum(axis=1)
+            pieces.append(points[on_surf])
+
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        areas = np.zeros(len(counts))
+        if nref:
+            areas = 4.0 * np.pi * rad * rad * counts / float(nref)
+        return offsets, np.concatenate(pieces), areas
+
+    def _atom_index(self, atom: Union[Atom, int]) -> int:
+        """Row of an atom (or an index) in the atom list"""
+        if isinstance(atom, Atom):
+            if atom._list is self.alist:
+                return atom._index
+            matches = np.flatnonzero(self.alist.ids == atom.id)
+            if not len(matches):
+                raise ValueError(f"Atom {atom.id} is not in the atom list")
+            return int(matches[0])
+        return int(atom)
+
+    def total_sasa(self, radius: float) -> float:
+        """Solvent accessible surface area of the whole molecule
+
+        :param radius: Probe radius, at most the cell list max radius
+        :returns: The area in A^2
+
+        .. note:: port of Vacc::SASA and Vacc::totalSASA
+        """
+        return float(self._surface(radius)[2].sum())
+
+    def atom_sasa(
+        self, radius: float, atom: Union[Atom, int, None] = None
+    ) -> Union[float, np.ndarray]:
+        """Solvent accessible surface area of one atom or of each atom
+
+        :param radius: Probe radius, at most the cell list max radius
+        :param atom: The Atom (or its index in the atom list); default all
+        :returns: The area of the atom, or an (N,) array of every atom's
+
+        .. note:: port of Vacc::atomSASA
+        """
+        areas = self._surface(radius)[2]
+        if atom is None:
+            return areas.copy()
+        return float(areas[self._atom_index(atom)])
 
-            if atom.euclidian_dist(center) > (atom.radius + radius) ** 2:
-                return True
+    def atom_sas_points(
+        self, radius: float, atom: Union[Atom, int]
+    ) -> Surface:
+        """Solvent accessible surface points of one atom
 
-        return False
+        :param radius: Probe radius, at most the cell list max radius
+        :param atom: The Atom (or its index in the atom list)
+        :returns: The atom's surface
 
-    def atom_surface(self, atom: Atom, ref: Surface, prad: float) -> Surface:
+        .. note:: port of Vacc::atomSASPoints
+        """
+        offsets, points, areas = self._surface(radius)
+        idx = self._atom_index(atom)
+        points = points[offsets[idx]:(offsets[idx + 1])]
+        surf = Surface(
+            radius,
+            len(points),
+            CoordinateArray(points),
+            np.ones(len(points), dtype=bool),
+        )
+        surf.area = float(areas[idx])
+        return surf
+
+    def atom_surface(
+        self, atom: Atom, ref: Surface, prad: float
+    ) -> Surface:
         """Create a new surface from the points that do fall on the reference
         surface.
 
         :param Atom atom: Atom from which surface will be constructed.
         :param Surface ref: The reference surface.
-        :param float prad: The previous radius
+        :param float prad: The probe radius
         :return: Returns surface generated from the atom.
         :rtype: Surface
 
-        .. note:: Although this seems like a candidate for a static method, the
-        `accessable_outside_inflated_venderwalls_rad` method of this class
-        *is* called from this function, and therefore must be a regular method.
-
+        .. note:: port of Vacc::atomSurf; all the reference points are
+        tested at once, leaving out the atom itself.
         """
 
         arad = atom.radius
-        apos = atom.position
-        atom_id = atom.id
-        surf: Surface
-
         if arad < Constants.very_small_eps:
             return Surface(prad, 0)
+        self._check_radius(prad)
 
         rad = arad + prad
+        apos = atom.position
+        points = ref.points * rad + apos
+        on_surf = ~self._overlaps(points.data, prad, atom.id)
+        npoints = int(on_surf.sum())
 
-        # Possibly merge these two loops?
-        npoints = 0
-        pos = Coordinate()
-        for idx in range(ref.npoints):
-            pos.x = rad(ref.xs[idx]) + apos.x
-            pos.y = rad(ref.ys[idx]) + apos.y
-            pos.z = rad(ref.zs[idx]) + apos.z
-
-            # need to implement
-            if self.accessible_outside_inflated_vdw_radius(pos, prad, atom_id):
-                npoints += 1
-                ref.is_on_surf[idx] = True
-            else:
-                ref.is_on_surf[idx] = False
-
-        surf = Surface(prad, npoints)
-        for idx in range(ref.npoints):
-            if ref.coords[idx].is_on_surf:
-                surf.coords.append((rad * ref.coords[idx] + apos))
-                surf.coords[-1].is_on_surf = True
-
+        surf = Surface(
+            prad,
+            npoints,
+            points[on_surf],
+            np.ones(npoints, dtype=bool),
+        )
         surf.area = (
-            4.0 * np.pi * rad * rad * float(surf.npoints) / float(ref.npoints)
+            4.0 * np.pi * rad * rad * float(npoints) / float(ref.npoints)
         )
 
         return surf
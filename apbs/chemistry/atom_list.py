@@ -1,41 +1,327 @@
 import numpy as np
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
 from . import Atom
-from apbs.geometry import Coordinate
+from apbs.geometry import Coordinate, CoordinateArray
+
+# Numeric per-atom columns and their types
+NUMERIC_COLUMNS = {
+    "charge": np.float64,
+    "radius": np.float64,
+    "epsilon": np.float64,
+    "id": np.int64,
+    "atom_number": np.int32,
+    "residue_number": np.int32,
+}
+
+# String per-atom columns, stored as integer codes into a table of the
+# distinct values (None is a value like any other)
+CODED_COLUMNS = (
+    "field_name",
+    "atom_name",
+    "residue_name",
+    "chain_id",
+    "ins_code",
+)
+
+# Initial number of rows allocated when atoms are appended one at a time
+_MIN_CAPACITY = 16
 
 
 class AtomList:
     """
-    Thin abstraction over a container of atoms.
+    Container of atoms stored as one array per attribute.
+
+    Positions are an (N, 3) float64 array and every other attribute is an
+    (N,) column, so vectorized code can work on the columns directly
+    while indexing or iterating the list still gives :class:`Atom` objects
+    (views of one row each). String attributes such as residue and atom
+    names are stored as int32 codes into a per-column table of the
+    distinct values.
 
     Attributes:
+        positions (np.ndarray): (N, 3) atomic positions
+        coordinates (CoordinateArray): the positions as a batch of points
+        charges (np.ndarray): (N,) atomic charges
+        radii (np.ndarray): (N,) atomic radii
+        epsilons (np.ndarray): (N,) epsilon values for WCA calculations
+        ids (np.ndarray): (N,) atomic IDs
         dp (dict): dict for dynamic programming of values that may not need to
                 be re-calculated
+
+    .. note:: Cached values (bounds, maximum radius) are dropped whenever
+              the list is changed through its methods or its Atoms, but not
+              when the column arrays are written directly; call
+              :meth:`modified` after doing so.
     """
 
     def __init__(self, atoms: List = None):
         """
         Construct a list of Atoms.
 
+        Standalone atoms in ``atoms`` become views of the new list.
+
         :param List atoms: A list of Atoms
         """
-        self._atoms: List[Atom] = atoms if atoms is not None else []
         self.charge: float = None
         self.maxrad: float = None
-
-        self._center = Coordinate()
-        self._min_coord = Coordinate()
-        self._max_coord = Coordinate()
+        self._size = 0
+        self._positions = np.zeros((0, 3))
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.zeros(0, dtype=dtype)
+            for name, dtype in NUMERIC_COLUMNS.items()
+        }
+        self._codes: Dict[str, np.ndarray] = {
+            name: np.zeros(0, dtype=np.int32) for name in CODED_COLUMNS
+        }
+        self._categories: Dict[str, list] = {
+            name: [] for name in CODED_COLUMNS
+        }
+        self._lookup: Dict[str, dict] = {name: {} for name in CODED_COLUMNS}
         self._dp = {}
+        if atoms is not None:
+            self.extend(atoms)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        positions: np.ndarray,
+        charges: Optional[np.ndarray] = None,
+        radii: Optional[np.ndarray] = None,
+        epsilons: Optional[np.ndarray] = None,
+        ids: Optional[np.ndarray] = None,
+        **columns,
+    ) -> "AtomList":
+        """Build a list from whole columns
+
+        :param positions: (N, 3) atomic positions
+        :param charges: (N,) atomic charges (default: 0)
+        :param radii: (N,) atomic radii (default: 0)
+        :param epsilons: (N,) epsilon values (default: 0)
+        :param ids: (N,) atomic IDs (default: 1 to N)
+        :param columns: Other columns by attribute name: ``atom_number``,
+                        ``residue_number``, and sequences of strings for
+                        ``field_name`` (default: ATOM), ``atom_name``,
+                        ``residue_name``, ``chain_id`` and ``ins_code``
+        :returns: The new list
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        count = len(positions)
+        if ids is None:
+            ids = np.arange(1, count + 1)
+        columns.update(charge=charges, radius=radii, epsilon=epsilons, id=ids)
+        unknown = set(columns) - set(NUMERIC_COLUMNS) - set(CODED_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown atom columns: {sorted(unknown)}")
+
+        atoms = cls()
+        atoms._reserve(count)
+        atoms._size = count
+        atoms._positions[:count] = positions
+        for name in NUMERIC_COLUMNS:
+            values = columns.get(name)
+            if values is not None:
+                atoms._columns[name][:count] = values
+        for name in CODED_COLUMNS:
+            values = columns.get(name)
+            if values is None:
+                values = ["ATOM" if name == "field_name" else None] * count
+            atoms._codes[name][:count] = atoms._encode(name, values)
+        return atoms
+
+    def _reserve(self, count: int) -> None:
+        """Grow the column storage to hold at least ``count`` rows"""
+        capacity = len(self._positions)
+        if count <= capacity:
+            return
+        capacity = max(count, 2 * capacity, _MIN_CAPACITY)
+
+        def grow(array: np.ndarray) -> np.ndarray:
+            bigger = np.zeros((capacity,) + array.shape[1:], array.dtype)
+            bigger[: self._size] = array[: self._size]
+            return bigger
+
+        self._positions = grow(self._positions)
+        for name in NUMERIC_COLUMNS:
+            self._columns[name] = grow(self._columns[name])
+        for name in CODED_COLUMNS:
+            self._codes[name] = grow(self._codes[name])
 
-    def __getattr__(self, method):
-        return getattr(self._atoms, method)
+    def _encode(self, name: str, values: Sequence) -> np.ndarray:
+        """Codes of string values, adding new values to the column's table
+
+        :param name: Name of a string column
+        :param values: Strings (or None)
+        :returns: int32 codes
+        """
+        lookup = self._lookup[name]
+        categories = self._categories[name]
+        codes = np.empty(len(values), dtype=np.int32)
+        for idx, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(categories)
+                categories.append(value)
+            codes[idx] = code
+        return codes
+
+    def append(self, atom: Atom) -> None:
+        """Add an atom at the end of the list
+
+        A standalone atom becomes a view of its new row; an atom that
+        already belongs to a list is copied.
+
+        :param Atom atom: The atom
+        """
+        self.extend([atom])
+
+    def extend(self, atoms: Iterable[Atom]) -> None:
+        """Add atoms at the end of the list
+
+        :param atoms: The atoms (standalone atoms become views of the list)
+        """
+        atoms = list(atoms)
+        start = self._size
+        self._reserve(start + len(atoms))
+        self._size = start + len(atoms)
+        for index, atom in enumerate(atoms, start):
+            position = getattr(atom, "position", None)
+            if position is not None:
+                self._positions[index] = (position.x, position.y, position.z)
+            else:
+                self._positions[index] = 0.0
+            for name in NUMERIC_COLUMNS:
+                self._columns[name][index] = getattr(atom, name)
+            for name in CODED_COLUMNS:
+                self._codes[name][index] = self._encode(
+                    name, [getattr(atom, name)]
+                )[0]
+            if atom._list is None:
+                atom._list = self
+                atom._index = index
+                atom._row = None
+        self.modified()
+
+    def modified(self) -> None:
+        """Drop values cached from the columns"""
+        self._dp.clear()
+
+    def _get(self, name: str, index: int):
+        """Value of one attribute of one atom, as stored in an Atom"""
+        if index >= self._size:
+            raise IndexError("Atom is no longer in the list")
+        if name == "position":
+            return Coordinate(*self._positions[index].tolist())
+        if name in NUMERIC_COLUMNS:
+            return self._columns[name][index].item()
+        return self._categories[name][self._codes[name][index]]
+
+    def _set(self, name: str, index: int, value) -> None:
+        """Set one attribute of one atom"""
+        if index >= self._size:
+            raise IndexError("Atom is no longer in the list")
+        if name == "position":
+            self._positions[index] = (value.x, value.y, value.z)
+        elif name in NUMERIC_COLUMNS:
+            self._columns[name][index] = value
+        else:
+            self._codes[name][index] = self._encode(name, [value])[0]
+        self.modified()
 
     def __len__(self):
-        return len(self._atoms)
+        return self._size
+
+    def __iter__(self) -> Iterator[Atom]:
+        for index in range(self._size):
+            yield Atom._view(self, index)
 
     def __getitem__(self, item):
-        return self._atoms[item]
+        """An Atom for an integer index, or a new AtomList holding copies
+        of the selected rows for a slice, mask or index array"""
+        if isinstance(item, (int, np.integer)):
+            if item < 0:
+                item += self._size
+            if not 0 <= item < self._size:
+                raise IndexError("AtomList index out of range")
+            return Atom._view(self, int(item))
+        return self.take(np.arange(self._size)[item])
+
+    def take(self, indices: np.ndarray) -> "AtomList":
+        """New list holding copies of the given rows
+
+        :param indices: Row indices
+        :returns: The new list
+        """
+        indices = np.asarray(indices, dtype=np.intp).ravel()
+        columns = {
+            name: self._columns[name][: self._size][indices]
+            for name in NUMERIC_COLUMNS
+        }
+        for name in CODED_COLUMNS:
+            table = self.categories(name)
+            codes = self.codes(name)[indices]
+            columns[name] = [table[code] for code in codes]
+        charges = columns.pop("charge")
+        radii = columns.pop("radius")
+        epsilons = columns.pop("epsilon")
+        ids = columns.pop("id")
+        return AtomList.from_arrays(
+            self.positions[indices], charges, radii, epsilons, ids, **columns
+        )
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions[: self._size]
+
+    @property
+    def coordinates(self) -> CoordinateArray:
+        """The positions as a CoordinateArray sharing their memory"""
+        return CoordinateArray.wrap(self.positions)
+
+    @property
+    def charges(self) -> np.ndarray:
+        return self.column("charge")
+
+    @property
+    def radii(self) -> np.ndarray:
+        return self.column("radius")
+
+    @property
+    def epsilons(self) -> np.ndarray:
+        return self.column("epsilon")
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.column("id")
+
+    def column(self, name: str) -> np.ndarray:
+        """(N,) array of a numeric attribute (a view of the storage)
+
+        :param name: Attribute name, e.g. "charge" or "residue_number"
+        """
+        return self._columns[name][: self._size]
+
+    def codes(self, name: str) -> np.ndarray:
+        """(N,) int32 codes of a string attribute
+
+        :param name: Attribute name, e.g. "residue_name" or "chain_id"
+        """
+        return self._codes[name][: self._size]
+
+    def categories(self, name: str) -> list:
+        """Distinct values of a string attribute, indexed by code
+
+        :param name: Attribute name, e.g. "residue_name" or "chain_id"
+        """
+        return self._categories[name]
+
+    def strings(self, name: str) -> np.ndarray:
+        """(N,) object array of the values of a string attribute
+
+        :param name: Attribute name, e.g. "residue_name" or "chain_id"
+        """
+        table = np.empty(len(self._categories[name]), dtype=object)
+        table[:] = self._categories[name]
+        return table[self.codes(name)]
 
     @property
     def center(self) -> Coordinate:
@@ -61,12 +347,9 @@ class AtomList:
         :rtype: Coordinate
         """
         if "min" not in self._dp.keys():
-            x, y, z = np.inf, np.inf, np.inf
-            for atom in self._atoms:
-                x = min(x, atom.x)
-                y = min(y, atom.y)
-                z = min(z, atom.z)
-            self._dp["min"] = Coordinate(x, y, z)
+            self._dp["min"] = Coordinate(
+                *self.positions.min(axis=0, initial=np.inf)
+            )
 
         return self._dp["min"]
 
@@ -77,25 +360,20 @@ class AtomList:
         :rtype: Coordinate
         """
         if "max" not in self._dp.keys():
-            x, y, z = 0.0, 0.0, 0.0
-            for atom in self._atoms:
-                x = max(x, atom.x)
-                y = max(y, atom.y)
-                z = max(z, atom.z)
-            self._dp["max"] = Coordinate(x, y, z)
+            if self._size:
+                self._dp["max"] = Coordinate(*self.positions.max(axis=0))
+            else:
+                self._dp["max"] = Coordinate(0.0, 0.0, 0.0)
 
         return self._dp["max"]
 
     @property
     def max_radius(self) -> float:
         if "max_radius" not in self._dp.keys():
-            m = 0.0
-            for atom in self._atoms:
-                m = max(m, atom.radius)
-            self._dp["max_radius"] = m
+            self._dp["max_radius"] = float(self.radii.max(initial=0.0))
 
         return self._dp["max_radius"]
 
     @property
     def count(self) -> int:
-        return len(self._atoms)
+        return self._size
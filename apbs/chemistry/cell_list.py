@@ -1,3 +1,5 @@
+from typing import Optional, Tuple
+import numpy as np
 from apbs.geometry import Coordinate
 from . import AtomList
 
@@ -5,10 +7,240 @@ from . import AtomList
 # though all the methods may remain the same.
 Stride = Coordinate
 
+# Inflation of the automatic domain (~ sqrt(2)) beyond the atoms
+CLIST_INFLATE = 1.42
 
-class CellList(AtomList):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.lower_bound = Coordinate()
-        self.upper_bound = Coordinate()
-        self.stride = Stride(0.0, 0.0, 0.0)
+# Bounds and target spacing of the default hash table dimensions (see
+# Vpbe_ctor2)
+MIN_HASH_DIM = 3
+MAX_HASH_DIM = 75
+HASH_SPACING = 0.5
+
+
+class DomainMode:
+    """Enum class to replace Vclist_DomainMode in original source"""
+
+    # Domain set from the atoms, inflated by their radii and the probe
+    Auto = 0
+    # Domain given by the lower and upper corners
+    Manual = 1
+
+
+def hash_dims(alist: AtomList) -> Tuple[int, int, int]:
+    """Default cell list dimensions for a molecule
+
+    As in Vpbe_ctor2: one cell per 0.5 A of the solute extent (atomic radii
+    included), between 3 and 75 cells in each direction.
+
+    :param alist: The atoms
+    :returns: Number of cells in each direction
+    """
+    if not len(alist):
+        return (MIN_HASH_DIM,) * 3
+    radii = alist.radii[:, np.newaxis]
+    length = (alist.positions + radii).max(axis=0) - (
+        alist.positions - radii
+    ).min(axis=0)
+    npts = (length / HASH_SPACING).astype(int)
+    return tuple(int(n) for n in np.clip(npts, MIN_HASH_DIM, MAX_HASH_DIM))
+
+
+def expand_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of the ranges [start, start + count)"""
+    total = int(counts.sum())
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(total)
+
+
+class CellList:
+    """
+    Pulled over from src/generic/vclist.(h|c)
+
+    Uniform grid of cells over the molecule; each cell lists every atom
+    whose sphere, inflated by ``max_radius``, may overlap it. The lists are
+    stored CSR style: the atoms of cell ``c`` are
+    ``cell_atoms[cell_start[c]:cell_start[c + 1]]``, in atom order. Any
+    probe of radius up to ``max_radius`` centered in a cell can only
+    overlap the atoms of that cell.
+
+    Attributes:
+        alist (AtomList): The atoms
+        max_radius (float): Largest probe radius the list can be queried with
+        npts (tuple): Number of cells in each direction
+        n (int): Total number of cells
+        mode (int): DomainMode used to set the domain
+        lower_bound (Coordinate): Lower corner of the domain
+        upper_bound (Coordinate): Upper corner of the domain
+        stride (Stride): Cell spacing in each direction
+        cell_start (np.ndarray): (n + 1,) offsets of each cell's atoms
+        cell_atoms (np.ndarray): Indices into alist of the atoms of all
+            cells
+    """
+
+    def __init__(
+        self,
+        alist: AtomList,
+        max_radius: float,
+        npts=None,
+        mode: int = DomainMode.Auto,
+        lower_corner=None,
+        upper_corner=None,
+    ):
+        """
+        :param alist: The atoms
+        :param max_radius: Largest probe radius to be queried
+        :param npts: Number of cells in each direction, at least 3 each
+                     (default: from :func:`hash_dims`)
+        :param mode: DomainMode of the domain setup
+        :param lower_corner: Lower corner of a DomainMode.Manual domain
+        :param upper_corner: Upper corner of a DomainMode.Manual domain
+        :raises ValueError: on invalid dimensions, mode or domain
+        """
+        self.alist = alist
+        self.max_radius = float(max_radius)
+        if npts is None:
+            npts = hash_dims(alist)
+        self.npts = tuple(int(n) for n in npts)
+        if len(self.npts) != 3 or min(self.npts) < 3:
+            raise ValueError(
+                f"Cell list dimensions {self.npts} must be greater than 2"
+            )
+        self.n = int(np.prod(self.npts))
+        self.mode = mode
+
+        if mode == DomainMode.Auto:
+            if not len(alist):
+                raise ValueError("Automatic cell list domain needs atoms")
+            pad = CLIST_INFLATE * (alist.max_radius + self.max_radius)
+            lower = alist.positions.min(axis=0) - pad
+            upper = alist.positions.max(axis=0) + pad
+        elif mode == DomainMode.Manual:
+            if lower_corner is None or upper_corner is None:
+                raise ValueError("Manual cell list domain needs both corners")
+            lower = np.array(tuple(lower_corner), dtype=np.float64)
+            upper = np.array(tuple(upper_corner), dtype=np.float64)
+        else:
+            raise ValueError(f"Invalid cell list domain mode {mode}")
+        spacs = (upper - lower) / (np.array(self.npts) - 1)
+        if not (spacs > 0).all():
+            raise ValueError("Cell list domain must have a positive extent")
+
+        self.lower_bound = Coordinate(*lower.tolist())
+        self.upper_bound = Coordinate(*upper.tolist())
+        self.stride = Stride(*spacs.tolist())
+        self._lower = lower
+        self._spacs = spacs
+        self.cell_start, self.cell_atoms = self._assign_atoms()
+
+    def _assign_atoms(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized Vclist_assignAtoms
+
+        :returns: tuple of the (n + 1,) cell offsets and the atom indices
+                  sorted by cell
+        """
+        npts = np.array(self.npts)
+        dc = self.alist.positions - self._lower
+        rtot = (self.alist.radii + self.max_radius)[:, np.newaxis]
+        imax = np.minimum(np.ceil((dc + rtot) / self._spacs), npts - 1)
+        imin = np.maximum(np.floor((dc - rtot) / self._spacs), 0)
+        imax = imax.astype(np.intp)
+        imin = imin.astype(np.intp)
+
+        # Atoms spanning boxes of the same shape are expanded together into
+        # (atom, cell) entries, keyed by cell then atom so that one sort
+        # orders them as the C code stores them
+        natoms = len(imin)
+        span = np.maximum(imax - imin + 1, 0)
+        base = self.array_index(imin[:, 0], imin[:, 1], imin[:, 2])
+        keys = [np.zeros(0, dtype=np.int64)]
+        shapes, group = np.unique(span, axis=0, return_inverse=True)
+        for idx, shape in enumerate(shapes):
+            if not shape.all():
+                continue
+            members = np.flatnonzero(group.ravel() == idx)
+            di, dj, dk = np.indices(shape).reshape(3, -1)
+            offsets = self.array_index(di, dj, dk)
+            cells = base[members, np.newaxis] + offsets
+            keys.append((cells * natoms + members[:, np.newaxis]).ravel())
+        keys = np.sort(np.concatenate(keys))
+        cells, atoms = np.divmod(keys, max(natoms, 1))
+        del keys
+
+        cell_start = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.n), out=cell_start[1:])
+        return cell_start, atoms.astype(np.int32)
+
+    def array_index(self, i, j, k):
+        """Flat index of the cell (i, j, k); port of Vclist_arrayIndex"""
+        return (i * self.npts[1] + j) * self.npts[2] + k
+
+    def cell_index(self, points) -> np.ndarray:
+        """Flat index of the cell holding each point (Vclist_getCell)
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :returns: (M,) cell indices, -1 where the point is off the grid
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        # Truncation toward zero, as the (int) cast in the C code
+        ic = ((points - self._lower) / self._spacs).astype(np.intp)
+        inside = np.all((ic >= 0) & (ic < np.array(self.npts)), axis=1)
+        cells = self.array_index(ic[:, 0], ic[:, 1], ic[:, 2])
+        return np.where(inside, cells, -1)
+
+    def cell(self, pos) -> Optional[np.ndarray]:
+        """Atoms of the cell holding a point
+
+        :param pos: Coordinate (or 3-sequence) of the point
+        :returns: Indices into alist, or None if the point is off the grid
+        """
+        ui = int(self.cell_index(np.array(tuple(pos)))[0])
+        if ui < 0:
+            return None
+        return self.cell_atoms[self.cell_start[ui]:(self.cell_start[ui + 1])]
+
+    def candidates(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        """Atoms of the cells holding many points
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :returns: tuple of the (M + 1,) offsets and the atom indices:
+                  the candidates of point m are
+                  ``atoms[offsets[m]:offsets[m + 1]]`` (none off the grid)
+        """
+        cells = self.cell_index(points)
+        inside = cells >= 0
+        cells = np.where(inside, cells, 0)
+        starts = self.cell_start[cells]
+        counts = np.where(inside, self.cell_start[cells + 1] - starts, 0)
+        offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets, self.cell_atoms[expand_ranges(starts, counts)]
+
+    def neighbors(
+        self, points, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Atoms overlapping probe spheres centered at many points
+
+        An atom overlaps the probe at a point when their distance is less
+        than the sum of the atom and probe radii, as in Vacc.
+
+        :param points: (M, 3) array of points (or a CoordinateArray)
+        :param radius: Probe radius, at most max_radius
+        :returns: tuple of the (M + 1,) offsets and the atom indices, in
+                  the layout of :meth:`candidates`
+        :raises ValueError: if radius is greater than max_radius
+        """
+        if radius > self.max_radius:
+            raise ValueError(
+                f"Got radius {radius} greater than max radius "
+                f"{self.max_radius} from cell list."
+            )
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        offsets, atoms = self.candidates(points)
+        owner = np.repeat(np.arange(len(points)), np.diff(offsets))
+        diff = points[owner] - self.alist.positions[atoms]
+        dist2 = np.einsum("ij,ij->i", diff, diff)
+        hit = dist2 < (self.alist.radii[atoms] + radius) ** 2
+        counts = np.bincount(owner[hit], minlength=len(points))
+        offsets = np.zeros(len(points) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets, atoms[hit]
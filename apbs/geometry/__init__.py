@@ -1,5 +1,5 @@
 from .constants import Constants  # noqa F401
-from .coordinate import Coordinate  # noqa F401
+from .coordinate import Coordinate, CoordinateArray  # noqa F401
 from .surface_point import SurfacePoint  # noqa F401
 from .surface import Surface  # noqa F401
 from .sphere import Sphere  # noqa F401
@@ -1,67 +1,97 @@
-from typing import Generic, TypeVar, Callable
+from typing import Generic, Iterator, TypeVar, Callable, Union
 import numpy as np
 
 """
 Using Coordinate as a lower-level abstraction over len==3 generic container,
 with class Point potentially having more associated data/behavior to come.
+
+CoordinateArray holds a batch of points as one (N, 3) array and supports
+the same operators as Coordinate, applied to every point at once.
 """
 
 T = TypeVar("T")
 
+# Scalar operand types accepted by the arithmetic operators
+_SCALARS = (float, int, np.number)
+
 
 class Coordinate(Generic[T]):
     """
     Attributes:
-        data (Array[T]): data to be stored in the point (max three values)
+        x (T): first value
+        y (T): second value
+        z (T): third value
 
     NOTE: initializes values to 0 if none are passed in. Will not cast to
             type-hinted type.
     """
 
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, *vals, array: np.ndarray = None):
         if len(vals) not in (0, 3):
             raise RuntimeError("Can only pass in 3 values for a Point.")
 
         if len(vals) == 3:
-            self._data = np.array(vals, dtype=np.float32)
+            self.x, self.y, self.z = vals
         elif array is not None:
-            self._data = np.array(array, dtype=np.float32)
+            self.x, self.y, self.z = np.asarray(array).reshape(3).tolist()
         else:
-            self._data = np.zeros(3, dtype=np.float32)
+            self.x, self.y, self.z = 0.0, 0.0, 0.0
+
+    @property
+    def _data(self) -> np.ndarray:
+        """The values as a new float64 array"""
+        return np.array((self.x, self.y, self.z), dtype=np.float64)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.array((self.x, self.y, self.z), dtype=dtype)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter((self.x, self.y, self.z))
+
+    def __len__(self) -> int:
+        return 3
 
     def any(self, predicate: Callable[[float], bool]) -> bool:
-        return any(predicate(idx) for idx in self._data)
+        return any(predicate(val) for val in (self.x, self.y, self.z))
 
     def all(self, predicate: Callable[[float], bool]) -> bool:
-        return all(predicate(idx) for idx in self._data)
+        return all(predicate(val) for val in (self.x, self.y, self.z))
 
     def __getitem__(self, idx: int) -> T:
         if idx > 2 or idx < -2:
             raise IndexError("Point has only 3 dimensions.")
-        return self._data[idx]
+        return (self.x, self.y, self.z)[idx]
 
     def __setitem__(self, idx: int, value: T) -> None:
         if idx > 2 or idx < -2:
             raise IndexError("Point has only 3 dimensions.")
-        self._data[idx] = value
+        setattr(self, ("x", "y", "z")[idx], value)
 
     def __lt__(self, other: "Coordinate[T]") -> bool:
-        return (self._data < other._data).all()
+        return self.x < other.x and self.y < other.y and self.z < other.z
 
     def __le__(self, other: "Coordinate[T]") -> bool:
-        return (self._data <= other._data).all()
+        return self.x <= other.x and self.y <= other.y and self.z <= other.z
 
     def __gt__(self, other: "Coordinate[T]") -> bool:
-        return (self._data > other._data).all()
+        return self.x > other.x and self.y > other.y and self.z > other.z
 
     def __ge__(self, other: "Coordinate[T]") -> bool:
-        return (self._data >= other._data).all()
+        return self.x >= other.x and self.y >= other.y and self.z >= other.z
 
     def __eq__(self, other: "Coordinate[T]") -> bool:
-        return (self._data == other._data).all()
+        if not isinstance(other, Coordinate):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y and self.z == other.z
 
     def __ne__(self, other: "Coordinate[T]") -> bool:
-        return not (self._data == other._data).all()
+        if not isinstance(other, Coordinate):
+            return NotImplemented
+        return not self == other
+
+    __hash__ = None
 
     def __str__(self):
         return f"Coordinate <{self.x}, {self.y}, {self.z}>"
@@ -71,52 +101,273 @@ class Coordinate(Generic[T]):
 
     def __add__(self, other: "Coordinate") -> "Coordinate":
         if isinstance(other, Coordinate):
-            return Coordinate(array=self._data + other._data)
-        elif isinstance(other, (float, int)):
-            return Coordinate(array=self._data + other)
+            return Coordinate(
+                self.x + other.x, self.y + other.y, self.z + other.z
+            )
+        elif isinstance(other, _SCALARS):
+            return Coordinate(self.x + other, self.y + other, self.z + other)
+        elif isinstance(other, CoordinateArray):
+            return NotImplemented
         raise RuntimeError("Unexpected data type for this operation.")
 
     def __sub__(self, other: "Coordinate") -> "Coordinate":
         if isinstance(other, Coordinate):
-            return Coordinate(array=self._data - other._data)
-        elif isinstance(other, (float, int)):
-            return Coordinate(array=self._data - other)
+            return Coordinate(
+                self.x - other.x, self.y - other.y, self.z - other.z
+            )
+        elif isinstance(other, _SCALARS):
+            return Coordinate(self.x - other, self.y - other, self.z - other)
+        elif isinstance(other, CoordinateArray):
+            return NotImplemented
         raise RuntimeError("Unexpected data type for this operation.")
 
     def __mul__(self, other: "Coordinate") -> "Coordinate":
         if isinstance(other, Coordinate):
-            return Coordinate(array=self._data * other._data)
-        elif isinstance(other, (float, int)):
-            return Coordinate(array=self._data * other)
+            return Coordinate(
+                self.x * other.x, self.y * other.y, self.z * other.z
+            )
+        elif isinstance(other, _SCALARS):
+            return Coordinate(self.x * other, self.y * other, self.z * other)
+        elif isinstance(other, CoordinateArray):
+            return NotImplemented
         raise RuntimeError("Unexpected data type for this operation.")
 
     def __truediv__(self, other: "Coordinate") -> "Coordinate":
         if isinstance(other, Coordinate):
-            return Coordinate(array=self._data / other._data)
-        elif isinstance(other, (float, int)):
-            return Coordinate(array=self._data / other)
+            return Coordinate(
+                self.x / other.x, self.y / other.y, self.z / other.z
+            )
+        elif isinstance(other, _SCALARS):
+            return Coordinate(self.x / other, self.y / other, self.z / other)
+        elif isinstance(other, CoordinateArray):
+            return NotImplemented
         raise RuntimeError("Unexpected data type for this operation.")
 
+    def __radd__(self, other: float) -> "Coordinate":
+        if isinstance(other, _SCALARS):
+            return self + other
+        raise RuntimeError("Unexpected data type for this operation.")
+
+    def __rsub__(self, other: float) -> "Coordinate":
+        if isinstance(other, _SCALARS):
+            return Coordinate(other - self.x, other - self.y, other - self.z)
+        raise RuntimeError("Unexpected data type for this operation.")
+
+    def __rmul__(self, other: float) -> "Coordinate":
+        if isinstance(other, _SCALARS):
+            return self * other
+        raise RuntimeError("Unexpected data type for this operation.")
+
+    def __neg__(self) -> "Coordinate":
+        return Coordinate(-self.x, -self.y, -self.z)
+
+
+# Operand of the CoordinateArray operators
+_Operand = Union["CoordinateArray", Coordinate, float, np.ndarray]
+
+
+class CoordinateArray:
+    """
+    A batch of N points stored as one (N, 3) float64 array.
+
+    The arithmetic operators accept another CoordinateArray of the same
+    length, a single Coordinate (applied to every point), a scalar, an
+    (N,) array (one scalar per point, even when N is 3) or an (N, 3)
+    array. Comparisons mirror Coordinate's, which hold only if they hold
+    for all three values, and return an (N,) boolean array.
+
+    Attributes:
+        data (np.ndarray): (N, 3) array of the points
+        x (np.ndarray): (N,) view of the first values
+        y (np.ndarray): (N,) view of the second values
+        z (np.ndarray): (N,) view of the third values
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, points=None):
+        """
+        :param points: (N, 3) array-like, a sequence of Coordinates or a
+                       single Coordinate (default: no points)
+        """
+        if points is None:
+            points = np.zeros((0, 3))
+        elif isinstance(points, CoordinateArray):
+            points = points.data
+        elif isinstance(points, Coordinate):
+            points = [(points.x, points.y, points.z)]
+        elif len(points) and isinstance(points[0], Coordinate):
+            points = [(pt.x, pt.y, pt.z) for pt in points]
+        self.data = np.array(points, dtype=np.float64).reshape(-1, 3)
+
+    @classmethod
+    def zeros(cls, count: int) -> "CoordinateArray":
+        """Batch of ``count`` points at the origin"""
+        return cls.wrap(np.zeros((int(count), 3)))
+
+    @classmethod
+    def wrap(cls, data: np.ndarray) -> "CoordinateArray":
+        """Batch sharing the memory of an (N, 3) float64 array
+
+        :param data: (N, 3) float64 array; writes through the batch change it
+        """
+        if data.ndim != 2 or data.shape[1] != 3:
+            raise ValueError(f"Expected an (N, 3) array, got {data.shape}")
+        batch = cls.__new__(cls)
+        batch.data = data
+        return batch
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        if dtype is None or np.dtype(dtype) == self.data.dtype:
+            return self.data
+        return self.data.astype(dtype)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[Coordinate]:
+        for x, y, z in self.data.tolist():
+            yield Coordinate(x, y, z)
+
+    def __getitem__(self, idx):
+        """A Coordinate (copy) for an integer index, else a CoordinateArray
+        of the selected points (a view for slices)"""
+        if isinstance(idx, (int, np.integer)):
+            return Coordinate(*self.data[idx].tolist())
+        return CoordinateArray.wrap(self.data[idx])
+
+    def __setitem__(self, idx, value) -> None:
+        self.data[idx] = _operand(value)
+
     @property
-    def x(self) -> T:
-        return self._data[0]
+    def x(self) -> np.ndarray:
+        return self.data[:, 0]
 
     @property
-    def y(self) -> T:
-        return self._data[1]
+    def y(self) -> np.ndarray:
+        return self.data[:, 1]
 
     @property
-    def z(self) -> T:
-        return self._data[2]
+    def z(self) -> np.ndarray:
+        return self.data[:, 2]
 
     @x.setter
-    def x(self, value: T) -> None:
-        self._data[0] = value
+    def x(self, value) -> None:
+        self.data[:, 0] = value
 
     @y.setter
-    def y(self, value: T) -> None:
-        self._data[1] = value
+    def y(self, value) -> None:
+        self.data[:, 1] = value
 
     @z.setter
-    def z(self, value: T) -> None:
-        self._data[2] = value
+    def z(self, value) -> None:
+        self.data[:, 2] = value
+
+    def any(self, predicate: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """(N,) mask of points where the vectorized predicate holds for
+        any of the three values"""
+        return np.asarray(predicate(self.data)).any(axis=1)
+
+    def all(self, predicate: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """(N,) mask of points where the vectorized predicate holds for
+        all three values"""
+        return np.asarray(predicate(self.data)).all(axis=1)
+
+    def dist2(self, other: _Operand) -> np.ndarray:
+        """(N,) squared distances to another point or batch of points"""
+        diff = self.data - _operand(other)
+        return np.einsum("ij,ij->i", diff, diff)
+
+    def norm2(self) -> np.ndarray:
+        """(N,) squared lengths of the points"""
+        return np.einsum("ij,ij->i", self.data, self.data)
+
+    def __lt__(self, other: _Operand) -> np.ndarray:
+        return (self.data < _operand(other)).all(axis=1)
+
+    def __le__(self, other: _Operand) -> np.ndarray:
+        return (self.data <= _operand(other)).all(axis=1)
+
+    def __gt__(self, other: _Operand) -> np.ndarray:
+        return (self.data > _operand(other)).all(axis=1)
+
+    def __ge__(self, other: _Operand) -> np.ndarray:
+        return (self.data >= _operand(other)).all(axis=1)
+
+    def __eq__(self, other: _Operand) -> np.ndarray:
+        return (self.data == _operand(other)).all(axis=1)
+
+    def __ne__(self, other: _Operand) -> np.ndarray:
+        return ~self.__eq__(other)
+
+    __hash__ = None
+
+    def __str__(self):
+        return f"CoordinateArray <{len(self)} points>"
+
+    def __repr__(self):
+        return f"CoordinateArray <{len(self)} points>"
+
+    def __add__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(self.data + _operand(other))
+
+    def __sub__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(self.data - _operand(other))
+
+    def __mul__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(self.data * _operand(other))
+
+    def __truediv__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(self.data / _operand(other))
+
+    def __radd__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(_operand(other) + self.data)
+
+    def __rsub__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(_operand(other) - self.data)
+
+    def __rmul__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(_operand(other) * self.data)
+
+    def __rtruediv__(self, other: _Operand) -> "CoordinateArray":
+        return CoordinateArray.wrap(_operand(other) / self.data)
+
+    def __neg__(self) -> "CoordinateArray":
+        return CoordinateArray.wrap(-self.data)
+
+    def __iadd__(self, other: _Operand) -> "CoordinateArray":
+        self.data += _operand(other)
+        return self
+
+    def __isub__(self, other: _Operand) -> "CoordinateArray":
+        self.data -= _operand(other)
+        return self
+
+    def __imul__(self, other: _Operand) -> "CoordinateArray":
+        self.data *= _operand(other)
+        return self
+
+    def __itruediv__(self, other: _Operand) -> "CoordinateArray":
+        self.data /= _operand(other)
+        return self
+
+    # Keep numpy from applying its own operators element by element when
+    # an ndarray is the left operand
+    __array_ufunc__ = None
+
+
+def _operand(other) -> Union[float, np.ndarray]:
+    """Operand of a CoordinateArray operator, broadcastable to (N, 3)"""
+    if isinstance(other, CoordinateArray):
+        return other.data
+    if isinstance(other, Coordinate):
+        return np.array((other.x, other.y, other.z), dtype=np.float64)
+    if isinstance(other, _SCALARS):
+        return other
+    if isinstance(other, (np.ndarray, list, tuple)):
+        other = np.asarray(other, dtype=np.float64)
+        if other.ndim == 1:
+            # One scalar per point
+            return other[:, np.newaxis]
+        return other
+    raise RuntimeError("Unexpected data type for this operation.")
@@ -1,5 +1,36 @@
+from functools import lru_cache
 import numpy as np
-from . import Surface, SurfacePoint
+from . import CoordinateArray, Surface
+
+
+@lru_cache(maxsize=32)
+def _sphere_points(npoints: int) -> np.ndarray:
+    """Read-only (n, 3) points of the reference sphere of about npoints"""
+    frac = npoints / 4.0
+    # VRINT rounds to the nearest integer
+    ntheta = int(np.floor(np.sqrt(np.pi * frac) + 0.5))
+    if ntheta == 0:
+        points = np.zeros((0, 3))
+        points.flags.writeable = False
+        return points
+    dtheta = np.pi / float(ntheta)
+    nphimax = 2 * ntheta
+
+    theta = dtheta * np.arange(ntheta)
+    nphi = np.floor(np.sin(theta) * nphimax + 0.5).astype(np.intp)
+    nactual = int(nphi.sum())
+
+    # Ring of each point and its index within the ring
+    ring = np.repeat(np.arange(ntheta), nphi)
+    iphi = np.arange(nactual) - np.repeat(np.cumsum(nphi) - nphi, nphi)
+    phi = 2 * np.pi / nphi[ring] * iphi
+    sintheta = np.sin(theta)[ring]
+    costheta = np.cos(theta)[ring]
+    points = np.stack(
+        [np.cos(phi) * sintheta, np.sin(phi) * sintheta, costheta], axis=1
+    )
+    points.flags.writeable = False
+    return points
 
 
 class Sphere:
@@ -7,48 +38,23 @@ class Sphere:
     Static class to hold geometric calculates on spheres.
     """
 
-    def spherical_distribution(self, npoints: int) -> Surface:
+    @staticmethod
+    def spherical_distribution(npoints: int) -> Surface:
         """
         Generates monte-carlo approximation of a sphere using npoints points.
 
-        Shamelessly copied over from the vacc routine.
+        Shamelessly copied over from the vacc routine (VaccSurf_refSphere),
+        with the points of each ring of constant theta generated at once.
+        The points are computed once per npoints and reused; each call
+        returns a new Surface holding a copy.
+
+        :param npoints: Approximate number of points
+        :returns: Unit sphere surface with every point flagged on the surface
         """
-        surface: Surface
-
-        frac = npoints / 4.0
-        ntheta = np.ceil(np.sqrt(np.pi * frac))
-        dtheta = np.pi / float(ntheta)
-        nphimax = 2 * ntheta
-
-        # Count number of points to be used
-        nactual: int = 0
-        for idx in range(ntheta):
-            theta = dtheta * float(idx)
-            sintheta = np.sin(theta)
-            costheta = np.cos(theta)
-            nphi = np.ceil(sintheta * nphimax)
-            nactual += nphi
-
-        surface = Surface(1.0, nactual)
-        nactual = 0
-        for idx in range(ntheta):
-            theta = dtheta * float(idx)
-            sintheta = np.sin(theta)
-            costheta = np.cos(theta)
-            nphi = np.ceil(sintheta * nphimax)
-            if nphi != 0:
-                dphi = 2 * np.pi / float(nphi)
-                for jdx in range(nphi):
-                    phi = dphi * float(jdx)
-                    sinphi = np.sin(phi)
-                    cosphi = np.cos(phi)
-                    surface[nactual] = SurfacePoint(
-                        cosphi * sintheta,
-                        sinphi * sintheta,
-                        costheta,
-                        is_on_surf=True,
-                    )
-                    nactual += 1
-
-        surface.npoints = nactual
-        return surface
+        points = _sphere_points(int(npoints))
+        return Surface(
+            1.0,
+            len(points),
+            CoordinateArray(points),
+            np.ones(len(points), dtype=bool),
+        )
@@ -1,31 +1,104 @@
-from typing import List, Dict
-from . import SurfacePoint
+from typing import Dict, Optional, Tuple
+from . import CoordinateArray, SurfacePoint
+import numpy as np
+
+
+def _axis_property(axis: int) -> property:
+    def get(self) -> float:
+        return float(self._surface.points.data[self._idx, axis])
+
+    def set(self, value: float) -> None:
+        self._surface.points.data[self._idx, axis] = value
+
+    return property(get, set)
+
+
+class SurfacePointView(SurfacePoint):
+    """
+    SurfacePoint backed by one point of a Surface: reading x, y, z or
+    is_on_surf reads the surface arrays, and setting them writes through.
+    """
+
+    __slots__ = ("_surface", "_idx")
+
+    def __init__(self, surface: "Surface", idx: int):
+        """
+        :param surface: Surface holding the point
+        :param idx: Index of the point
+        """
+        self._surface = surface
+        self._idx = idx
+
+    x = _axis_property(0)
+    y = _axis_property(1)
+    z = _axis_property(2)
+
+    @property
+    def is_on_surf(self) -> bool:
+        return bool(self._surface.is_on_surf[self._idx])
+
+    @is_on_surf.setter
+    def is_on_surf(self, value: bool) -> None:
+        self._surface.is_on_surf[self._idx] = value
 
 
 class Surface:
     """
     Attributes:
-        coords: list of SurfacePoints which tracks various coordinates and
-            whether they fall on the surface or not.
+        points: CoordinateArray of the coordinates of the points
+        is_on_surf: (npoints,) boolean array which tracks whether each point
+            falls on the surface or not.
+        coords: tuple of SurfacePoints which tracks various coordinates and
+            whether they fall on the surface or not (views of the arrays
+            above, so e.g. ``surf.coords[i].is_on_surf = True`` updates
+            the surface).
     """
 
-    def __init__(self, probe_radius: float, npoints: int):
+    def __init__(
+        self,
+        probe_radius: float,
+        npoints: int,
+        points: Optional[CoordinateArray] = None,
+        is_on_surf: Optional[np.ndarray] = None,
+    ):
+        """
+        :param probe_radius: Probe radius of the surface
+        :param npoints: Number of points
+        :param points: Optional (npoints, 3) coordinates of the points
+                       (default: all at the origin)
+        :param is_on_surf: Optional (npoints,) flags of the points on the
+                           surface (default: none are)
+        """
         self.probe_radius = probe_radius
-        self.npoints = npoints
-        self.coords: List[SurfacePoint] = [
-            SurfacePoint() for _ in range(npoints)
-        ]
+        if points is None:
+            points = CoordinateArray.zeros(npoints)
+        if is_on_surf is None:
+            is_on_surf = np.zeros(npoints, dtype=bool)
+        self.points = CoordinateArray(points)
+        self.is_on_surf = np.asarray(is_on_surf, dtype=bool)
+        if len(self.points) != npoints or len(self.is_on_surf) != npoints:
+            raise ValueError(f"Expected {npoints} surface points.")
         self._dp: Dict[str, float] = dict()
 
+    @property
+    def npoints(self) -> int:
+        return len(self.points)
+
+    @property
+    def coords(self) -> Tuple[SurfacePoint, ...]:
+        return tuple(self[idx] for idx in range(self.npoints))
+
     def __getitem__(self, idx: int) -> SurfacePoint:
+        """View of a surface point that writes through to the surface"""
         if idx >= self.npoints or idx < -self.npoints:
             raise IndexError("Requested surface point does not exists.")
-        return self.coords[idx]
+        return SurfacePointView(self, idx)
 
     def __setitem__(self, idx: int, other: SurfacePoint) -> None:
         if idx >= self.npoints or idx < -self.npoints:
             raise IndexError("Requested surface point does not exists.")
-        self.coords[idx] = other
+        self.points.data[idx] = (other.x, other.y, other.z)
+        self.is_on_surf[idx] = getattr(other, "is_on_surf", False)
 
     @property
     def area(self) -> float:
@@ -37,3 +110,7 @@ class Surface:
             self._dp["area"] = -1.0
 
         return self._dp["area"]
+
+    @area.setter
+    def area(self, value: float) -> None:
+        self._dp["area"] = value
@@ -7,6 +7,8 @@ class SurfacePoint(Coordinate):
     the given coordinate falls on the surface which encapsulates it.
     """
 
+    __slots__ = ("is_on_surf",)
+
     def __init__(self, *args, **kwargs):
         self.is_on_surf: bool = False
         if "is_on_surf" in kwargs.keys():
@@ -1 +1,14 @@
 from .grid import Grid, CurvatureFlag  # noqa 401
+from .multi_resolution_grid import MultiResolutionGrid  # noqa 401
+from .reduction import SlabReducer  # noqa 401
+from .off_grid_potential import OffGridPotential, BoundaryFlag  # noqa 401
+from .expression import DXMath, SlabSource, evaluate  # noqa 401
+from .merge import (  # noqa 401
+    ParallelLayout,
+    merge_dx,
+    merge_dx_to_file,
+    merge_grids,
+)
+from .similarity import SimilarityReducer, compare  # noqa 401
+from .sidecar import GridStats, load_stats  # noqa 401
+from .chunked import ChunkCodec, ChunkedArray  # noqa 401
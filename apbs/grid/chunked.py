@@ -0,0 +1,392 @@
+"""
+Chunked, compressed grid files with random access to their blocks.
+
+The grid is cut into fixed 3D blocks that are compressed independently
+(zlib or lzma from the standard library) and located through a block
+index at the end of the file, so a region or a batch of interpolation
+points only decompresses the blocks it touches.
+
+Layout: a fixed header record, the compressed blocks (x-block major, z
+fastest) and the (nblocks, 2) int64 table of block offsets and sizes.
+Each block holds its values in C order with the bytes of every value
+shuffled into planes, which makes smooth fields compress far better.
+"""
+import lzma
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import numpy as np
+
+CHUNKED_MAGIC = b"APBSGRDC"
+
+CHUNKED_VERSION = 1
+
+# Default block size in grid points
+CHUNK_DIMS = (32, 32, 32)
+
+# Default number of decompressed blocks kept by a reader
+CHUNK_CACHE_BLOCKS = 64
+
+CHUNKED_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("codec", "<u4"),
+        ("dtype", "S4"),
+        ("title", "S72"),
+        ("dims", "<i8", 3),
+        ("chunks", "<i8", 3),
+        ("spaces", "<f8", 3),
+        ("mins", "<f8", 3),
+        ("index_offset", "<i8"),
+    ]
+)
+
+
+class ChunkCodec:
+    """Enum class for the block compression of chunked grid files"""
+
+    Raw = 0
+    Zlib = 1
+    Lzma = 2
+
+
+def _compress(raw: bytes, codec: int, level: Optional[int]) -> bytes:
+    if codec == ChunkCodec.Zlib:
+        return zlib.compress(raw, 6 if level is None else level)
+    if codec == ChunkCodec.Lzma:
+        return lzma.compress(raw, preset=6 if level is None else level)
+    if codec == ChunkCodec.Raw:
+        return raw
+    raise ValueError(f"Unknown chunk codec {codec}")
+
+
+def _decompress(raw: bytes, codec: int) -> bytes:
+    if codec == ChunkCodec.Zlib:
+        return zlib.decompress(raw)
+    if codec == ChunkCodec.Lzma:
+        return lzma.decompress(raw)
+    if codec == ChunkCodec.Raw:
+        return raw
+    raise ValueError(f"Unknown chunk codec {codec}")
+
+
+def _block_bytes(block: np.ndarray) -> bytes:
+    """C-order bytes of a block with the bytes of each value shuffled"""
+    itemsize = block.dtype.itemsize
+    raw = np.ascontiguousarray(block).view(np.uint8).reshape(-1, itemsize)
+    return raw.T.tobytes()
+
+
+def _block_array(raw: bytes, dtype: np.dtype, shape) -> np.ndarray:
+    """Undo :func:`_block_bytes`"""
+    raw = np.frombuffer(raw, dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(raw.T).view(dtype).reshape(shape)
+
+
+def write_chunked(
+    fn: str,
+    data: np.ndarray,
+    spaces,
+    mins,
+    chunks=CHUNK_DIMS,
+    codec: int = ChunkCodec.Zlib,
+    level: Optional[int] = None,
+    title: str = "",
+    workers: Optional[int] = None,
+) -> None:
+    """Write (nx, ny, nz) data as a chunked, compressed grid file
+
+    Blocks are compressed one x-slab of blocks at a time (in threads with
+    workers, as zlib and lzma release the GIL), so a memory-mapped source
+    is only paged in slab by slab.
+
+    :param fn: Path of the file
+    :param data: (nx, ny, nz) float32 or float64 array
+    :param spaces: Grid spacing in each direction
+    :param mins: Grid lower corner
+    :param chunks: Block size in grid points along each axis
+    :param codec: Block compression, one of :class:`ChunkCodec`
+    :param level: Compression level (zlib level or lzma preset)
+    :param title: Title stored in the header (at most 72 characters)
+    :param workers: Number of threads compressing blocks
+    """
+    dims = tuple(int(n) for n in data.shape)
+    chunks = tuple(int(n) for n in chunks)
+    dtype = np.dtype(data.dtype).newbyteorder("<")
+    if dtype.kind != "f":
+        dtype = np.dtype("<f8")
+    counts = [-(-n // c) for n, c in zip(dims, chunks)]
+
+    header = np.zeros(1, CHUNKED_HEADER_DTYPE)
+    header["magic"] = CHUNKED_MAGIC
+    header["version"] = CHUNKED_VERSION
+    header["codec"] = codec
+    header["dtype"] = dtype.str.encode("ascii")
+    header["title"] = title[:72].encode("ascii", "replace")
+    header["dims"] = dims
+    header["chunks"] = chunks
+    header["spaces"] = [float(h) for h in spaces]
+    header["mins"] = [float(lo) for lo in mins]
+
+    def pack(block: np.ndarray) -> bytes:
+        return _compress(_block_bytes(block.astype(dtype)), codec, level)
+
+    index = np.empty((int(np.prod(counts)), 2), dtype="<i8")
+    pool = None
+    if workers is not None and workers > 1:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with open(fn, "wb") as stream:
+            stream.write(header.tobytes())
+            offset = header.itemsize
+            bid = 0
+            for x0 in range(0, dims[0], chunks[0]):
+                slab = np.asarray(data[x0:(x0 + chunks[0])])
+                blocks = [
+                    slab[:, y0:(y0 + chunks[1]), z0:(z0 + chunks[2])]
+                    for y0 in range(0, dims[1], chunks[1])
+                    for z0 in range(0, dims[2], chunks[2])
+                ]
+                packed = pool.map(pack, blocks) if pool else map(pack, blocks)
+                for raw in packed:
+                    stream.write(raw)
+                    index[bid] = (offset, len(raw))
+                    offset += len(raw)
+                    bid += 1
+            stream.write(index.tobytes())
+            header["index_offset"] = offset
+            stream.seek(0)
+            stream.write(header.tobytes())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+class ChunkedArray:
+    """
+    Read-only (nx, ny, nz) array backed by a chunked grid file.
+
+    Behaves enough like a numpy array for :class:`Grid`: slicing with
+    basic indices reads a region, indexing with three integer arrays
+    gathers scattered nodes, and in both cases only the blocks that are
+    touched are decompressed. Recently used blocks are kept in a small
+    LRU cache. Converting it with ``np.asarray`` decompresses everything.
+    Blocks may be read from several threads at once (e.g. by
+    :meth:`Grid.resample` with workers).
+
+    Attributes:
+        shape  : Number of grid points in each direction
+        chunks : Block size in grid points along each axis
+        dtype  : Type of the stored values
+        spaces : Grid spacing in each direction
+        mins   : Grid lower corner
+        title  : Title stored in the header
+    """
+
+    ndim = 3
+
+    def __init__(self, fn: str, cache_blocks: int = CHUNK_CACHE_BLOCKS):
+        """
+        :param fn: Path of the chunked grid file
+        :param cache_blocks: Number of decompressed blocks to keep
+        """
+        self._stream = open(fn, "rb")
+        header = np.fromfile(self._stream, CHUNKED_HEADER_DTYPE, 1)
+        if not len(header) or header[0]["magic"] != CHUNKED_MAGIC:
+            self._stream.close()
+            raise ValueError(f"{fn} is not a chunked grid file")
+        header = header[0]
+        if header["version"] != CHUNKED_VERSION:
+            self._stream.close()
+            raise ValueError(f"Unsupported chunked grid version in {fn}")
+        self.shape = tuple(int(n) for n in header["dims"])
+        self.chunks = tuple(int(n) for n in header["chunks"])
+        self.dtype = np.dtype(header["dtype"].decode("ascii"))
+        self.spaces = tuple(float(h) for h in header["spaces"])
+        self.mins = tuple(float(lo) for lo in header["mins"])
+        self.title = header["title"].decode("ascii", "replace")
+        self.codec = int(header["codec"])
+        self._counts = tuple(
+            -(-n // c) for n, c in zip(self.shape, self.chunks)
+        )
+        self._stream.seek(int(header["index_offset"]))
+        nblocks = int(np.prod(self._counts))
+        self._index = np.fromfile(self._stream, "<i8", 2 * nblocks)
+        if len(self._index) != 2 * nblocks:
+            self._stream.close()
+            raise ValueError(f"Truncated block index in {fn}")
+        self._index = self._index.reshape(nblocks, 2)
+        self._cache = OrderedDict()
+        self._cache_blocks = cache_blocks
+        # Guards the file position and the cache; blocks are decompressed
+        # outside of it so threads still decompress in parallel
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def __enter__(self) -> "ChunkedArray":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def block(self, bi: int, bj: int, bk: int) -> np.ndarray:
+        """Decompress (or fetch from the cache) one block
+
+        :param bi: Block index along x
+        :param bj: Block index along y
+        :param bk: Block index along z
+        :returns: The block's values (edge blocks may be smaller)
+        """
+        key = (bi, bj, bk)
+        bid = (bi * self._counts[1] + bj) * self._counts[2] + bk
+        offset, size = self._index[bid]
+        with self._lock:
+            block = self._cache.get(key)
+            if block is not None:
+                self._cache.move_to_end(key)
+                return block
+            self._stream.seek(int(offset))
+            raw = self._stream.read(int(size))
+        shape = tuple(
+            min(c, n - b * c)
+            for b, c, n in zip(key, self.chunks, self.shape)
+        )
+        block = _block_array(_decompress(raw, self.codec), self.dtype, shape)
+        with self._lock:
+            self._cache[key] = block
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_blocks:
+                self._cache.popitem(last=False)
+        return block
+
+    def read(self, first, stop) -> np.ndarray:
+        """Read the region [first, stop) of grid indices
+
+        :param first: First grid index along each axis
+        :param stop: One past the last grid index along each axis
+        :returns: Array holding the region
+        """
+        first = [int(i) for i in first]
+        stop = [int(i) for i in stop]
+        out = np.empty(
+            [max(b - a, 0) for a, b in zip(first, stop)], dtype=self.dtype
+        )
+        if not out.size:
+            return out
+        ranges = [
+            range(a // c, (b - 1) // c + 1)
+            for a, b, c in zip(first, stop, self.chunks)
+        ]
+        for bi in ranges[0]:
+            for bj in ranges[1]:
+                for bk in ranges[2]:
+                    key = (bi, bj, bk)
+                    lo = [
+                        max(a, k * c)
+                        for a, k, c in zip(first, key, self.chunks)
+                    ]
+                    hi = [
+                        min(b, (k + 1) * c)
+                        for b, k, c in zip(stop, key, self.chunks)
+                    ]
+                    src = tuple(
+                        slice(lo_ - k * c, hi_ - k * c)
+                        for lo_, hi_, k, c in zip(lo, hi, key, self.chunks)
+                    )
+                    dst = tuple(
+                        slice(lo_ - a, hi_ - a)
+                        for lo_, hi_, a in zip(lo, hi, first)
+                    )
+                    out[dst] = self.block(*key)[src]
+        return out
+
+    def gather(self, i, j, k) -> np.ndarray:
+        """Values at scattered grid indices
+
+        :param i: Integer array of x indices
+        :param j: Integer array of y indices (broadcast with i and k)
+        :param k: Integer array of z indices
+        :returns: Array of the values, shaped like the broadcast indices
+        """
+        i, j, k = np.broadcast_arrays(*(np.asarray(n) for n in (i, j, k)))
+        shape = i.shape
+        idx = np.stack([n.ravel() for n in (i, j, k)], axis=1)
+        idx = np.where(idx < 0, idx + np.array(self.shape), idx)
+        if np.any(idx < 0) or np.any(idx >= np.array(self.shape)):
+            raise IndexError("Grid index out of range")
+        chunks = np.array(self.chunks)
+        keys = idx // chunks
+        _, ny, nz = self._counts
+        bids = (keys[:, 0] * ny + keys[:, 1]) * nz + keys[:, 2]
+        order = np.argsort(bids, kind="stable")
+        bounds = np.flatnonzero(np.diff(bids[order])) + 1
+        out = np.empty(len(idx), dtype=self.dtype)
+        for group in np.split(order, bounds):
+            if not len(group):
+                continue
+            key = keys[group[0]]
+            local = idx[group] - key * chunks
+            block = self.block(*(int(n) for n in key))
+            out[group] = block[local[:, 0], local[:, 1], local[:, 2]]
+        return out.reshape(shape)
+
+    def __getitem__(self, key) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) == 3 and all(
+            isinstance(n, np.ndarray) and n.dtype.kind in "iu" for n in key
+        ):
+            return self.gather(*key)
+        if len(key) > 3 or any(
+            n is Ellipsis
+            or n is None
+            or isinstance(n, (np.ndarray, list))
+            or (isinstance(n, slice) and (n.step or 1) < 0)
+            for n in key
+        ):
+            return np.asarray(self)[key]
+        key = key + (slice(None),) * (3 - len(key))
+        first, stop, post = [], [], []
+        for n, size in zip(key, self.shape):
+            if isinstance(n, slice):
+                start, end, step = n.indices(size)
+                first.append(start)
+                stop.append(max(end, start))
+                post.append(slice(None, None, step))
+            else:
+                n = int(n)
+                if not -size <= n < size:
+                    raise IndexError("Grid index out of range")
+                first.append(n % size)
+                stop.append(n % size + 1)
+                post.append(0)
+        return self.read(first, stop)[tuple(post)]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        data = self.read((0, 0, 0), self.shape)
+        return data if dtype is None else data.astype(dtype)
+
+
+def as_grid_array(data):
+    """Grid data as an array, leaving chunked files unread
+
+    :param data: Array-like grid data
+    :returns: data itself if it is a :class:`ChunkedArray`, which supports
+              the slicing and gathers grid code needs while reading only
+              the blocks involved, else ``np.asarray(data)``
+    """
+    if isinstance(data, ChunkedArray):
+        return data
+    return np.asarray(data)
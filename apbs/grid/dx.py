@@ -0,0 +1,582 @@
+"""
+OpenDX scalar field I/O.
+
+Pulled over from Vgrid_readDX/Vgrid_readDXBIN in src/mg/vgrid.c, but the
+data section is parsed in large blocks with numpy rather than one token at
+a time.
+"""
+import os
+import stat
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+from apbs._version import __version__
+from .reduction import iter_slabs
+import numpy as np
+
+# Zero-padded ASCII digits of 0-999, used to build formatted values
+_TRIPLETS = np.array(
+    [list(b"%03d" % val) for val in range(1000)], dtype=np.uint8
+)
+
+# Number of characters of the data section parsed at once
+DX_CHUNK_CHARS = 1 << 23
+
+# Buffer size used for DX text files
+DX_BUFFER_BYTES = 1 << 22
+
+# Number of values formatted at once when writing the data section
+DX_BLOCK_VALUES = 1 << 18
+
+# Storage type of the DXBIN payload (raw little-endian doubles)
+DXBIN_DTYPE = np.dtype("<f8")
+
+# Field definition written after the data section
+DX_TRAILER = (
+    'attribute "dep" string "positions"\n'
+    'object "regular positions regular connections" class field\n'
+    'component "positions" value 1\n'
+    'component "connections" value 2\n'
+    'component "data" value 3\n'
+)
+
+# Keywords that start the field definition following the data section
+_TRAILER_KEYWORDS = ("attribute", "object", "component")
+
+
+class DXHeader:
+    """
+    Attributes:
+        dims     : Number of grid points in each direction
+        mins     : Grid origin (lower corner)
+        spaces   : Grid spacing in each direction
+        count    : Number of data items that follow the header
+        binary   : Whether the items are stored as raw doubles (DXBIN)
+        comments : Comment lines found before the header
+    """
+
+    def __init__(
+        self,
+        dims: Tuple[int, int, int],
+        mins: Tuple[float, float, float],
+        spaces: Tuple[float, float, float],
+        count: int,
+        binary: bool = False,
+        comments: List[str] = None,
+    ):
+        self.dims = dims
+        self.mins = mins
+        self.spaces = spaces
+        self.count = count
+        self.binary = binary
+        self.comments = comments if comments is not None else []
+
+
+def read_dx_header(stream: IO[str]) -> DXHeader:
+    """Parse the OpenDX header up to (and including) "data follows"
+
+    The stream is left positioned at the first data item, so for a binary
+    stream its position is the offset of the DXBIN payload.
+
+    :param stream: Text or binary stream at the start of the file
+    :return: The parsed header
+    :raises ValueError: if the header is malformed or incomplete
+    """
+    comments = []
+    dims = mins = None
+    deltas = []
+    count = None
+    binary = False
+
+    while True:
+        line = stream.readline()
+        if not line:
+            raise ValueError("Unexpected end of file in DX header")
+        if isinstance(line, bytes):
+            line = line.decode("ascii", errors="replace")
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[0] in "#%":
+            comments.append(stripped[1:].strip())
+            continue
+
+        fields = stripped.split()
+        keyword = fields[0].lower()
+        try:
+            if keyword == "origin":
+                mins = tuple(float(val) for val in fields[1:4])
+            elif keyword == "delta":
+                deltas.append([float(val) for val in fields[1:4]])
+            elif keyword == "object" and "gridpositions" in fields:
+                idx = fields.index("counts")
+                dims = tuple(int(val) for val in fields[(idx + 1):(idx + 4)])
+            elif keyword == "object" and "array" in fields:
+                idx = fields.index("items")
+                count = int(fields[idx + 1])
+                binary = "binary" in fields
+                if "follows" in fields:
+                    break
+        except (IndexError, ValueError) as err:
+            raise ValueError(f"Malformed DX header line: {stripped}") from err
+
+    if dims is None or mins is None or len(deltas) != 3 or count is None:
+        raise ValueError("Incomplete DX header")
+    if len(dims) != 3 or len(mins) != 3:
+        raise ValueError("DX header needs three counts and origin values")
+    deltas = np.array(deltas)
+    if np.count_nonzero(deltas - np.diag(np.diag(deltas))):
+        raise ValueError("Only axis-aligned DX grids are supported")
+    if count != dims[0] * dims[1] * dims[2]:
+        raise ValueError(
+            f"DX header declares {count} items for a "
+            f"{dims[0]} x {dims[1]} x {dims[2]} grid"
+        )
+
+    return DXHeader(
+        dims,
+        mins,
+        tuple(float(val) for val in np.diag(deltas)),
+        count,
+        binary=binary,
+        comments=comments,
+    )
+
+
+def iter_dx_values(
+    stream: IO[str], count: int, chunk_chars: int = DX_CHUNK_CHARS
+) -> Iterator[np.ndarray]:
+    """Parse the ASCII data section of a DX file in blocks
+
+    Values are yielded in file order (z fastest) as float64 arrays, and
+    parsing stops after ``count`` values or at the trailing field
+    definition.
+
+    :param stream: Text stream positioned at the first data item
+    :param count: Number of values to read
+    :param chunk_chars: Number of characters to parse per block
+    :return: Iterator over consecutive blocks of values
+    :raises ValueError: if the data section holds fewer than count values
+    """
+    remaining = count
+    tail = ""
+    finished = False
+    while remaining > 0 and not finished:
+        text = stream.read(chunk_chars)
+        finished = not text
+        text = tail + text
+        tail = ""
+        if not finished:
+            # Hold back a token that may have been split by the read
+            cut = _last_whitespace(text)
+            if cut < 0:
+                tail = text
+                continue
+            text, tail = text[:cut], text[cut:]
+
+        trailer = _find_trailer(text)
+        if trailer >= 0:
+            text = text[:trailer]
+            finished = True
+
+        values = np.fromstring(text, sep=" ") if text.strip() else None
+        if values is None or not len(values):
+            continue
+        values = values[:remaining]
+        remaining -= len(values)
+        yield values
+
+    if remaining:
+        raise ValueError(
+            f"DX data section ended after {count - remaining} of "
+            f"{count} values"
+        )
+
+
+def format_dx_header(
+    dims, spaces, mins, title: str = "", binary: bool = False
+) -> str:
+    """Format the OpenDX header the way Vgrid_writeDX does
+
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction
+    :param mins: Grid lower corner
+    :param title: Title written in the comment block
+    :param binary: Declare a raw binary (DXBIN) data section
+    :return: Header text ending with the "data follows" line
+    """
+    nx, ny, nz = (int(n) for n in dims)
+    hx, hy, hz = (float(h) for h in spaces)
+    prec = "%12.6e %12.6e %12.6e"
+    return (
+        f"# Data from APBS {__version__}\n"
+        "# \n"
+        f"# {title}\n"
+        "# \n"
+        f"object 1 class gridpositions counts {nx} {ny} {nz}\n"
+        f"origin {prec % tuple(float(lo) for lo in mins)}\n"
+        f"delta {prec % (hx, 0.0, 0.0)}\n"
+        f"delta {prec % (0.0, hy, 0.0)}\n"
+        f"delta {prec % (0.0, 0.0, hz)}\n"
+        f"object 2 class gridconnections counts {nx} {ny} {nz}\n"
+        f"object 3 class array type double rank 0 items {nx * ny * nz}"
+        f"{' binary' if binary else ''} data follows\n"
+    )
+
+
+def format_exponential(
+    values: np.ndarray, decimals: int, width: int = 0
+) -> np.ndarray:
+    """Characters of ``"%{width}.{decimals}e" % value`` for many values
+
+    Builds the characters for the whole block with array arithmetic.
+    Values that cannot be handled that way (non-finite, extreme exponents
+    or too close to a rounding tie to decide in floating point) are
+    formatted individually.
+
+    :param values: 1D array of values
+    :param decimals: Number of digits after the decimal point
+    :param width: Minimum field width (padded with spaces on the left)
+    :return: (n, columns) uint8 array with one value per row, in which NUL
+             marks the unused columns
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    mag = np.abs(values)
+    fast = np.isfinite(values) & (
+        (mag == 0.0) | ((mag > 1e-300) & (mag < 1e300))
+    )
+    safe = np.where(fast & (mag > 0.0), mag, 1.0)
+
+    # Decimal exponent and the significant digits
+    exp = np.floor(np.log10(safe)).astype(np.int64)
+    scaled = safe / 10.0 ** exp
+    exp[scaled >= 10.0] += 1
+    exp[scaled < 1.0] -= 1
+    scaled = safe / 10.0 ** exp * 10.0 ** decimals
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-5
+    digits = np.floor(scaled + 0.5).astype(np.int64)
+    carry = digits >= 10 ** (decimals + 1)
+    digits[carry] //= 10
+    exp[carry] += 1
+    zero = mag == 0.0
+    digits[zero] = 0
+    exp[zero] = 0
+    aexp = np.abs(exp)
+
+    # Leading padding columns, then "-d.ddd...e+dd[d]"
+    pad = max(0, width - decimals - 6)
+    rows = np.zeros((len(values), pad + decimals + 8), dtype=np.uint8)
+    if pad:
+        size = decimals + 6 + np.signbit(values) + (aexp >= 100)
+        short = (width - size)[:, np.newaxis] > np.arange(pad)[::-1]
+        rows[:, :pad] = np.where(short, ord(" "), 0)
+    rows[:, pad] = np.where(np.signbit(values), ord("-"), 0)
+    rows[:, pad + 1] = ord("0") + digits // 10 ** decimals
+    rows[:, pad + 2] = ord(".")
+    rest = digits % 10 ** decimals
+    col = pad + 3
+    if decimals % 3 == 0:
+        for group in range(decimals // 3 - 1, -1, -1):
+            rows[:, col:(col + 3)] = _TRIPLETS[(rest // 1000 ** group) % 1000]
+            col += 3
+    else:
+        for place in range(decimals - 1, -1, -1):
+            rows[:, col] = ord("0") + (rest // 10 ** place) % 10
+            col += 1
+    rows[:, col] = ord("e")
+    rows[:, col + 1] = np.where(exp < 0, ord("-"), ord("+"))
+    rows[:, (col + 2):(col + 5)] = _TRIPLETS[aexp]
+    rows[aexp < 100, col + 2] = 0
+
+    for idx in np.flatnonzero(~fast | tie):
+        text = ("%*.*e" % (width, decimals, values[idx])).encode("ascii")
+        rows[idx] = 0
+        rows[idx, :len(text)] = np.frombuffer(text, dtype=np.uint8)
+    return rows
+
+
+def format_dx_values(values: np.ndarray) -> str:
+    """Format a block of values as DX data lines, three per line
+
+    Produces exactly the text of ``"%12.6e "`` per value with a newline
+    after every third one, using :func:`format_exponential`.
+
+    A trailing partial line is terminated as well, so blocks should hold a
+    multiple of three values except for the last one.
+
+    :param values: 1D array of values in file order
+    :return: Text of the data lines
+    """
+    chars = format_exponential(values, 6, 12)
+    rows = np.zeros((len(chars), chars.shape[1] + 2), dtype=np.uint8)
+    rows[:, :-2] = chars
+    rows[:, -2] = ord(" ")
+    rows[2::3, -1] = ord("\n")
+    if len(rows) % 3:
+        rows[-1, -1] = ord("\n")
+    return rows[rows != 0].tobytes().decode("ascii")
+
+
+def iter_dx_blocks(
+    slabs: Iterable[np.ndarray], block_values: int = DX_BLOCK_VALUES
+) -> Iterator[np.ndarray]:
+    """Regroup consecutive slabs into flat blocks of whole DX lines
+
+    Every block except the last holds a multiple of three values, so each
+    one can be formatted independently by :func:`format_dx_values`.
+
+    :param slabs: Consecutive slabs of the grid in file (z fastest) order
+    :param block_values: Approximate number of values per block
+    :return: Iterator over flat float64 blocks
+    """
+    step = max(3, block_values - block_values % 3)
+    carry = np.empty(0)
+    for slab in slabs:
+        flat = np.ravel(slab)
+        if len(carry):
+            flat = np.concatenate([carry, flat])
+        full = len(flat) - len(flat) % 3
+        for start in range(0, full, step):
+            stop = min(start + step, full)
+            yield flat[start:stop]
+        carry = flat[full:]
+    if len(carry):
+        yield carry
+
+
+def iter_dx_text(
+    blocks: Iterable[np.ndarray], workers: Optional[int] = None
+) -> Iterator[str]:
+    """Format blocks of values as DX text, optionally in worker processes
+
+    With workers, a bounded window of blocks is formatted concurrently and
+    the text is still yielded in block order.
+
+    :param blocks: Blocks from :func:`iter_dx_blocks`
+    :param workers: Number of worker processes (None or 1 formats in this
+                    process)
+    :return: Iterator over the formatted text of each block
+    """
+    if workers is None or workers <= 1:
+        for block in blocks:
+            yield format_dx_values(block)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for block in blocks:
+            pending.append(pool.submit(format_dx_values, block))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_dx_stream(
+    stream: IO[str],
+    data: np.ndarray,
+    dims,
+    spaces,
+    mins,
+    title: str = "",
+    workers: Optional[int] = None,
+) -> None:
+    """Write a complete ASCII DX file to a text stream
+
+    The data section is formatted one block at a time, so the stream may
+    be a compressed file without the full text ever being held.
+
+    :param stream: Writable text stream
+    :param data: (nx, ny, nz) array
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction
+    :param mins: Grid lower corner
+    :param title: Title written in the comment block
+    :param workers: Number of worker processes formatting blocks
+    """
+    slabs = (slab for _, slab in iter_slabs(np.asarray(data)))
+    write_dx_slabs(stream, slabs, dims, spaces, mins, title, workers)
+
+
+def write_dx_slabs(
+    stream: IO[str],
+    slabs: Iterable[np.ndarray],
+    dims,
+    spaces,
+    mins,
+    title: str = "",
+    workers: Optional[int] = None,
+) -> None:
+    """Write an ASCII DX file whose data arrives as consecutive x-slabs
+
+    :param stream: Writable text stream
+    :param slabs: Consecutive (m, ny, nz) slabs covering the whole grid
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction
+    :param mins: Grid lower corner
+    :param title: Title written in the comment block
+    :param workers: Number of worker processes formatting blocks
+    """
+    stream.write(format_dx_header(dims, spaces, mins, title))
+    for text in iter_dx_text(iter_dx_blocks(slabs), workers):
+        stream.write(text)
+    stream.write(DX_TRAILER)
+
+
+def write_dxbin_slabs(
+    stream: IO[bytes],
+    slabs: Iterable[np.ndarray],
+    dims,
+    spaces,
+    mins,
+    title: str = "",
+) -> None:
+    """Write a binary DX (DXBIN) file whose data arrives as x-slabs
+
+    :param stream: Writable binary stream
+    :param slabs: Consecutive (m, ny, nz) slabs covering the whole grid
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction
+    :param mins: Grid lower corner
+    :param title: Title written in the comment block
+    """
+    stream.write(format_dx_header(dims, spaces, mins, title, True).encode())
+    for slab in slabs:
+        stream.write(np.ascontiguousarray(slab, DXBIN_DTYPE).tobytes())
+    stream.write(("\n" + DX_TRAILER).encode())
+
+
+def create_dxbin(fn: str, dims, spaces, mins, title: str = "") -> np.memmap:
+    """Create a DXBIN file and memory map its (uninitialized) payload
+
+    The header and trailer are written immediately and the payload is
+    left as a hole in the file, to be filled in through the returned
+    writable map in any order.
+
+    :param fn: Path of the DXBIN file
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction
+    :param mins: Grid lower corner
+    :param title: Title written in the comment block
+    :return: Writable (nx, ny, nz) memory map of the payload
+    """
+    dims = tuple(int(n) for n in dims)
+    header = format_dx_header(dims, spaces, mins, title, True).encode()
+    payload = int(np.prod(dims)) * DXBIN_DTYPE.itemsize
+    with open(fn, "wb") as stream:
+        stream.write(header)
+        stream.seek(len(header) + payload)
+        stream.write(("\n" + DX_TRAILER).encode())
+    return np.memmap(
+        fn, DXBIN_DTYPE, mode="r+", offset=len(header), shape=dims
+    )
+
+
+@contextmanager
+def replacing(fn: str) -> Iterator[str]:
+    """Temporary path that replaces fn once the block completes
+
+    Output is written next to fn and only moved onto it at the end, so fn
+    can be one of the inputs still being streamed or memory mapped (they
+    keep reading the old file). On error fn is left untouched.
+
+    :param fn: Path of the output file
+    :return: Path of the temporary file to write
+    """
+    target = os.path.realpath(fn)
+    handle, tmp = tempfile.mkstemp(
+        prefix=f".{os.path.basename(target)}.",
+        dir=os.path.dirname(target),
+    )
+    os.close(handle)
+    try:
+        yield tmp
+        try:
+            mode = stat.S_IMODE(os.stat(target).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp, mode)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def iter_dx_planes(
+    stream: IO[str],
+    header: DXHeader,
+    planes: int,
+    chunk_chars: int = DX_CHUNK_CHARS,
+) -> Iterator[np.ndarray]:
+    """Parse the ASCII data section as consecutive slabs of x-planes
+
+    :param stream: Text stream positioned at the first data item
+    :param header: The header describing the data
+    :param planes: Number of x-planes per slab (the last may be shorter)
+    :param chunk_chars: Number of characters to parse per block
+    :return: Iterator over (m, ny, nz) float64 slabs
+    """
+    nx, ny, nz = header.dims
+    plane = ny * nz
+    slab = np.empty(0)
+    fill = 0
+    done = 0
+    for values in iter_dx_values(stream, header.count, chunk_chars):
+        while len(values):
+            if fill == len(slab):
+                slab = np.empty(min(planes, nx - done) * plane)
+                fill = 0
+            take = min(len(values), len(slab) - fill)
+            stop = fill + take
+            slab[fill:stop] = values[:take]
+            values = values[take:]
+            fill = stop
+            if fill == len(slab):
+                done += len(slab) // plane
+                yield slab.reshape(-1, ny, nz)
+
+
+def read_dx_data(
+    stream: IO[str], header: DXHeader, dtype=np.float64, reducer=None
+) -> np.ndarray:
+    """Read the ASCII data section into a preallocated array
+
+    :param stream: Text stream positioned at the first data item
+    :param header: The header describing the data
+    :param dtype: Type of the returned array
+    :param reducer: Optional object (e.g. a SlabReducer) whose
+                    ``update`` is given the x-planes as they are completed
+    :return: (nx, ny, nz) array
+    """
+    nx, ny, nz = header.dims
+    plane = ny * nz
+    data = np.empty(header.count, dtype=dtype)
+    pos = 0
+    fed = 0
+    for values in iter_dx_values(stream, header.count):
+        end = pos + len(values)
+        data[pos:end] = values
+        pos = end
+        if reducer is not None and plane and pos // plane > fed:
+            done = pos // plane
+            reducer.update(
+                data[(fed * plane):(done * plane)].reshape(-1, ny, nz)
+            )
+            fed = done
+    return data.reshape(header.dims)
+
+
+def _last_whitespace(text: str) -> int:
+    """Index of the last whitespace character in text (or -1)"""
+    return max(text.rfind(char) for char in " \n\t\r")
+
+
+def _find_trailer(text: str) -> int:
+    """Index of the first field definition keyword in text (or -1)"""
+    found = [text.find(keyword) for keyword in _TRAILER_KEYWORDS]
+    found = [idx for idx in found if idx >= 0]
+    return min(found) if found else -1
@@ -0,0 +1,294 @@
+"""
+Out-of-core arithmetic on grids.
+
+Pulled over from tools/mesh/dxmath.c, but the operands are streamed one
+slab of x-planes at a time instead of being loaded whole.
+"""
+import gzip
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+from .chunked import as_grid_array
+from .dx import (
+    DX_BUFFER_BYTES,
+    DX_CHUNK_CHARS,
+    iter_dx_planes,
+    read_dx_header,
+    replacing,
+    write_dx_slabs,
+    write_dxbin_slabs,
+)
+from .grid import Grid
+from .reduction import SLAB_BYTES, slab_planes
+import numpy as np
+
+# Binary operators understood by dxmath scripts
+DXMATH_OPERATORS = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.divide,
+    "^": np.power,
+}
+
+
+def _is_dxbin(path: str) -> bool:
+    return str(path).lower().endswith(".dxbin")
+
+
+def _is_gz(path: str) -> bool:
+    return str(path).lower().endswith(".gz")
+
+
+class SlabSource:
+    """
+    A grid whose data can be walked in slabs of x-planes, wherever it
+    lives: in memory, memory mapped from a DXBIN file, or parsed on the fly
+    from an ASCII (optionally gzip-compressed) DX file.
+
+    Attributes:
+        dims   : Number of grid points in each direction
+        spaces : Grid spacing in each direction
+        mins   : Grid lower corner
+    """
+
+    def __init__(self, source: Union[Grid, str]):
+        """
+        :param source: Grid, or path of a .dx, .dx.gz or .dxbin file
+        """
+        self.path = None
+        self.grid = None
+        if isinstance(source, Grid):
+            self.grid = source
+        elif _is_dxbin(source):
+            self.grid = Grid()
+            self.grid.read_dxbin(source, mmap=True)
+        else:
+            self.path = str(source)
+            with self._open() as stream:
+                header = read_dx_header(stream)
+            self.dims = tuple(header.dims)
+            self.spaces = tuple(header.spaces)
+            self.mins = tuple(header.mins)
+        if self.grid is not None:
+            if self.grid.data is None:
+                raise RuntimeError("No data available.")
+            dims, spaces, mins = self.grid.lattice()[:3]
+            self.dims = tuple(int(n) for n in dims)
+            self.spaces = tuple(spaces)
+            self.mins = tuple(mins)
+
+    def _open(self):
+        if _is_gz(self.path):
+            return gzip.open(self.path, "rt")
+        return open(self.path, "r")
+
+    def slabs(
+        self, planes: int, chunk_chars: int = DX_CHUNK_CHARS
+    ) -> Iterator[np.ndarray]:
+        """Walk the data in slabs of consecutive x-planes
+
+        :param planes: Number of x-planes per slab (the last may be shorter)
+        :param chunk_chars: Characters parsed per block for ASCII files
+        :return: Iterator over (m, ny, nz) slabs
+        """
+        if self.grid is not None:
+            # Chunked files only decompress the blocks of each slab
+            data = as_grid_array(self.grid.data)
+            for start in range(0, self.dims[0], planes):
+                slab = data[start:(start + planes)]
+                yield np.asarray(slab, dtype=np.float64)
+            return
+        with self._open() as stream:
+            header = read_dx_header(stream)
+            yield from iter_dx_planes(stream, header, planes, chunk_chars)
+
+
+def evaluate(
+    expression: Callable[..., np.ndarray],
+    operands: Sequence[Union[Grid, str]],
+    output: Optional[str] = None,
+    title: str = "",
+    slab_bytes: int = SLAB_BYTES,
+    workers: Optional[int] = None,
+) -> Optional[Grid]:
+    """Evaluate an element-wise expression over same-shape grids
+
+    ``expression`` is called once per slab with one (m, ny, nz) float64
+    slab per operand, e.g. ``lambda a, b, c: a - b - c``, and must return
+    the matching slab of the result. The slab budget is shared among the
+    operands, so peak memory stays at a few slabs however many grids are
+    combined. The result takes its geometry from the first operand.
+
+    :param expression: Element-wise function of the operand slabs
+    :param operands: Grids, or paths of .dx, .dx.gz or .dxbin files
+    :param output: Path of a .dx, .dx.gz or .dxbin file to stream the
+                   result to; if None the result is returned as a Grid
+    :param title: Title written in the output header comments
+    :param slab_bytes: Upper bound on the bytes of all operand slabs held
+                       at once
+    :param workers: Number of worker processes formatting ASCII output
+    :returns: The result grid, or None when written to ``output``
+    """
+    sources = [SlabSource(operand) for operand in operands]
+    if not sources:
+        raise ValueError("At least one operand is required.")
+    dims = sources[0].dims
+    for source in sources[1:]:
+        if source.dims != dims:
+            raise ValueError(
+                f"Grid dimension mis-match: {dims} and {source.dims}"
+            )
+    spaces, mins = sources[0].spaces, sources[0].mins
+
+    budget = slab_bytes // (len(sources) + 1)
+    planes = slab_planes(dims, 8, budget)
+    chunk_chars = max(1 << 16, min(DX_CHUNK_CHARS, budget))
+    streams = [source.slabs(planes, chunk_chars) for source in sources]
+    slabs = (
+        np.asarray(expression(*group), dtype=np.float64)
+        for group in zip(*streams)
+    )
+
+    if output is None:
+        data = np.empty(dims)
+        start = 0
+        for slab in slabs:
+            stop = start + len(slab)
+            data[start:stop] = slab
+            start = stop
+        return Grid.from_array(data, spaces, mins)
+
+    # The output may also be an operand, so it is only replaced once the
+    # last slab has been read
+    with replacing(output) as target:
+        if _is_dxbin(output):
+            with open(target, "wb") as stream:
+                write_dxbin_slabs(stream, slabs, dims, spaces, mins, title)
+        elif _is_gz(output):
+            with gzip.open(target, "wt") as stream:
+                write_dx_slabs(
+                    stream, slabs, dims, spaces, mins, title, workers
+                )
+        else:
+            with open(target, "w", buffering=DX_BUFFER_BYTES) as stream:
+                write_dx_slabs(
+                    stream, slabs, dims, spaces, mins, title, workers
+                )
+    return None
+
+
+class DXMath:
+    """
+    Pulled over from tools/mesh/dxmath.c
+
+    A dxmath command file alternates operands and operators, starting with
+    a grid and ending with the output path followed by ``=``::
+
+        qdens-complex.dx
+        qdens-pep.dx -
+        qdens-rna.dx -
+        qdens-diff.dx =
+
+    Operands are grid paths or scalars; operators are applied from left to
+    right as in the original program.
+
+    Attributes:
+        operands  : Grid paths (str) or scalars (float)
+        operators : One operator per operand after the first
+        output    : Path the result is written to
+    """
+
+    def __init__(
+        self,
+        operands: List[Union[str, float]],
+        operators: List[str],
+        output: str,
+    ):
+        """
+        :param operands: Grid paths or scalars, the first being a grid
+        :param operators: Operators from :data:`DXMATH_OPERATORS`
+        :param output: Path the result is written to
+        """
+        if not operands or not isinstance(operands[0], str):
+            raise ValueError("First argument must be a grid")
+        if len(operators) != len(operands) - 1:
+            raise ValueError("Expected one operator per additional operand")
+        for op in operators:
+            if op not in DXMATH_OPERATORS:
+                raise ValueError(f"Undefined operation '{op}'!")
+        self.operands = operands
+        self.operators = operators
+        self.output = output
+
+    @classmethod
+    def parse(cls, text: str) -> "DXMath":
+        """Parse the contents of a dxmath command file
+
+        :param text: Command text; # and % start comments
+        :returns: The parsed command
+        """
+        tokens = []
+        for line in text.splitlines():
+            for comment in "#%":
+                line = line.split(comment, 1)[0]
+            tokens.extend(line.split())
+        if not tokens:
+            raise ValueError("Ran out of tokens when parsing initial input!")
+
+        operands = [tokens[0]]
+        operators = []
+        pos = 1
+        while pos < len(tokens):
+            if pos + 1 >= len(tokens):
+                raise ValueError(
+                    f"Ran out of tokens when parsing input at {tokens[pos]}"
+                )
+            operand, op = tokens[pos], tokens[pos + 1]
+            pos += 2
+            if op == "=":
+                return cls(operands, operators, operand)
+            try:
+                operand = float(operand)
+            except ValueError:
+                pass
+            operands.append(operand)
+            operators.append(op)
+        raise ValueError("No output grid given with '='")
+
+    @classmethod
+    def read(cls, path: str) -> "DXMath":
+        """Parse a dxmath command file
+
+        :param path: Path of the command file
+        :returns: The parsed command
+        """
+        with open(path, "r") as stream:
+            return cls.parse(stream.read())
+
+    def __call__(self, *slabs: np.ndarray) -> np.ndarray:
+        """Combine one slab of every grid operand"""
+        grids = iter(slabs)
+        result = np.array(next(grids), dtype=np.float64)
+        for op, operand in zip(self.operators, self.operands[1:]):
+            value = operand if isinstance(operand, float) else next(grids)
+            DXMATH_OPERATORS[op](result, value, out=result)
+        return result
+
+    def run(
+        self,
+        slab_bytes: int = SLAB_BYTES,
+        workers: Optional[int] = None,
+    ) -> None:
+        """Evaluate the command and write the result to :attr:`output`
+
+        :param slab_bytes: Upper bound on the bytes of all operand slabs
+                           held at once
+        :param workers: Number of worker processes formatting ASCII output
+        """
+        grids = [op for op in self.operands if isinstance(op, str)]
+        evaluate(
+            self,
+            grids,
+            self.output,
+            slab_bytes=slab_bytes,
+            workers=workers,
+        )
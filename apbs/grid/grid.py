@@ -1,8 +1,55 @@
-from typing import List, Optional
-from apbs.geometry import Coordinate, Constants
+import gzip
+import os
+from typing import Iterator, List, Optional, Tuple, Union
+from apbs.geometry import Coordinate, CoordinateArray, Constants
+from .chunked import (
+    CHUNK_CACHE_BLOCKS,
+    CHUNK_DIMS,
+    ChunkCodec,
+    ChunkedArray,
+    as_grid_array,
+    write_chunked,
+)
+from .dx import (
+    DX_BUFFER_BYTES,
+    DXBIN_DTYPE,
+    read_dx_data,
+    read_dx_header,
+    replacing,
+    write_dx_slabs,
+    write_dxbin_slabs,
+)
+from .reduction import SLAB_BYTES, SlabReducer, iter_slabs, slab_planes
+from .resample import resample
+from .sidecar import GridStats, StatsReducer, load_stats, save_stats
+from .uhbd import (
+    iter_z_planes,
+    read_uhbd_data,
+    read_uhbd_header,
+    read_uhbdbin,
+    write_uhbd_stream,
+    write_uhbdbin_stream,
+)
 import numpy as np
 
 
+def _to_array(vals, dtype=np.float64) -> np.ndarray:
+    """Convert a Coordinate (or any 3-sequence) into a numpy array"""
+    if isinstance(vals, Coordinate):
+        vals = (vals.x, vals.y, vals.z)
+    return np.array(vals, dtype=dtype).reshape(3)
+
+
+def _as_points(points) -> np.ndarray:
+    """Convert a Coordinate, CoordinateArray or array-like of points into an
+    (N, 3) array"""
+    if isinstance(points, Coordinate):
+        return _to_array(points).reshape(1, 3)
+    if isinstance(points, CoordinateArray):
+        return points.data
+    return np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+
 class CurvatureFlag:
     """Enum class to replace curvature flags in original source"""
 
@@ -12,6 +59,14 @@ class CurvatureFlag:
     TrueMaximalCurvature = 3
 
 
+_CURVATURE_FLAGS = (
+    CurvatureFlag.ReducedMaximalCurvature,
+    CurvatureFlag.MeanCurvature,
+    CurvatureFlag.GaussCurvature,
+    CurvatureFlag.TrueMaximalCurvature,
+)
+
+
 class Grid:
     """
     Pulled over from src/mg/vgrid.(h|c)
@@ -26,9 +81,22 @@ class Grid:
         maxs       : Maximums in a given direction.
                      Previously xmax, ymax, zmax.
         data       : nx*ny*nz array of data
+        dtype      : Storage type of data read into the grid (float64 by
+                     default; float32 halves memory, while reductions and
+                     interpolation still accumulate in float64)
+        dp         : dict for dynamic programming of values derived from the
+                     data (e.g. the gradient field)
     """
 
-    def __init__(self, dims, spaces, mins, maxs, data: Optional[List[float]]):
+    def __init__(
+        self,
+        dims=None,
+        spaces=None,
+        mins=None,
+        maxs=None,
+        data: Optional[List[float]] = None,
+        dtype=None,
+    ):
         """Grid constructor
 
         Parameters
@@ -38,14 +106,56 @@ class Grid:
             maxs:   Initializes member variable with the same name.
             data:   Optionally sets the data for the grid
                     (may leave None if will be set later)
+            dtype:  Storage type of the data, e.g. np.float32; data given
+                    here is converted to it and the read methods store
+                    their data in it (float64 if left out)
+
+        All of the parameters may be left out when the grid will be filled
+        by one of the read methods.
         """
         self.dims: Coordinate[int] = dims
         self.spaces: Coordinate[int] = spaces
         self.mins: Coordinate[int] = mins
         self.maxs: Coordinate[int] = maxs
+        self._dp = {}
+        self.dtype = np.dtype(np.float64 if dtype is None else dtype)
+        if dtype is not None and data is not None:
+            data = np.asarray(data, dtype=self.dtype)
         self.data: Optional[List[float]] = data
 
-    def value(self, pt: Coordinate[float]) -> float:
+    @classmethod
+    def from_array(cls, data, spaces, mins, dtype=None) -> "Grid":
+        """Grid holding (nx, ny, nz) node values on a lattice
+
+        :param data: (nx, ny, nz) array of node values (kept as is unless
+                     dtype is given, so views and memory maps are not
+                     copied)
+        :param spaces: Grid spacing in each direction
+        :param mins: Grid lower corner
+        :param dtype: Storage type of the data (float64 if left out)
+        :returns: The grid, its dims taken from the shape of data
+        """
+        if not hasattr(data, "shape"):
+            data = np.asarray(data)
+        if len(data.shape) != 3:
+            raise ValueError(f"Grid data must be 3D, got shape {data.shape}")
+        grid = cls(data=data, dtype=dtype)
+        grid._set_lattice(data.shape, spaces, mins)
+        return grid
+
+    @property
+    def data(self) -> Optional[np.ndarray]:
+        """Node values; replacing the data clears any cached results"""
+        return self._data
+
+    @data.setter
+    def data(self, data: Optional[np.ndarray]) -> None:
+        self._data = data
+        self._dp = {}
+
+    def value(
+        self, pt: Union[Coordinate[float], CoordinateArray]
+    ) -> Union[float, np.ndarray]:
         """Get potential value (from mesh or approximation) at a point
 
         :note: Previously returned by pointer, using return code as an error
@@ -53,131 +163,361 @@ class Grid:
                 This has been replaced by returning the value and raising an
                 exception on error.
 
-        :param   x    : Coordinate at which to evaluate potential
-        :returns      : value of grid
+        :param   x    : Coordinate at which to evaluate potential, or a
+                        CoordinateArray of points
+        :returns      : value of grid (an (N,) array for a CoordinateArray)
+        """
+
+        if isinstance(pt, CoordinateArray):
+            values, _ = self.values(pt)
+            failed = np.flatnonzero(np.isnan(values))
+            if len(failed):
+                raise RuntimeError(
+                    "Value routine failed to converge with the following "
+                    f"coordinate:\n\tCoordinate: {pt[int(failed[0])]}\n"
+                )
+            return values
+
+        values, _ = self.values(np.array([[pt.x, pt.y, pt.z]]))
+        ret_value = float(values[0])
+
+        if np.isnan(ret_value):
+            # TODO: Add a more descriptive error
+            raise RuntimeError(
+                "Value routine failed to converge with the following "
+                f"coordinate:\n\tCoordinate: {pt}\n"
+            )
+
+        return ret_value
+
+    def values(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Trilinearly interpolate the grid at many points at once
+
+        Batch version of :meth:`value`: the same epsilon snapping is applied
+        at ``mins`` and ``maxs``, but points falling off the mesh are
+        flagged in the returned mask (and given a value of 0.0) instead of
+        being treated one at a time.
+
+        :param points: (N, 3) array of x, y, z coordinates (or a
+                       CoordinateArray)
+        :returns: tuple of the (N,) interpolated values and an (N,) boolean
+                  mask which is True where the point is off the grid
         """
 
         if self.data is None:
             raise RuntimeError("No data available.")
 
-        ret_value = float(0)
+        return self._interpolate(as_grid_array(self.data), _as_points(points))
 
-        tmp = Coordinate(
-            (pt.x - self.mins.x) / self.spaces.x,
-            (pt.y - self.mins.y) / self.spaces.y,
-            (pt.z - self.mins.z) / self.spaces.z,
-        )
+    def _interpolate(
+        self, data: np.ndarray, points: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Trilinear interpolation of node data laid out on this grid
 
-        hi = Coordinate(
-            int(np.ceil(tmp.x)), int(np.ceil(tmp.y)), int(np.ceil(tmp.z))
-        )
-        lo = Coordinate(
-            int(np.floor(tmp.x)),
-            int(np.floor(tmp.y)),
-            int(np.floor(tmp.z)),
-        )
+        :param data: (nx, ny, nz, ...) array of node values; any trailing
+                     axes are interpolated component-wise
+        :param points: (N, 3) array of points
+        :returns: tuple of (N, ...) values and (N,) off-grid mask
+        """
+        dims, spaces, mins, maxs = self.lattice()
+
+        tmp = (points - mins) / spaces
+        lo = np.floor(tmp).astype(np.intp)
+        hi = np.ceil(tmp).astype(np.intp)
+
+        # Snap points within epsilon of the boundaries onto the mesh
+        lo[np.abs(points - mins) < Constants.epsilon] = 0
+        at_max = np.abs(points - maxs) < Constants.epsilon
+        hi[at_max] = np.broadcast_to(dims - 1, hi.shape)[at_max]
+
+        on_grid = np.all((lo >= 0) & (hi < dims), axis=1)
+        off_grid = ~on_grid
+
+        # Clamp the off-grid indices so the gathers below stay in bounds;
+        # their values are zeroed afterwards.
+        lo = np.clip(lo, 0, dims - 1)
+        hi = np.clip(hi, 0, dims - 1)
+        frac = (tmp - lo).reshape((-1, 3) + (1,) * (data.ndim - 3))
+        dx, dy, dz = frac[:, 0], frac[:, 1], frac[:, 2]
+        ex, ey, ez = 1.0 - dx, 1.0 - dy, 1.0 - dz
 
-        hi.x = (
-            self.dims.x - 1
-            if abs(pt.x - self.maxs.x) < Constants.epsilon
-            else hi.x
+        ilo, jlo, klo = lo[:, 0], lo[:, 1], lo[:, 2]
+        ihi, jhi, khi = hi[:, 0], hi[:, 1], hi[:, 2]
+        ret = (
+            dx * dy * dz * data[ihi, jhi, khi]
+            + dx * ey * dz * data[ihi, jlo, khi]
+            + dx * dy * ez * data[ihi, jhi, klo]
+            + dx * ey * ez * data[ihi, jlo, klo]
+            + ex * dy * dz * data[ilo, jhi, khi]
+            + ex * ey * dz * data[ilo, jlo, khi]
+            + ex * dy * ez * data[ilo, jhi, klo]
+            + ex * ey * ez * data[ilo, jlo, klo]
         )
-        hi.y = (
-            self.dims.y - 1
-            if abs(pt.y - self.maxs.y) < Constants.epsilon
-            else hi.y
+        ret[off_grid] = 0.0
+
+        return ret, off_grid
+
+    def lattice(
+        self,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Get the grid geometry as float64/integer arrays
+
+        The same values as the :attr:`dims`, :attr:`spaces`, :attr:`mins`
+        and :attr:`maxs` Coordinates, for vectorized code.
+
+        :returns: tuple of dims, spaces, mins and maxs as numpy arrays
+        """
+        return (
+            _to_array(self.dims, np.intp),
+            _to_array(self.spaces),
+            _to_array(self.mins),
+            _to_array(self.maxs),
         )
-        hi.z = (
-            self.dims.z - 1
-            if abs(pt.z - self.maxs.z) < Constants.epsilon
-            else hi.z
+
+    def curvature(
+        self, points: np.ndarray, cflag: CurvatureFlag
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get second derivative values at many points
+
+        Second derivatives are taken with centered finite differences of
+        the interpolated field using the grid spacing as the step.
+
+        :note: Previously returned a success code for a single point; now
+               returns an off-grid mask for a batch of points.  The C code
+               only supported the reduced maximal and mean curvatures; here
+               the Gauss curvature is the determinant of the Hessian and the
+               true maximal curvature is its largest eigenvalue magnitude.
+
+        :param   points: (N, 3) array of locations (or a single Coordinate)
+        :param   cflag  : Curvature method
+        :returns        : tuple of the (N,) curvature values and an (N,)
+                          boolean mask which is True where any stencil point
+                          is off the grid
+        """
+        if cflag not in _CURVATURE_FLAGS:
+            raise ValueError(f"Unknown curvature flag {cflag}")
+
+        points = _as_points(points)
+        spaces = self.lattice()[1]
+        full = cflag in (
+            CurvatureFlag.GaussCurvature,
+            CurvatureFlag.TrueMaximalCurvature,
         )
 
-        lo.x = 0 if abs(pt.x - self.mins.x) < Constants.eps else lo.x
-        lo.y = 0 if abs(pt.y - self.mins.y) < Constants.eps else lo.y
-        lo.z = 0 if abs(pt.z - self.mins.z) < Constants.eps else lo.z
-
-        if hi < self.dims:
-            dx, dy, dz = tmp.x - lo.x, tmp.y - lo.y, tmp.z - lo.z
-            ret_value = [
-                float(dx * dy * dz * self.data[hi.x, hi.y, hi.z]),
-                float(dx * (1.0 - dy) * dz * self.data[hi.x, lo.y, hi.z]),
-                float(dx * dy * (1.0 - dz) * self.data[hi.x, hi.y, lo.z]),
-                float(
-                    dx * (1.0 - dy) * (1.0 - dz) * self.data[hi.x, lo.y, lo.z]
-                ),
-                float((1.0 - dx) * dy * dz * self.data[lo.x, hi.y, hi.z]),
-                float(
-                    (1.0 - dx) * (1.0 - dy) * dz * self.data[lo.x, lo.y, hi.z]
-                ),
-                float(
-                    (1.0 - dx) * dy * (1.0 - dz) * self.data[lo.x, hi.y, lo.z]
-                ),
-                float(
-                    (1.0 - dx)
-                    * (1.0 - dy)
-                    * (1.0 - dz)
-                    * self.data[lo.x, lo.y, lo.z]
-                ),
-            ]
-
-            ret_value = sum(ret_value)
-
-            if ret_value == np.nan:
-                # TODO: Add a more descriptive error
-                raise RuntimeError(
-                    "Value routine failed to converge with the following "
-                    "coordinates:\n"
-                    f"\tLow: {lo}\n"
-                    f"\tHigh: {hi}\n"
-                    f"\tCoordinate: {pt}\n"
+        offsets = [np.zeros(3)]
+        for axis in range(3):
+            step = np.zeros(3)
+            step[axis] = spaces[axis]
+            offsets.extend((-step, step))
+        if full:
+            for a, b in ((0, 1), (0, 2), (1, 2)):
+                for sa, sb in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                    step = np.zeros(3)
+                    step[a] = sa * spaces[a]
+                    step[b] = sb * spaces[b]
+                    offsets.append(step)
+
+        u, off = self._stencil(points, np.array(offsets))
+        off_grid = off.any(axis=1)
+
+        hess = np.empty((len(points), 3, 3))
+        for axis in range(3):
+            hess[:, axis, axis] = (
+                u[:, 2 + 2 * axis] - 2.0 * u[:, 0] + u[:, 1 + 2 * axis]
+            ) / (spaces[axis] ** 2)
+
+        if cflag == CurvatureFlag.ReducedMaximalCurvature:
+            curv = np.abs(np.diagonal(hess, axis1=1, axis2=2)).max(axis=1)
+        elif cflag == CurvatureFlag.MeanCurvature:
+            curv = np.trace(hess, axis1=1, axis2=2) / 3.0
+        else:
+            for idx, (a, b) in enumerate(((0, 1), (0, 2), (1, 2))):
+                pp, pm, mp, mm = (u[:, 7 + 4 * idx + n] for n in range(4))
+                hess[:, a, b] = (pp - pm - mp + mm) / (
+                    4.0 * spaces[a] * spaces[b]
                 )
+                hess[:, b, a] = hess[:, a, b]
+            if cflag == CurvatureFlag.GaussCurvature:
+                curv = np.linalg.det(hess)
+            else:
+                curv = np.abs(np.linalg.eigvalsh(hess)).max(axis=1)
 
-        return ret_value
+        curv[off_grid] = 0.0
+        return curv, off_grid
+
+    def gradient(
+        self, points: np.ndarray, use_field: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get first derivative values at many points
+
+        Derivatives are centered finite differences of the interpolated
+        field using the grid spacing as the step, falling back to one-sided
+        differences when a neighbor is off the grid.
 
-    def curvature(self, pt: Coordinate[float], cflag: CurvatureFlag):
-        """Get second derivative values at a point
+        :note: Previously returned a success code for a single point; now
+               returns an off-grid mask for a batch of points.
 
-        :param   pt   : Location to evaluate second derivative
-        :param   cflag: Curvature method
-        :param   curv : Specified curvature value
-        :returns      : 1 if successful, 0 if off grid
+        :param   points   : (N, 3) array of locations (or a single
+                            Coordinate)
+        :param   use_field: Interpolate the precomputed
+                            :meth:`gradient_field` instead of evaluating the
+                            finite difference stencil at every point; much
+                            faster for repeated queries on the same grid
+        :returns          : tuple of the (N, 3) gradients and an (N,) boolean
+                            mask which is True where the gradient could not
+                            be evaluated
         """
-        ...
+        points = _as_points(points)
 
-    def gradient(self, pt: Coordinate[float], grad: List[float]):
-        """Get first derivative values at a point
+        if use_field:
+            grad, off_grid = self._interpolate(self.gradient_field(), points)
+            return grad, off_grid
 
-        :param   pt  : Location to evaluate gradient
-        :param   grad: Gradient
-        :returns     : 1 if successful, 0 if off grid
+        spaces = self.lattice()[1]
+        offsets = [np.zeros(3)]
+        for axis in range(3):
+            step = np.zeros(3)
+            step[axis] = spaces[axis]
+            offsets.extend((-step, step))
+
+        u, off = self._stencil(points, np.array(offsets))
+        umid = u[:, 0]
+        off_grid = off[:, 0].copy()
+
+        grad = np.zeros((len(points), 3))
+        for axis in range(3):
+            uleft, uright = u[:, 1 + 2 * axis], u[:, 2 + 2 * axis]
+            haveleft, haveright = ~off[:, 1 + 2 * axis], ~off[:, 2 + 2 * axis]
+            h = spaces[axis]
+            grad[:, axis] = np.select(
+                [haveleft & haveright, haveright, haveleft],
+                [
+                    (uright - uleft) / (2.0 * h),
+                    (uright - umid) / h,
+                    (umid - uleft) / h,
+                ],
+            )
+            off_grid |= ~(haveleft | haveright)
+
+        grad[off_grid] = 0.0
+        return grad, off_grid
+
+    def gradient_field(self) -> np.ndarray:
+        """Get the finite difference gradient at every grid node
+
+        Uses centered differences in the interior and one-sided differences
+        on the boundary, i.e. the same stencil as :meth:`gradient` evaluated
+        at the nodes.  The result is cached until :attr:`data` is replaced.
+
+        :returns: (nx, ny, nz, 3) array of gradients
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+
+        if "gradient_field" not in self._dp:
+            spaces = self.lattice()[1]
+            data = as_grid_array(self.data)
+            nx = data.shape[0]
+            field = np.empty(tuple(data.shape) + (3,))
+            # Each slab is read with one plane of context on either side,
+            # so the differences across slab boundaries stay centered
+            step = slab_planes(data.shape, 4 * field.itemsize)
+            for start in range(0, nx, step):
+                stop = min(start + step, nx)
+                lo, hi = max(start - 1, 0), min(stop + 1, nx)
+                block = np.asarray(data[lo:hi], dtype=np.float64)
+                grads = np.gradient(block, *spaces, edge_order=1)
+                for axis, grad in enumerate(grads):
+                    field[start:stop, ..., axis] = grad[
+                        (start - lo):(stop - lo)
+                    ]
+            self._dp["gradient_field"] = field
+        return self._dp["gradient_field"]
+
+    def _stencil(
+        self, points: np.ndarray, offsets: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Interpolate the grid at every point shifted by every offset
+
+        :param points: (N, 3) array of points
+        :param offsets: (S, 3) array of offsets
+        :returns: tuple of (N, S) values and (N, S) off-grid mask
         """
-        ...
+        shifted = (points[:, np.newaxis, :] + offsets).reshape(-1, 3)
+        u, off = self.values(shifted)
+        shape = (len(points), len(offsets))
+        return u.reshape(shape), off.reshape(shape)
+
+    def iter_slabs(
+        self, slab_bytes: int = SLAB_BYTES
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """Walk the data in bounded-size slabs of consecutive x-planes
+
+        :param slab_bytes: Upper bound on the slab size in bytes
+        :returns: Iterator of the first plane index and the slab view
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        return iter_slabs(as_grid_array(self.data), slab_bytes)
+
+    def reduce(self, gradient: bool = False) -> SlabReducer:
+        """Reduce the data slab by slab into integrals and norms
+
+        The result is cached until :attr:`data` is replaced.
+
+        :param gradient: Also accumulate the H1 semi-norm
+        :returns: The finished reducer
+        """
+        reducer = self._dp.get("reducer")
+        if reducer is None or (gradient and not reducer.gradient):
+            dims, spaces = self.lattice()[:2]
+            reducer = SlabReducer(dims, spaces, gradient=gradient)
+            for _, slab in self.iter_slabs():
+                reducer.update(slab)
+            self._dp["reducer"] = reducer
+        return reducer
+
+    def _reduced(self, name: str) -> float:
+        """A reduction of the data, taken from the cached :meth:`stats`
+        (e.g. those of a loaded sidecar) when there are some
+
+        :param name: Attribute name shared by SlabReducer and GridStats,
+                     e.g. "integral" or "norm_l2"
+        """
+        stats = self._dp.get("stats")
+        if stats is not None:
+            return getattr(stats, name)
+        return getattr(self.reduce(), name)
 
     def integrate(self) -> float:
-        """Get the integral of the data"""
-        ...
+        """Get the integral of the data
+
+        :note: Uses the composite trapezoid rule in all three directions.
+               Vgrid_integrate intended the same weights but reset them
+               inside each loop, so only the x boundaries were halved.
+        """
+        return self._reduced("integral")
 
     def norml1(self) -> float:
         r"""Get the \f$L_1\f$ norm of the data.  This returns the integral:
         \f[ \| u \|_{L_1} = \int_\Omega | u(x) | dx  \f]
         """
-        ...
+        return self._reduced("norm_l1")
 
     def norml2(self) -> float:
         r"""Computes the \f$L_2\f$ norm of the data."""
-        ...
+        return self._reduced("norm_l2")
 
     def norml_inf(self) -> float:
         r"""Computes the \f$L_\infty\f$ norm of the data."""
-        ...
+        return self._reduced("norm_linf")
 
     def seminormH1(self) -> float:
         r"""Get the \f$H_1\f$ semi-norm of the data.
         This returns the integral:
           \f[ | u |_{H_1} = \left( \int_\Omega |\nabla u(x)|^2 dx \right)^{1/2} \f]  # noqa: E501
         """
-        ...
+        return self.reduce(gradient=True).seminorm_h1
 
     def normH1(self) -> float:
         r"""Integral of data
@@ -186,27 +526,670 @@ class Grid:
           \f[ \| u \|_{H_1} = \left( \int_\Omega |\nabla u(x)|^2 dx
                             +        \int_\Omega |u(x)|^2 dx \right)^{1/2} \f]
         """
-        ...
+        return self.reduce(gradient=True).norm_h1
 
-    def read_dx(self, fn: str) -> None:
-        lines = open(fn, "r").readlines()
-        self.data = []
-        for line in lines:
-            lline = line.lower().strip()
+    def stats(self) -> GridStats:
+        """Per-plane statistics and a coarse histogram of the data
 
-            # skip comments
-            if lline[0] == "#":
-                continue
-            fields = lline.split(" ")
+        The result is cached until :attr:`data` is replaced; grids read
+        with ``sidecar=True`` take it from the file's sidecar instead of
+        scanning the data.
+
+        :returns: The statistics
+        """
+        if "stats" not in self._dp:
+            if self.data is None:
+                raise RuntimeError("No data available.")
+            _, spaces, mins, _ = self.lattice()
+            self._dp["stats"] = GridStats.from_data(
+                as_grid_array(self.data), spaces, mins
+            )
+        return self._dp["stats"]
+
+    def _sidecar_reducer(
+        self, fn: str, header, sidecar: bool
+    ) -> Tuple[Optional[GridStats], Optional[StatsReducer]]:
+        """Statistics of a grid file about to be read
+
+        :param fn: Path of the grid file
+        :param header: Its parsed header
+        :param sidecar: Whether the statistics are wanted at all
+        :returns: tuple of the statistics of an up-to-date sidecar, or else
+                  a reducer to gather them while the data is read
+        """
+        if not sidecar:
+            return None, None
+        stats = load_stats(fn)
+        if stats is not None and stats.dims == tuple(header.dims):
+            return stats, None
+        return None, StatsReducer(header.dims, header.spaces, header.mins)
+
+    def _read_sidecar(
+        self,
+        fn: str,
+        stats: Optional[GridStats],
+        reducer: Optional[StatsReducer],
+    ) -> None:
+        """Keep the statistics of a grid just read from fn, saving them to
+        its sidecar if they were gathered during the read
+
+        :param fn: Path of the grid file
+        :param stats: Statistics loaded from the sidecar
+        :param reducer: Reducer fed while reading (it is given the data
+                        now if the read left it in place, e.g. mapped)
+        """
+        if reducer is not None:
+            if not reducer.done:
+                for _, slab in self.iter_slabs():
+                    reducer.update(slab)
+            stats = reducer.finish()
+            save_stats(stats, fn)
+        if stats is not None:
+            self._dp["stats"] = stats
+
+    def _write_reducer(self, sidecar: bool) -> Optional[StatsReducer]:
+        """Reducer gathering :meth:`stats` while the data is written, if
+        they are wanted and not cached yet"""
+        if not sidecar or "stats" in self._dp:
+            return None
+        dims, spaces, mins = self.lattice()[:3]
+        return StatsReducer(dims, spaces, mins)
+
+    def _write_slabs(
+        self, reducer: Optional[StatsReducer]
+    ) -> Iterator[np.ndarray]:
+        """The data in slabs for writing, each fed to reducer on the way"""
+        for _, slab in self.iter_slabs():
+            if reducer is not None:
+                reducer.update(slab)
+            yield slab
 
-            # TODO: figure out what all these options mean
-            if fields[0] in ("object", "attribute", "component"):
+    def _write_sidecar(
+        self, fn: str, reducer: Optional[StatsReducer]
+    ) -> None:
+        """Save the sidecar of a grid just written to fn"""
+        if reducer is not None:
+            self._dp["stats"] = reducer.finish()
+        save_stats(self.stats(), fn)
+
+    def resample(
+        self,
+        dims=None,
+        spaces=None,
+        mins=None,
+        maxs=None,
+        order: int = 1,
+        fill: float = 0.0,
+        workers: Optional[int] = None,
+    ) -> "Grid":
+        """Interpolate the data onto another axis-aligned lattice
+
+        The target lattice spans ``mins`` to ``maxs`` (by default the
+        bounds of this grid, so smaller bounds crop) with either ``dims``
+        points or a spacing of ``spaces`` (by default the current one);
+        finer lattices upsample and coarser ones downsample. Target nodes
+        outside this grid are set to ``fill``.
+
+        :param dims: Number of target grid points in each direction
+        :param spaces: Target grid spacing (used if dims is not given)
+        :param mins: Target lower corner
+        :param maxs: Target upper corner (with spaces, the upper corner is
+                     rounded down to a whole number of cells)
+        :param order: 1 for trilinear or 3 for tricubic interpolation
+        :param fill: Value of target nodes off this grid
+        :param workers: Number of threads filling target slabs
+        :returns: New grid holding the resampled data
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        _, old_spaces, old_mins, old_maxs = self.lattice()
+        mins = old_mins if mins is None else _to_array(mins)
+        maxs = old_maxs if maxs is None else _to_array(maxs)
+        if np.any(maxs < mins):
+            raise ValueError(f"Empty bounds {mins} - {maxs}")
+        if dims is not None:
+            dims = _to_array(dims, np.intp)
+            if np.any(dims < 1):
+                raise ValueError(f"Invalid grid dimensions {dims}")
+            spaces = np.where(
+                dims > 1, (maxs - mins) / np.maximum(dims - 1, 1), old_spaces
+            )
+        else:
+            spaces = old_spaces if spaces is None else _to_array(spaces)
+            cells = np.floor((maxs - mins) / spaces + Constants.epsilon)
+            dims = cells.astype(np.intp) + 1
+
+        data = resample(
+            as_grid_array(self.data),
+            old_spaces,
+            old_mins,
+            dims,
+            spaces,
+            mins,
+            order=order,
+            fill=fill,
+            workers=workers,
+            dtype=self.dtype,
+        )
+        return Grid.from_array(data, spaces, mins, dtype=self.dtype)
+
+    def axis_coordinates(self, axis: int) -> np.ndarray:
+        """Positions of the grid nodes along one axis
+
+        :param axis: 0, 1 or 2 for x, y or z
+        :returns: (n,) array of node coordinates
+        """
+        dims, spaces, mins = self.lattice()[:3]
+        return mins[axis] + spaces[axis] * np.arange(dims[axis])
+
+    def box(self, lower, upper) -> "Grid":
+        """Select the nodes inside an axis-aligned box without copying
+
+        The returned grid shares its data with this one (a view of the
+        array, or of the memory map), with :attr:`mins` moved to the first
+        selected node.
+
+        :param lower: Lower corner of the box
+        :param upper: Upper corner of the box
+        :returns: Sub-grid holding the nodes within the box
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        dims, spaces, mins = self.lattice()[:3]
+        lower = _to_array(lower)
+        upper = _to_array(upper)
+        first = np.ceil((lower - mins) / spaces - Constants.epsilon)
+        last = np.floor((upper - mins) / spaces + Constants.epsilon)
+        first = np.maximum(first.astype(np.intp), 0)
+        last = np.minimum(last.astype(np.intp), dims - 1)
+        if np.any(last < first):
+            raise ValueError(
+                f"Box {lower} - {upper} does not contain any grid nodes"
+            )
+        index = tuple(slice(lo, hi + 1) for lo, hi in zip(first, last))
+        sub = Grid.from_array(
+            as_grid_array(self.data)[index], spaces, mins + spaces * first
+        )
+        sub.dtype = self.dtype
+        return sub
+
+    def slab(self, axis: int, lower: float, upper: float) -> "Grid":
+        """Select the nodes between two planes normal to an axis
+
+        :param axis: 0, 1 or 2 for x, y or z
+        :param lower: Lower bound along the axis
+        :param upper: Upper bound along the axis
+        :returns: Sub-grid view spanning the full extent of the other axes
+        """
+        mins = _to_array(self.mins)
+        maxs = _to_array(self.maxs)
+        mins[axis] = lower
+        maxs[axis] = upper
+        return self.box(mins, maxs)
+
+    def cylinder(
+        self,
+        center,
+        radius: float,
+        axis: int = 2,
+        lower: Optional[float] = None,
+        upper: Optional[float] = None,
+    ) -> Tuple["Grid", np.ndarray]:
+        """Select the nodes inside a cylinder parallel to an axis
+
+        :param center: Any point on the cylinder axis
+        :param radius: Cylinder radius
+        :param axis: 0, 1 or 2 for a cylinder parallel to x, y or z
+        :param lower: Lower bound along the axis (default: grid minimum)
+        :param upper: Upper bound along the axis (default: grid maximum)
+        :returns: tuple of the sub-grid view of the bounding box and a
+                  boolean mask of nodes inside the cylinder, which has
+                  length 1 along ``axis`` so it broadcasts against the data
+        """
+        center = _to_array(center)
+        mins = _to_array(self.mins)
+        maxs = _to_array(self.maxs)
+        box_lo = center - radius
+        box_hi = center + radius
+        box_lo[axis] = mins[axis] if lower is None else lower
+        box_hi[axis] = maxs[axis] if upper is None else upper
+        sub = self.box(box_lo, box_hi)
+
+        dist2 = 0.0
+        for other in range(3):
+            if other == axis:
                 continue
+            shape = [1, 1, 1]
+            shape[other] = -1
+            delta = sub.axis_coordinates(other) - center[other]
+            dist2 = dist2 + (delta ** 2).reshape(shape)
+        mask = dist2 <= radius ** 2 + Constants.epsilon
+        return sub, mask
+
+    def _masked_slabs(
+        self, mask: Optional[np.ndarray]
+    ) -> Iterator[Tuple[int, np.ndarray, Union[bool, np.ndarray]]]:
+        """Walk the data in slabs, each with the matching part of a mask
+
+        :param mask: Optional boolean mask broadcastable to the data
+        :returns: Iterator of the first plane index, the slab and its mask
+                  (True for all nodes when mask is None)
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        if mask is not None:
+            mask = np.broadcast_to(mask, self.data.shape)
+        for start, slab in self.iter_slabs():
+            if mask is None:
+                yield start, slab, True
+            else:
+                yield start, slab, mask[start:(start + len(slab))]
+
+    def _masked_sum(self, mask: Optional[np.ndarray]) -> Tuple[float, int]:
+        """Sum and number of the selected node values"""
+        total, count = 0.0, 0
+        for _, slab, where in self._masked_slabs(mask):
+            total += float(np.sum(slab, dtype=np.float64, where=where))
+            if mask is None:
+                count += slab.size
+            else:
+                count += int(np.count_nonzero(where))
+        return total, count
+
+    def sum(self, mask: Optional[np.ndarray] = None) -> float:
+        """Sum of the node values, accumulated in float64
+
+        :param mask: Optional boolean mask broadcastable to the data
+        :returns: Sum over the selected nodes
+        """
+        return self._masked_sum(mask)[0]
+
+    def mean(self, mask: Optional[np.ndarray] = None) -> float:
+        """Average of the node values
+
+        :param mask: Optional boolean mask broadcastable to the data
+        :returns: Mean over the selected nodes (NaN if none are selected)
+        """
+        total, count = self._masked_sum(mask)
+        if not count:
+            return np.nan
+        return total / count
+
+    def axis_mean(
+        self, axis: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Average the node values over the planes normal to an axis
+
+        E.g. the membrane profile of a potential along z is
+        ``grid.axis_mean(2)``; planes without any selected nodes average
+        to NaN.
+
+        :param axis: 0, 1 or 2 for x, y or z
+        :param mask: Optional boolean mask broadcastable to the data
+        :returns: tuple of the (n,) plane coordinates and (n,) averages
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        others = tuple(other for other in range(3) if other != axis)
+        nplanes = self.data.shape[axis]
+        sums = np.zeros(nplanes)
+        counts = np.zeros(nplanes, dtype=np.int64)
+        for start, slab, where in self._masked_slabs(mask):
+            part = np.sum(slab, axis=others, dtype=np.float64, where=where)
+            if mask is None:
+                npart = np.full(len(part), slab.size // slab.shape[axis])
+            else:
+                npart = np.count_nonzero(
+                    np.broadcast_to(where, slab.shape), axis=others
+                )
+            if axis == 0:
+                sums[start:(start + len(slab))] = part
+                counts[start:(start + len(slab))] = npart
+            else:
+                sums += part
+                counts += npart
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        return self.axis_coordinates(axis), means
+
+    def read_dx(self, fn: str, sidecar: bool = False) -> None:
+        """Read an OpenDX scalar field into this grid
+
+        The header fills :attr:`dims`, :attr:`spaces`, :attr:`mins` and
+        :attr:`maxs`; the data section is parsed in large blocks straight
+        into a preallocated (nx, ny, nz) array.
+
+        :param fn: Path of the DX file
+        :param sidecar: Take :meth:`stats` from the file's sidecar, which
+                        is written on the first such read
+        """
+        with open(fn, "r") as stream:
+            header = read_dx_header(stream)
+            stats, reducer = self._sidecar_reducer(fn, header, sidecar)
+            data = read_dx_data(stream, header, self.dtype, reducer)
+        self._set_lattice(header.dims, header.spaces, header.mins)
+        self.data = data
+        if sidecar:
+            self._read_sidecar(fn, stats, reducer)
+
+    def write_dx(
+        self,
+        fn: str,
+        title: str = "",
+        workers: Optional[int] = None,
+        sidecar: bool = False,
+    ) -> None:
+        """Write this grid as an OpenDX scalar field
+
+        Produces the same text as Vgrid_writeDX, but formats large blocks
+        of values at once and writes them through a large buffer.
+
+        :param fn: Path of the DX file
+        :param title: Title written in the header comments
+        :param workers: Format blocks in this many worker processes
+        :param sidecar: Also write the sidecar holding :meth:`stats`
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        dims, spaces, mins = self.lattice()[:3]
+        reducer = self._write_reducer(sidecar)
+        with replacing(fn) as target, open(
+            target, "w", buffering=DX_BUFFER_BYTES
+        ) as stream:
+            write_dx_slabs(
+                stream,
+                self._write_slabs(reducer),
+                dims,
+                spaces,
+                mins,
+                title,
+                workers,
+            )
+        if sidecar:
+            self._write_sidecar(fn, reducer)
+
+    def read_gz(self, fn: str, sidecar: bool = False) -> None:
+        """Read a gzip-compressed OpenDX scalar field into this grid
+
+        The file is decompressed and parsed in chunks as it is read, so the
+        decompressed text is never held in memory.
+
+        :param fn: Path of the compressed DX file
+        :param sidecar: Take :meth:`stats` from the file's sidecar, which
+                        is written on the first such read
+        """
+        with gzip.open(fn, "rt") as stream:
+            header = read_dx_header(stream)
+            stats, reducer = self._sidecar_reducer(fn, header, sidecar)
+            data = read_dx_data(stream, header, self.dtype, reducer)
+        self._set_lattice(header.dims, header.spaces, header.mins)
+        self.data = data
+        if sidecar:
+            self._read_sidecar(fn, stats, reducer)
+
+    def write_gz(
+        self,
+        fn: str,
+        title: str = "",
+        compresslevel: int = 6,
+        workers: Optional[int] = None,
+        sidecar: bool = False,
+    ) -> None:
+        """Write this grid as a gzip-compressed OpenDX file
+
+        The data section is formatted and compressed block by block.
 
-            assert (
-                len(fields) == 3
-            ), "Found an unknown option or found line with values != 3"
+        :param fn: Path of the compressed DX file
+        :param title: Title written in the header comments
+        :param compresslevel: gzip compression level (zlib default of 6)
+        :param workers: Format blocks in this many worker processes
+        :param sidecar: Also write the sidecar holding :meth:`stats`
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        dims, spaces, mins = self.lattice()[:3]
+        reducer = self._write_reducer(sidecar)
+        with replacing(fn) as target, gzip.open(
+            target, "wt", compresslevel=compresslevel
+        ) as stream:
+            write_dx_slabs(
+                stream,
+                self._write_slabs(reducer),
+                dims,
+                spaces,
+                mins,
+                title,
+                workers,
+            )
+        if sidecar:
+            self._write_sidecar(fn, reducer)
+
+    def read_dxbin(
+        self, fn: str, mmap: bool = True, sidecar: bool = False
+    ) -> None:
+        """Read a binary OpenDX (DXBIN) scalar field into this grid
+
+        The payload is stored as raw little-endian doubles right after the
+        ASCII header, so by default it is memory mapped read-only instead
+        of being loaded: only the pages touched by :meth:`values`, region
+        queries or reductions are ever read, and the page cache is shared
+        by every process that maps the same file. A grid storing another
+        :attr:`dtype` converts the mapped payload slab by slab instead. The
+        writers replace their file instead of truncating it, so a mapped
+        grid can be saved back over its own file.
+
+        :param fn: Path of the DXBIN file
+        :param mmap: Memory map the payload rather than loading it
+        :param sidecar: Take :meth:`stats` from the file's sidecar, which
+                        is written on the first such read
+        :raises ValueError: if the file is not DXBIN or its payload is
+                            truncated
+        """
+        convert = self.dtype != DXBIN_DTYPE
+        with open(fn, "rb") as stream:
+            header = read_dx_header(stream)
+            stats, reducer = self._sidecar_reducer(fn, header, sidecar)
+            offset = stream.tell()
+            if not header.binary:
+                raise ValueError(f"{fn} is not a binary (DXBIN) DX file")
+            size = os.fstat(stream.fileno()).st_size
+            if size < offset + DXBIN_DTYPE.itemsize * header.count:
+                raise ValueError(
+                    f"DXBIN payload of {fn} holds "
+                    f"{(size - offset) // DXBIN_DTYPE.itemsize} of "
+                    f"{header.count} values"
+                )
+            if not mmap and not convert:
+                data = np.fromfile(stream, DXBIN_DTYPE, header.count)
+                if data.size != header.count:
+                    raise ValueError(
+                        f"DXBIN payload of {fn} holds {data.size} of "
+                        f"{header.count} values"
+                    )
+                data = data.reshape(header.dims)
+        if mmap or convert:
+            data = np.memmap(
+                fn, DXBIN_DTYPE, mode="r", offset=offset, shape=header.dims
+            )
+        if convert:
+            payload = data
+            data = np.empty(header.dims, dtype=self.dtype)
+            for start, slab in iter_slabs(payload):
+                data[start:(start + len(slab))] = slab
+                if reducer is not None:
+                    reducer.update(slab)
+            del payload
+        self._set_lattice(header.dims, header.spaces, header.mins)
+        self.data = data
+        if sidecar:
+            self._read_sidecar(fn, stats, reducer)
+
+    def write_dxbin(
+        self, fn: str, title: str = "", sidecar: bool = False
+    ) -> None:
+        """Write this grid as a binary OpenDX (DXBIN) file
+
+        :param fn: Path of the DXBIN file
+        :param title: Title written in the header comments
+        :param sidecar: Also write the sidecar holding :meth:`stats`
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        dims, spaces, mins = self.lattice()[:3]
+        reducer = self._write_reducer(sidecar)
+        with replacing(fn) as target, open(target, "wb") as stream:
+            write_dxbin_slabs(
+                stream,
+                self._write_slabs(reducer),
+                dims,
+                spaces,
+                mins,
+                title,
+            )
+        if sidecar:
+            self._write_sidecar(fn, reducer)
+
+    def read_uhbd(self, fn: str) -> None:
+        """Read an ASCII UHBD map into this grid
+
+        :param fn: Path of the UHBD file
+        """
+        with open(fn, "r", buffering=DX_BUFFER_BYTES) as stream:
+            header = read_uhbd_header(stream)
+            data = read_uhbd_data(stream, header, self.dtype)
+        self._set_lattice(header.dims, header.spaces, header.mins)
+        self.data = data
+
+    def write_uhbd(self, fn: str, title: str = "") -> None:
+        """Write this grid as an ASCII UHBD map
 
-            self.data.append(
-                [float(fields[0]), float(fields[1]), float(fields[2])]
+        Produces the same text as Vgrid_writeUHBD, formatting whole blocks
+        of z-planes at once.
+
+        :param fn: Path of the UHBD file
+        :param title: Title of the map (at most 72 characters)
+        :raises ValueError: if the grid spacing is not uniform
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        dims, spaces, mins = self.lattice()[:3]
+        with replacing(fn) as target, open(
+            target, "w", buffering=DX_BUFFER_BYTES
+        ) as stream:
+            write_uhbd_stream(
+                stream, as_grid_array(self.data), dims, spaces, mins, title
             )
+
+    def read_uhbdbin(self, fn: str) -> None:
+        """Read a binary UHBD map into this grid
+
+        Reads the Fortran unformatted maps of UHBD as well as the output
+        of uhbd_asc2bin.
+
+        :param fn: Path of the binary UHBD file
+        """
+        with open(fn, "rb") as stream:
+            header, data = read_uhbdbin(stream, self.dtype)
+        self._set_lattice(header.dims, header.spaces, header.mins)
+        self.data = data
+
+    def write_uhbdbin(self, fn: str, title: str = "") -> None:
+        """Write this grid as a binary UHBD map
+
+        The map is written the way UHBD writes it: Fortran unformatted
+        records of single precision values.
+
+        :param fn: Path of the binary UHBD file
+        :param title: Title of the map (at most 72 characters)
+        :raises ValueError: if the grid spacing is not uniform
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        dims, spaces, mins = self.lattice()[:3]
+        with replacing(fn) as target, open(target, "wb") as stream:
+            write_uhbdbin_stream(
+                stream,
+                iter_z_planes(as_grid_array(self.data)),
+                dims,
+                spaces,
+                mins,
+                title,
+            )
+
+    def read_chunked(
+        self,
+        fn: str,
+        lazy: bool = True,
+        cache_blocks: int = CHUNK_CACHE_BLOCKS,
+    ) -> None:
+        """Read a chunked, compressed grid file into this grid
+
+        By default the data is left in the file as a :class:`ChunkedArray`:
+        :meth:`values`, :meth:`box` and the other region queries only
+        decompress the blocks they touch, and reductions walk the file
+        slab by slab.
+
+        :param fn: Path of the chunked grid file
+        :param lazy: Keep the data in the file rather than loading it (in
+                     the stored type, regardless of :attr:`dtype`)
+        :param cache_blocks: Number of decompressed blocks to keep
+        """
+        data = ChunkedArray(fn, cache_blocks)
+        self._set_lattice(data.shape, data.spaces, data.mins)
+        if not lazy:
+            with data:
+                data = np.asarray(data, dtype=self.dtype)
+        self.data = data
+
+    def write_chunked(
+        self,
+        fn: str,
+        title: str = "",
+        chunks=CHUNK_DIMS,
+        codec: int = ChunkCodec.Zlib,
+        level: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        """Write this grid as a chunked, compressed grid file
+
+        The values are stored in the type of the data (float32 or
+        float64), cut into blocks that are compressed independently.
+
+        :param fn: Path of the chunked grid file
+        :param title: Title stored in the header (at most 72 characters)
+        :param chunks: Block size in grid points along each axis
+        :param codec: Block compression, one of :class:`ChunkCodec`
+        :param level: Compression level (zlib level or lzma preset)
+        :param workers: Number of threads compressing blocks
+        """
+        if self.data is None:
+            raise RuntimeError("No data available.")
+        _, spaces, mins, _ = self.lattice()
+        write_chunked(
+            fn,
+            as_grid_array(self.data),
+            spaces,
+            mins,
+            chunks,
+            codec,
+            level,
+            title,
+            workers,
+        )
+
+    def _set_lattice(self, dims, spaces, mins) -> None:
+        """Set the grid geometry, deriving the maximums
+
+        :param dims: Number of grid points in each direction
+        :param spaces: Grid spacing in each direction
+        :param mins: Grid lower corner
+        """
+        self.dims = Coordinate(*(int(n) for n in dims))
+        self.spaces = Coordinate(*(float(h) for h in spaces))
+        self.mins = Coordinate(*(float(lo) for lo in mins))
+        self.maxs = Coordinate(
+            *(
+                float(lo) + float(h) * (int(n) - 1)
+                for n, h, lo in zip(dims, spaces, mins)
+            )
+        )
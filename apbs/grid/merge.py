@@ -0,0 +1,365 @@
+"""
+Merging of the per-processor maps written by parallel (mg-para) runs.
+
+Pulled over from tools/python/vgrid/mergedx.py, but each processor block
+is copied into the global array with a single slice assignment.
+"""
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from .dx import create_dxbin, read_dx_header
+from .grid import Grid
+import numpy as np
+
+
+def pe_path(root: str, rank: int) -> str:
+    """Path of the map written by one processor, e.g. ``pot-PE3.dx``"""
+    return f"{root}{rank}.dx"
+
+
+class ParallelLayout:
+    """
+    Processor decomposition of an mg-para calculation
+
+    Attributes:
+        pdime : Number of processors in each direction
+        dime  : Number of grid points of each processor's calculation
+        ofrac : Overlap fraction between neighbouring processors
+        fglen : Length of the global fine grid
+    """
+
+    def __init__(self, pdime, dime, ofrac, fglen):
+        """
+        :param pdime: Number of processors in each direction
+        :param dime: Number of grid points of each processor's calculation
+        :param ofrac: Overlap fraction (a scalar or one per direction)
+        :param fglen: Length of the global fine grid in each direction
+        """
+        self.pdime = np.array(pdime, dtype=np.intp).reshape(3)
+        self.dime = np.array(dime, dtype=np.intp).reshape(3)
+        self.ofrac = np.broadcast_to(
+            np.asarray(ofrac, dtype=np.float64), (3,)
+        ).copy()
+        self.fglen = np.array(fglen, dtype=np.float64).reshape(3)
+        # A single processor along a direction has nothing to overlap
+        self.ofrac[self.pdime == 1] = 0.0
+
+    @classmethod
+    def from_input(cls, path: str) -> "ParallelLayout":
+        """Read the layout from the APBS input file of the run
+
+        Only the ``pdime``, ``dime``, ``ofrac`` and ``fglen`` keywords are
+        used; for asynchronous runs any of the input files will do.
+
+        :param path: Path of the APBS input file
+        :returns: The processor layout
+        """
+        found = {}
+        with open(path, "r") as stream:
+            for line in stream:
+                words = line.split()
+                if words and words[0] in ("pdime", "dime", "ofrac", "fglen"):
+                    found[words[0]] = words[1:]
+        missing = {"pdime", "dime", "ofrac", "fglen"} - set(found)
+        if missing:
+            raise ValueError(
+                f"{path} does not define {', '.join(sorted(missing))}"
+            )
+        return cls(
+            [int(word) for word in found["pdime"][:3]],
+            [int(word) for word in found["dime"][:3]],
+            float(found["ofrac"][0]),
+            [float(word) for word in found["fglen"][:3]],
+        )
+
+    @property
+    def size(self) -> int:
+        """Number of processors"""
+        return int(np.prod(self.pdime))
+
+    @property
+    def block_dims(self) -> np.ndarray:
+        """Grid points owned by each processor once the overlap is trimmed"""
+        return np.rint(self.dime / (1.0 + 2.0 * self.ofrac)).astype(np.intp)
+
+    @property
+    def dims(self) -> np.ndarray:
+        """Number of grid points of the merged grid"""
+        return self.pdime * self.block_dims
+
+    @property
+    def spaces(self) -> np.ndarray:
+        """Grid spacing of the merged grid"""
+        return self.fglen / (self.dims - 1)
+
+    def position(self, rank: int) -> np.ndarray:
+        """Processor coordinates (ip, jp, kp) of a rank (x fastest)"""
+        nx, ny = self.pdime[:2]
+        return np.array([rank % nx, (rank // nx) % ny, rank // (nx * ny)])
+
+    def offset(self, rank: int) -> np.ndarray:
+        """Global index of the first grid point owned by a rank"""
+        return self.position(rank) * self.dims // self.pdime
+
+    def place(self, rank: int, dims) -> tuple:
+        """Slices of the merged grid covered by a processor's block
+
+        :param rank: Processor rank
+        :param dims: Number of grid points in the processor's map
+        :returns: tuple of three slices into the merged grid
+        :raises ValueError: if the block does not line up with the global
+                            grid
+        """
+        dims = np.asarray(dims, dtype=np.intp)
+        first = self.offset(rank)
+        last = first + dims
+        position = self.position(rank)
+        for axis in range(3):
+            edge = position[axis] == self.pdime[axis] - 1
+            if last[axis] > self.dims[axis] or (
+                edge and last[axis] != self.dims[axis]
+            ):
+                raise ValueError(
+                    f"Map of rank {rank} does not line up globally: global "
+                    f"size {self.dims[axis]} along axis {axis}, but its "
+                    f"last grid point is {last[axis]}"
+                )
+        return tuple(slice(lo, hi) for lo, hi in zip(first, last))
+
+
+def merge_grids(grids: Sequence[Grid], layout: ParallelLayout) -> Grid:
+    """Assemble the maps of every processor into the global grid
+
+    :param grids: One overlap-trimmed map per processor, in rank order
+    :param layout: Processor layout of the run
+    :returns: The merged grid, with its lower corner at the corner of the
+              rank 0 map
+    :raises ValueError: if the maps leave points uncovered, or cover a
+                        point more than once
+    """
+    if len(grids) != layout.size:
+        raise ValueError(
+            f"Expected {layout.size} processor maps, got {len(grids)}"
+        )
+    return merge_blocks(enumerate(grids), layout)
+
+
+def merge_blocks(
+    blocks: Iterable[Tuple[int, Grid]], layout: ParallelLayout
+) -> Grid:
+    """Assemble processor maps arriving in any order into the global grid
+
+    Each map is copied as soon as it arrives, so it can be released before
+    the next one is read.
+
+    :param blocks: (rank, map) pairs covering every rank once
+    :param layout: Processor layout of the run
+    :returns: The merged grid
+    """
+    dims = layout.dims
+    data = np.empty(dims)
+    covered = np.zeros(dims, dtype=bool)
+    mins = None
+    for rank, grid in blocks:
+        place_block(data, covered, layout, rank, grid)
+        if rank == 0:
+            mins = grid.mins
+    check_coverage(covered)
+
+    return Grid.from_array(data, layout.spaces, mins)
+
+
+def place_block(
+    data: np.ndarray,
+    covered: np.ndarray,
+    layout: ParallelLayout,
+    rank: int,
+    grid: Grid,
+) -> None:
+    """Copy one processor's map into the global array
+
+    :param data: Global array being assembled
+    :param covered: Global mask of the points assigned so far
+    :param layout: Processor layout of the run
+    :param rank: Processor rank of the map
+    :param grid: The processor's map
+    """
+    index = layout.place(rank, np.shape(grid.data))
+    if covered[index].any():
+        first = np.argwhere(covered[index])[0] + [s.start for s in index]
+        raise ValueError(
+            f"Multiple grids attempted to access grid point "
+            f"{' '.join(str(i) for i in first)} in the global grid"
+        )
+    data[index] = grid.data
+    covered[index] = True
+
+
+def check_coverage(covered: np.ndarray) -> None:
+    """Raise ValueError if any point of the global grid was not assigned"""
+    if not covered.all():
+        missing = np.argwhere(~covered)[0]
+        raise ValueError(
+            f"Found unaccessed grid point at "
+            f"{' '.join(str(i) for i in missing)}"
+        )
+
+
+def merge_dx(
+    inputpath: str, root: str, workers: Optional[int] = None
+) -> Grid:
+    """Merge the DX maps written by every processor of an mg-para run
+
+    :param inputpath: Path of the APBS input file of the run
+    :param root: Stem of the per-processor maps, completed with
+                 ``<rank>.dx``
+    :param workers: Parse the maps in this many worker processes
+    :returns: The merged grid
+    """
+    layout = ParallelLayout.from_input(inputpath)
+    return merge_blocks(iter_pe_grids(root, layout.size, workers), layout)
+
+
+def iter_pe_grids(
+    root: str, size: int, workers: Optional[int] = None
+) -> Iterator[Tuple[int, Grid]]:
+    """Read the DX maps of every processor, optionally in parallel
+
+    With workers, a bounded window of maps is parsed concurrently and each
+    is yielded as soon as it is ready, so the caller (a single writer) can
+    place it while the next ones are parsed. At most two maps per worker
+    are in flight at once.
+
+    :param root: Stem of the per-processor maps
+    :param size: Number of processors
+    :param workers: Number of worker processes (None or 1 reads in this
+                    process, in rank order)
+    :return: Iterator of (rank, map) pairs, in completion order
+    """
+    if workers is None or workers <= 1:
+        for rank in range(size):
+            yield rank, read_pe(root, rank)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for rank in range(size):
+            pending[pool.submit(read_pe, root, rank)] = rank
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+
+def read_pe(root: str, rank: int) -> Grid:
+    """Read the DX map written by one processor"""
+    grid = Grid()
+    grid.read_dx(pe_path(root, rank))
+    return grid
+
+
+def check_blocks(layout: ParallelLayout, shapes: Sequence) -> List[tuple]:
+    """Place every processor's map using only the map shapes
+
+    Checks that the blocks neither overlap nor leave grid points
+    uncovered without allocating anything the size of the global grid.
+
+    :param layout: Processor layout of the run
+    :param shapes: Shape of the map of every rank, in rank order
+    :returns: Slices of the merged grid covered by each rank
+    :raises ValueError: if the blocks overlap or leave points uncovered
+    """
+    if len(shapes) != layout.size:
+        raise ValueError(
+            f"Expected {layout.size} processor maps, got {len(shapes)}"
+        )
+    indices = [layout.place(rank, shape) for rank, shape in enumerate(shapes)]
+    first = np.array([[s.start for s in index] for index in indices])
+    last = np.array([[s.stop for s in index] for index in indices])
+
+    for rank in range(len(indices)):
+        later = slice(rank + 1, None)
+        lo = np.maximum(first[rank], first[later])
+        hi = np.minimum(last[rank], last[later])
+        overlap = np.flatnonzero(np.all(hi > lo, axis=1))
+        if len(overlap):
+            point = lo[overlap[0]]
+            raise ValueError(
+                f"Multiple grids attempted to access grid point "
+                f"{' '.join(str(i) for i in point)} in the global grid "
+                f"(ranks {rank} and {rank + 1 + overlap[0]})"
+            )
+    volume = int(np.prod(last - first, axis=1).sum())
+    total = int(np.prod(layout.dims))
+    if volume != total:
+        raise ValueError(
+            f"Found unaccessed grid points: the maps cover {volume} of "
+            f"{total} grid points"
+        )
+    return indices
+
+
+def merge_dx_to_file(
+    inputpath: str,
+    root: str,
+    output: str,
+    title: str = "",
+    workers: Optional[int] = None,
+) -> None:
+    """Merge the DX maps of an mg-para run straight into a file
+
+    The merged grid is never held in memory: it is assembled in a
+    memory-mapped DXBIN file, reading each processor's map once, so peak
+    memory is bounded by the largest processor map. For ASCII output the
+    DXBIN file is a temporary next to ``output`` that is converted slab by
+    slab.
+
+    :param inputpath: Path of the APBS input file of the run
+    :param root: Stem of the per-processor maps, completed with
+                 ``<rank>.dx``
+    :param output: Path of the merged .dx, .dx.gz or .dxbin file
+    :param title: Title written in the output header comments
+    :param workers: Parse the maps in this many worker processes, which
+                    keeps up to two maps per worker in memory
+    """
+    layout = ParallelLayout.from_input(inputpath)
+    headers = []
+    for rank in range(layout.size):
+        with open(pe_path(root, rank), "r") as stream:
+            headers.append(read_dx_header(stream))
+    indices = check_blocks(layout, [header.dims for header in headers])
+
+    binary = output.lower().endswith(".dxbin")
+    if binary:
+        target = output
+    else:
+        handle, target = tempfile.mkstemp(
+            suffix=".dxbin", dir=os.path.dirname(os.path.abspath(output))
+        )
+        os.close(handle)
+    try:
+        data = create_dxbin(
+            target, layout.dims, layout.spaces, headers[0].mins, title
+        )
+        for rank, grid in iter_pe_grids(root, layout.size, workers):
+            data[indices[rank]] = grid.data
+            del grid
+        data.flush()
+        del data
+
+        if not binary:
+            merged = Grid()
+            merged.read_dxbin(target)
+            if output.lower().endswith(".gz"):
+                merged.write_gz(output, title)
+            else:
+                merged.write_dx(output, title)
+            del merged
+    finally:
+        if not binary:
+            os.remove(target)
@@ -0,0 +1,153 @@
+from typing import Callable, List, Tuple
+from apbs.geometry import Constants, Coordinate
+from .grid import CurvatureFlag, Grid, _as_points
+import numpy as np
+
+
+class MultiResolutionGrid:
+    """
+    Pulled over from src/mg/vmgrid.(h|c)
+
+    Multiresolution oracle for Cartesian mesh data: a hierarchy of grids
+    (e.g. the levels of a focusing calculation) where each query is
+    answered by the finest grid that contains the point.
+
+    Attributes:
+        grids : Grids ordered from finest to coarsest spacing
+    """
+
+    def __init__(self, grids: List[Grid] = None):
+        """
+        :param grids: Optional grids to add to the hierarchy
+        """
+        self.grids: List[Grid] = []
+        self._lower = np.empty((0, 3))
+        self._upper = np.empty((0, 3))
+        for grid in grids if grids is not None else []:
+            self.add_grid(grid)
+
+    def __len__(self):
+        return len(self.grids)
+
+    def add_grid(self, grid: Grid) -> None:
+        """Add a grid to the hierarchy
+
+        :note: Vmgrid_addGrid relied on the caller adding grids from finest
+               to coarsest; here the hierarchy is kept sorted by cell volume
+               (ties keep insertion order).
+
+        :param grid: Grid to add
+        """
+        if grid is None:
+            raise ValueError("Cannot add an empty grid to the hierarchy")
+        self.grids.append(grid)
+        volumes = [np.prod(g.lattice()[1]) for g in self.grids]
+        self.grids = [
+            self.grids[idx] for idx in np.argsort(volumes, kind="stable")
+        ]
+        self._lower = np.array([g.lattice()[2] for g in self.grids])
+        self._upper = np.array([g.lattice()[3] for g in self.grids])
+
+    def levels(self, points: np.ndarray) -> np.ndarray:
+        """Find the finest grid whose bounding box contains each point
+
+        :param points: (N, 3) array of points
+        :returns: (N,) index into :attr:`grids`, or -1 where no grid
+                  contains the point
+        """
+        points = _as_points(points)
+        inside = self._containment(points)
+        level = np.argmax(inside, axis=1)
+        level[~inside.any(axis=1)] = -1
+        return level
+
+    def values(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Interpolate the finest available data at many points
+
+        :param points: (N, 3) array of points
+        :returns: tuple of the (N,) values and an (N,) boolean mask which
+                  is True where no grid in the hierarchy covers the point
+        """
+        return self._resolve(lambda grid, pts: grid.values(pts), points)
+
+    def value(self, pt: Coordinate[float]) -> float:
+        """Get the value at a single point
+
+        :param pt: Coordinate at which to evaluate
+        :returns: Value from the finest grid containing the point
+        """
+        values, off_grid = self.values(pt)
+        if off_grid[0]:
+            raise RuntimeError(f"Point {pt} not found in grid hierarchy!")
+        return float(values[0])
+
+    def gradient(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get first derivatives from the finest available grid
+
+        :param points: (N, 3) array of points
+        :returns: tuple of the (N, 3) gradients and an (N,) boolean mask
+                  which is True where no grid could evaluate the gradient
+        """
+        return self._resolve(lambda grid, pts: grid.gradient(pts), points)
+
+    def curvature(
+        self, points: np.ndarray, cflag: CurvatureFlag
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get second derivatives from the finest available grid
+
+        :param points: (N, 3) array of points
+        :param cflag: Curvature method
+        :returns: tuple of the (N,) curvatures and an (N,) boolean mask
+                  which is True where no grid could evaluate the curvature
+        """
+        return self._resolve(
+            lambda grid, pts: grid.curvature(pts, cflag), points
+        )
+
+    def _containment(self, points: np.ndarray) -> np.ndarray:
+        """(N, L) mask of which grid bounding boxes contain each point"""
+        eps = Constants.epsilon
+        return np.all(
+            (points[:, np.newaxis, :] >= self._lower - eps)
+            & (points[:, np.newaxis, :] <= self._upper + eps),
+            axis=2,
+        )
+
+    def _resolve(
+        self,
+        method: Callable[[Grid, np.ndarray], Tuple[np.ndarray, np.ndarray]],
+        points: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Evaluate a batched grid method level by level
+
+        Every point goes to the finest grid containing it; points that the
+        grid still cannot answer (e.g. a derivative stencil running off its
+        edge) fall through to the next coarser grid, as in Vmgrid.
+
+        :param method: Callable returning (results, off_grid) for a grid
+                       and a point batch
+        :param points: (N, 3) array of points
+        :returns: tuple of the combined results and off-grid mask
+        """
+        if not self.grids:
+            raise RuntimeError("No grids in the hierarchy.")
+        points = _as_points(points)
+        inside = self._containment(points)
+        off_grid = np.ones(len(points), dtype=bool)
+        result = None
+
+        for level, grid in enumerate(self.grids):
+            todo = np.flatnonzero(off_grid & inside[:, level])
+            if not len(todo):
+                continue
+            values, off = method(grid, points[todo])
+            if result is None:
+                result = np.zeros((len(points),) + values.shape[1:])
+            found = todo[~off]
+            result[found] = values[~off]
+            off_grid[found] = False
+
+        if result is None:
+            values, _ = method(self.grids[0], points[:0])
+            result = np.zeros((len(points),) + values.shape[1:])
+        return result, off_grid
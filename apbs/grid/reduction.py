@@ -0,0 +1,200 @@
+from typing import Iterator, Tuple
+import numpy as np
+
+# Default upper bound on the size of a slab of grid data processed at once
+SLAB_BYTES = 1 << 26
+
+
+def slab_planes(dims, itemsize: int = 8, slab_bytes: int = SLAB_BYTES) -> int:
+    """Number of x-planes that fit in a slab of the requested size
+
+    :param dims: Number of grid points in each direction
+    :param itemsize: Size of a single grid value in bytes
+    :param slab_bytes: Upper bound on the slab size in bytes
+    :return: Number of planes per slab (at least one)
+    """
+    plane_bytes = int(dims[1]) * int(dims[2]) * itemsize
+    return max(1, slab_bytes // max(plane_bytes, 1))
+
+
+def iter_slabs(
+    data: np.ndarray, slab_bytes: int = SLAB_BYTES
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Walk a 3D array in contiguous slabs along the first (x) axis
+
+    The slabs are views, so a memory-mapped array is only paged in one
+    slab at a time.
+
+    :param data: (nx, ny, nz) array
+    :param slab_bytes: Upper bound on the slab size in bytes
+    :return: Iterator of the first plane index and the slab view
+    """
+    step = slab_planes(data.shape, data.dtype.itemsize, slab_bytes)
+    for start in range(0, data.shape[0], step):
+        stop = start + step
+        yield start, data[start:stop]
+
+
+def trapezoid_weights(n: int) -> np.ndarray:
+    """Weights of the composite trapezoid rule on n unit-spaced nodes"""
+    weights = np.ones(n)
+    weights[0] = weights[-1] = 0.5
+    return weights
+
+
+class SlabReducer:
+    """
+    Accumulate integrals and norms of grid data one x-slab at a time.
+
+    Slabs must be fed in order with :meth:`update`; they may come from an
+    in-memory array, a memory map or a file that is still being parsed.
+    Only the slab being reduced (plus two planes of context for the
+    :math:`H_1` gradient) is ever held, and all sums accumulate in float64.
+
+    Ports the reductions of src/mg/vgrid.c (Vgrid_integrate,
+    Vgrid_normL1, ...).
+
+    Attributes:
+        integral    : Trapezoid rule integral of the data
+        norm_l1     : L1 norm of the data
+        norm_l2     : L2 norm of the data
+        norm_linf   : L-infinity norm of the data (NaN, like the other
+                      norms, if the data holds NaN)
+        seminorm_h1 : H1 semi-norm (only if gradient=True)
+        norm_h1     : H1 norm (only if gradient=True)
+    """
+
+    def __init__(self, dims, spaces, gradient: bool = False):
+        """
+        :param dims: Number of grid points in each direction
+        :param spaces: Grid spacing in each direction
+        :param gradient: Also accumulate the H1 semi-norm
+        """
+        self.dims = tuple(int(n) for n in dims)
+        self.spaces = tuple(float(h) for h in spaces)
+        self.gradient = gradient
+        self._wx = trapezoid_weights(self.dims[0])
+        self._wy = trapezoid_weights(self.dims[1])
+        self._wz = trapezoid_weights(self.dims[2])
+        self._nseen = 0
+        self._sum = 0.0
+        self._abs_sum = 0.0
+        self._sq_sum = 0.0
+        self._max_abs = 0.0
+        self._grad_sq_sum = 0.0
+        # Planes waiting for their right neighbor (plus one plane of left
+        # context) and the global index of the first plane in the buffer
+        self._buf = None
+        self._buf_start = 0
+        self._next = 0
+
+    @property
+    def done(self) -> bool:
+        return self._nseen == self.dims[0]
+
+    def update(self, slab: np.ndarray) -> None:
+        """Reduce the next slab of x-planes
+
+        :param slab: (m, ny, nz) array holding the planes that follow the
+                     ones already seen
+        """
+        slab = np.asarray(slab)
+        nplanes = slab.shape[0]
+        if slab.shape[1:] != self.dims[1:]:
+            raise ValueError(
+                f"Slab shape {slab.shape} does not match grid {self.dims}"
+            )
+        if self._nseen + nplanes > self.dims[0]:
+            raise ValueError("Received more planes than the grid holds")
+
+        stop = self._nseen + nplanes
+        wx = self._wx[self._nseen:stop]
+        self._sum += float(wx @ ((slab @ self._wz) @ self._wy))
+        absval = np.abs(slab, dtype=np.float64)
+        self._abs_sum += float(absval.sum())
+        if nplanes:
+            # np.maximum propagates NaN, as the L1 and L2 sums do
+            self._max_abs = float(np.maximum(self._max_abs, absval.max()))
+        self._sq_sum += float(np.einsum("ijk,ijk->", absval, absval))
+        del absval
+        self._nseen += nplanes
+
+        if self.gradient:
+            if self._buf is None:
+                self._buf = slab
+            else:
+                self._buf = np.concatenate([self._buf, slab])
+            stop = self._nseen if self.done else self._nseen - 1
+            self._reduce_gradient(stop)
+
+    def _reduce_gradient(self, stop: int) -> None:
+        """Add |grad u|^2 for the buffered planes [self._next, stop)"""
+        if stop <= self._next:
+            return
+        nx = self.dims[0]
+        hx, hy, hz = self.spaces
+        planes = np.arange(self._next, stop)
+        left = np.maximum(planes - 1, 0)
+        right = np.minimum(planes + 1, nx - 1)
+        buf = self._buf
+        off = self._buf_start
+        block = buf[planes - off].astype(np.float64)
+        dudx = np.subtract(
+            buf[right - off], buf[left - off], dtype=np.float64
+        ) / (
+            (right - left)[:, np.newaxis, np.newaxis] * hx
+        )
+        total = np.einsum("ijk,ijk->", dudx, dudx)
+        del dudx
+        for axis, h in ((1, hy), (2, hz)):
+            deriv = np.gradient(block, h, axis=axis)
+            total += np.einsum("ijk,ijk->", deriv, deriv)
+        self._grad_sq_sum += float(total)
+        self._next = stop
+
+        # Keep the last processed plane as left context for the next one
+        keep = max(stop - 1, 0)
+        self._buf = buf[(keep - off):].copy()
+        self._buf_start = keep
+
+    def _check_done(self) -> None:
+        if not self.done:
+            raise RuntimeError(
+                f"Only {self._nseen} of {self.dims[0]} planes were reduced."
+            )
+
+    @property
+    def _volume(self) -> float:
+        hx, hy, hz = self.spaces
+        return hx * hy * hz
+
+    @property
+    def integral(self) -> float:
+        self._check_done()
+        return self._sum * self._volume
+
+    @property
+    def norm_l1(self) -> float:
+        self._check_done()
+        return self._abs_sum * self._volume
+
+    @property
+    def norm_l2(self) -> float:
+        self._check_done()
+        return float(np.sqrt(self._sq_sum * self._volume))
+
+    @property
+    def norm_linf(self) -> float:
+        self._check_done()
+        return self._max_abs
+
+    @property
+    def seminorm_h1(self) -> float:
+        self._check_done()
+        if not self.gradient:
+            raise RuntimeError("Reducer was not asked to track gradients.")
+        return float(np.sqrt(self._grad_sq_sum * self._volume))
+
+    @property
+    def norm_h1(self) -> float:
+        return float(np.sqrt(self.seminorm_h1 ** 2 + self.norm_l2 ** 2))
@@ -0,0 +1,162 @@
+"""
+Separable interpolation of grid data onto another axis-aligned lattice.
+
+Trilinear (and cubic) interpolation onto a lattice factors into three 1D
+interpolations, one per axis, each of which only needs a few source
+planes per target plane.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from apbs.geometry import Constants
+from .reduction import SLAB_BYTES, slab_planes
+import numpy as np
+
+
+def axis_weights(
+    n: int, h: float, lo: float, targets: np.ndarray, order: int = 1
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Interpolation stencils of target positions along one source axis
+
+    :param n: Number of source nodes along the axis
+    :param h: Source spacing
+    :param lo: Position of the first source node
+    :param targets: (m,) target positions
+    :param order: 1 for linear or 3 for cubic (Keys, a = -1/2)
+                  interpolation
+    :returns: tuple of the (m, taps) source indices, (m, taps) weights and
+              an (m,) mask which is True where the target lies outside the
+              source axis
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    hi = lo + h * (n - 1)
+    t = (targets - lo) / h
+    # Snap targets within epsilon of the ends onto the mesh
+    t[np.abs(targets - lo) < Constants.epsilon] = 0.0
+    t[np.abs(targets - hi) < Constants.epsilon] = n - 1
+    off = (t < 0) | (t > n - 1)
+    t = np.clip(t, 0, n - 1)
+
+    base = np.clip(np.floor(t).astype(np.intp), 0, max(n - 2, 0))
+    frac = t - base
+    if order == 1 or (order == 3 and n < 3):
+        index = np.stack([base, base + 1], axis=1)
+        weights = np.stack([1.0 - frac, frac], axis=1)
+    elif order == 3:
+        index = base[:, np.newaxis] + np.arange(-1, 3)
+        dist = np.abs(np.arange(-1, 3) - frac[:, np.newaxis])
+        near = ((1.5 * dist - 2.5) * dist) * dist + 1.0
+        far = ((-0.5 * dist + 2.5) * dist - 4.0) * dist + 2.0
+        weights = np.where(dist <= 1.0, near, np.where(dist < 2.0, far, 0.0))
+        # Ghost nodes past either end are extrapolated linearly from the
+        # two nearest nodes (e.g. u[-1] = 2 u[0] - u[1]), which keeps
+        # linear data exact up to the boundaries.
+        ghost = np.where(index[:, 0] < 0, weights[:, 0], 0.0)
+        weights[:, 0] -= ghost
+        weights[:, 1] += 2.0 * ghost
+        weights[:, 2] -= ghost
+        ghost = np.where(index[:, 3] > n - 1, weights[:, 3], 0.0)
+        weights[:, 3] -= ghost
+        weights[:, 2] += 2.0 * ghost
+        weights[:, 1] -= ghost
+    else:
+        raise ValueError(f"Unsupported interpolation order {order}")
+    return np.clip(index, 0, n - 1), weights, off
+
+
+def apply_weights(
+    data: np.ndarray, index: np.ndarray, weights: np.ndarray, axis: int
+) -> np.ndarray:
+    """Interpolate data along one axis with precomputed stencils
+
+    :param data: Source array
+    :param index: (m, taps) source indices along ``axis``
+    :param weights: (m, taps) weights
+    :param axis: Axis to interpolate along
+    :returns: Array with ``axis`` resized to m, in float64
+    """
+    shape = [1] * data.ndim
+    shape[axis] = -1
+    out = None
+    for tap in range(index.shape[1]):
+        term = np.take(data, index[:, tap], axis=axis).astype(np.float64)
+        term *= weights[:, tap].reshape(shape)
+        if out is None:
+            out = term
+        else:
+            out += term
+    return out
+
+
+def resample(
+    data: np.ndarray,
+    spaces,
+    mins,
+    new_dims,
+    new_spaces,
+    new_mins,
+    order: int = 1,
+    fill: float = 0.0,
+    workers: Optional[int] = None,
+    slab_bytes: int = SLAB_BYTES,
+    dtype=np.float64,
+) -> np.ndarray:
+    """Interpolate (nx, ny, nz) data onto another axis-aligned lattice
+
+    The target is filled in slabs of x-planes, each of which reads only
+    the source planes its stencils touch, so memory-mapped sources are
+    paged in piecewise. With workers the slabs are computed in threads
+    (numpy releases the GIL in the gathers and products). Slabs are
+    interpolated in float64 and stored straight into the result, so a
+    narrower dtype never holds a full float64 copy of the target.
+
+    :param data: (nx, ny, nz) source data
+    :param spaces: Source spacing
+    :param mins: Source lower corner
+    :param new_dims: Number of target nodes in each direction
+    :param new_spaces: Target spacing
+    :param new_mins: Target lower corner
+    :param order: 1 for trilinear or 3 for tricubic interpolation
+    :param fill: Value given to target nodes outside the source grid
+    :param workers: Number of threads computing slabs
+    :param slab_bytes: Approximate size of a target slab in bytes
+    :param dtype: Type of the result
+    :returns: (new nx, new ny, new nz) array of the given dtype
+    """
+    new_dims = [int(n) for n in new_dims]
+    stencils = []
+    for axis in range(3):
+        targets = new_mins[axis] + new_spaces[axis] * np.arange(new_dims[axis])
+        stencils.append(
+            axis_weights(
+                data.shape[axis], spaces[axis], mins[axis], targets, order
+            )
+        )
+    out = np.empty(new_dims, dtype=dtype)
+
+    def fill_slab(start: int) -> None:
+        stop = min(start + step, new_dims[0])
+        index, weights, _ = stencils[0]
+        index = index[start:stop]
+        first, last = index.min(), index.max() + 1
+        block = apply_weights(
+            data[first:last], index - first, weights[start:stop], 0
+        )
+        for axis in (1, 2):
+            index, weights, _ = stencils[axis]
+            block = apply_weights(block, index, weights, axis)
+        out[start:stop] = block
+
+    step = slab_planes(new_dims, out.itemsize, slab_bytes)
+    starts = range(0, new_dims[0], step)
+    if workers is None or workers <= 1:
+        for start in starts:
+            fill_slab(start)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(fill_slab, starts))
+
+    offx, offy, offz = (stencil[2] for stencil in stencils)
+    out[offx] = fill
+    out[:, offy] = fill
+    out[:, :, offz] = fill
+    return out
@@ -0,0 +1,389 @@
+"""
+Cached statistics of a grid file, kept in a small JSON file next to it.
+
+The statistics are gathered once per x-plane (min, max and sums) along
+with a coarse histogram, in the same pass that writes or reads the grid,
+so summaries of a map, and the range of x-planes a value query needs to
+read, are available without rescanning the data.
+"""
+import json
+import os
+import warnings
+from typing import Optional, Tuple
+from .chunked import as_grid_array
+from .reduction import SLAB_BYTES, iter_slabs, trapezoid_weights
+import numpy as np
+
+# Appended to the path of a grid file to name its sidecar
+SIDECAR_SUFFIX = ".stats.json"
+
+# Number of bins of the coarse histogram
+HISTOGRAM_BINS = 64
+
+SIDECAR_VERSION = 1
+
+# Per-plane statistics stored in the sidecar
+_PLANE_FIELDS = (
+    "plane_min",
+    "plane_max",
+    "plane_sum",
+    "plane_abs",
+    "plane_sq",
+    "plane_trapz",
+)
+
+
+def _nan_extremum(func, values: np.ndarray, axis=None) -> np.ndarray:
+    """np.nanmin or np.nanmax, quietly NaN where all values are NaN"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return func(values, axis=axis)
+
+
+def sidecar_path(fn: str) -> str:
+    """Path of the sidecar of a grid file"""
+    return str(fn) + SIDECAR_SUFFIX
+
+
+def _file_stamp(fn: str) -> dict:
+    """Size and modification time identifying the contents of a file"""
+    info = os.stat(fn)
+    return {"size": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+
+class GridStats:
+    """
+    Per-plane statistics and a coarse histogram of grid data.
+
+    Attributes:
+        dims         : Number of grid points in each direction
+        spaces       : Grid spacing in each direction
+        mins         : Grid lower corner
+        plane_min    : (nx,) minimum of each x-plane, ignoring NaN
+        plane_max    : (nx,) maximum of each x-plane, ignoring NaN
+        plane_sum    : (nx,) sum of each x-plane
+        plane_abs    : (nx,) sum of absolute values of each x-plane
+        plane_sq     : (nx,) sum of squares of each x-plane
+        plane_trapz  : (nx,) trapezoid-weighted sum of each x-plane
+        hist_counts  : Counts of the coarse histogram of the finite values
+        hist_edges   : Bin edges of the coarse histogram
+        source       : Size and modification time of the described file
+    """
+
+    def __init__(self, dims, spaces, mins, planes: dict, histogram: tuple):
+        """
+        :param dims: Number of grid points in each direction
+        :param spaces: Grid spacing in each direction
+        :param mins: Grid lower corner
+        :param planes: Per-plane arrays keyed by the attribute names
+        :param histogram: (counts, edges) of the coarse histogram
+        """
+        self.dims = tuple(int(n) for n in dims)
+        self.spaces = tuple(float(h) for h in spaces)
+        self.mins = tuple(float(lo) for lo in mins)
+        self.plane_min = np.asarray(planes["plane_min"], dtype=np.float64)
+        self.plane_max = np.asarray(planes["plane_max"], dtype=np.float64)
+        self.plane_sum = np.asarray(planes["plane_sum"], dtype=np.float64)
+        self.plane_abs = np.asarray(planes["plane_abs"], dtype=np.float64)
+        self.plane_sq = np.asarray(planes["plane_sq"], dtype=np.float64)
+        self.plane_trapz = np.asarray(planes["plane_trapz"], dtype=np.float64)
+        self.hist_counts = np.asarray(histogram[0], dtype=np.int64)
+        self.hist_edges = np.asarray(histogram[1], dtype=np.float64)
+        self.source = None
+
+    @classmethod
+    def from_data(
+        cls,
+        data: np.ndarray,
+        spaces,
+        mins,
+        bins: int = HISTOGRAM_BINS,
+        slab_bytes: int = SLAB_BYTES,
+    ) -> "GridStats":
+        """Gather the statistics of (nx, ny, nz) data
+
+        The data is walked slab by slab once, through a
+        :class:`StatsReducer`.
+
+        :param data: (nx, ny, nz) array (may be memory mapped or chunked)
+        :param spaces: Grid spacing in each direction
+        :param mins: Grid lower corner
+        :param bins: Number of histogram bins
+        :param slab_bytes: Upper bound on the slab size in bytes
+        :returns: The statistics
+        """
+        data = as_grid_array(data)
+        reducer = StatsReducer(data.shape, spaces, mins, bins)
+        for _, slab in iter_slabs(data, slab_bytes):
+            reducer.update(slab)
+        return reducer.finish()
+
+    @property
+    def count(self) -> int:
+        """Number of grid values"""
+        nx, ny, nz = self.dims
+        return nx * ny * nz
+
+    @property
+    def _volume(self) -> float:
+        hx, hy, hz = self.spaces
+        return hx * hy * hz
+
+    @property
+    def min(self) -> float:
+        return float(_nan_extremum(np.nanmin, self.plane_min))
+
+    @property
+    def max(self) -> float:
+        return float(_nan_extremum(np.nanmax, self.plane_max))
+
+    @property
+    def sum(self) -> float:
+        return float(self.plane_sum.sum())
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count
+
+    @property
+    def integral(self) -> float:
+        """Trapezoid rule integral, as :meth:`Grid.integrate`"""
+        wx = trapezoid_weights(self.dims[0])
+        return float(wx @ self.plane_trapz) * self._volume
+
+    @property
+    def norm_l1(self) -> float:
+        return float(self.plane_abs.sum()) * self._volume
+
+    @property
+    def norm_l2(self) -> float:
+        return float(np.sqrt(self.plane_sq.sum() * self._volume))
+
+    @property
+    def norm_linf(self) -> float:
+        # NaN when the data holds NaN, like SlabReducer.norm_linf
+        if np.isnan(self.plane_abs).any():
+            return np.nan
+        return max(abs(self.min), abs(self.max))
+
+    def histogram(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The coarse histogram as (counts, bin edges)"""
+        return self.hist_counts, self.hist_edges
+
+    def value_range(self, start: int = 0, stop: int = None) -> tuple:
+        """Extrema over a range of x-planes
+
+        :param start: First x-plane
+        :param stop: One past the last x-plane (default: all)
+        :returns: tuple of the minimum and maximum
+        """
+        index = slice(start, stop)
+        return (
+            float(_nan_extremum(np.nanmin, self.plane_min[index])),
+            float(_nan_extremum(np.nanmax, self.plane_max[index])),
+        )
+
+    def planes(
+        self, lower: Optional[float] = None, upper: Optional[float] = None
+    ) -> np.ndarray:
+        """X-planes that may hold values within [lower, upper]
+
+        Only these planes need to be read to find every such value.
+
+        :param lower: Lower bound of the values (default: unbounded)
+        :param upper: Upper bound of the values (default: unbounded)
+        :returns: Indices of the x-planes whose extrema overlap the range
+        """
+        hit = np.ones(self.dims[0], dtype=bool)
+        if lower is not None:
+            hit &= self.plane_max >= lower
+        if upper is not None:
+            hit &= self.plane_min <= upper
+        return np.flatnonzero(hit)
+
+    def write(self, fn: str) -> None:
+        """Save the statistics as JSON
+
+        :param fn: Path of the sidecar
+        """
+        record = {
+            "version": SIDECAR_VERSION,
+            "dims": list(self.dims),
+            "spaces": list(self.spaces),
+            "mins": list(self.mins),
+            "source": self.source,
+            "histogram": {
+                "counts": self.hist_counts.tolist(),
+                "edges": self.hist_edges.tolist(),
+            },
+        }
+        for name in _PLANE_FIELDS:
+            record[name] = getattr(self, name).tolist()
+        with open(fn, "w") as stream:
+            json.dump(record, stream)
+
+    @classmethod
+    def read(cls, fn: str) -> "GridStats":
+        """Load statistics saved by :meth:`write`
+
+        :param fn: Path of the sidecar
+        :returns: The statistics
+        :raises ValueError: if the sidecar has an unknown version
+        """
+        with open(fn, "r") as stream:
+            record = json.load(stream)
+        if record.get("version") != SIDECAR_VERSION:
+            raise ValueError(f"Unsupported grid sidecar version in {fn}")
+        histogram = record["histogram"]
+        stats = cls(
+            record["dims"],
+            record["spaces"],
+            record["mins"],
+            record,
+            (histogram["counts"], histogram["edges"]),
+        )
+        stats.source = record.get("source")
+        return stats
+
+
+class StatsReducer:
+    """
+    Gather :class:`GridStats` one x-slab at a time.
+
+    Slabs must be fed in order with :meth:`update`, e.g. while a grid file
+    is written or parsed, so the statistics come without another pass over
+    the data. The histogram starts on the range of the first finite values
+    and grows when values outside it arrive: its bin width doubles and
+    pairs of bins merge. Bins are closed on the left (as in numpy, but
+    the last one too) and their width is a power of two, so the counts
+    stay exact; the final range is within a few times the span of the
+    finite values.
+    """
+
+    def __init__(self, dims, spaces, mins, bins: int = HISTOGRAM_BINS):
+        """
+        :param dims: Number of grid points in each direction
+        :param spaces: Grid spacing in each direction
+        :param mins: Grid lower corner
+        :param bins: Number of histogram bins (even)
+        """
+        if bins < 2 or bins % 2:
+            raise ValueError(f"Histogram needs an even number of bins: {bins}")
+        self.dims = tuple(int(n) for n in dims)
+        self.spaces = tuple(float(h) for h in spaces)
+        self.mins = tuple(float(lo) for lo in mins)
+        self._wy = trapezoid_weights(self.dims[1])
+        self._wz = trapezoid_weights(self.dims[2])
+        self._planes = {name: np.empty(self.dims[0]) for name in _PLANE_FIELDS}
+        self._nseen = 0
+        self._counts = np.zeros(bins, dtype=np.int64)
+        self._edges = None
+
+    @property
+    def done(self) -> bool:
+        return self._nseen == self.dims[0]
+
+    def update(self, slab: np.ndarray) -> None:
+        """Gather the statistics of the next slab of x-planes
+
+        :param slab: (m, ny, nz) array holding the planes that follow the
+                     ones already seen
+        """
+        slab = np.asarray(slab, dtype=np.float64)
+        if slab.shape[1:] != self.dims[1:]:
+            raise ValueError(
+                f"Slab shape {slab.shape} does not match grid {self.dims}"
+            )
+        stop = self._nseen + len(slab)
+        if stop > self.dims[0]:
+            raise ValueError("Received more planes than the grid holds")
+        index = slice(self._nseen, stop)
+        planes = self._planes
+        planes["plane_min"][index] = _nan_extremum(np.nanmin, slab, (1, 2))
+        planes["plane_max"][index] = _nan_extremum(np.nanmax, slab, (1, 2))
+        planes["plane_sum"][index] = slab.sum(axis=(1, 2))
+        planes["plane_trapz"][index] = (slab @ self._wz) @ self._wy
+        planes["plane_sq"][index] = np.einsum("ijk,ijk->i", slab, slab)
+        planes["plane_abs"][index] = np.abs(slab).sum(axis=(1, 2))
+        finite = slab[np.isfinite(slab)]
+        if finite.size:
+            self._bin(finite)
+        self._nseen = stop
+
+    def _bin(self, values: np.ndarray) -> None:
+        """Add finite values to the histogram, widening it as needed"""
+        bins = len(self._counts)
+        lower, upper = float(values.min()), float(values.max())
+        if self._edges is None:
+            if upper > lower:
+                width = (upper - lower) / (bins - 1)
+            else:
+                width = max(abs(lower), 1.0) / bins
+            # A power of two width and a first edge on a multiple of it
+            # keep every edge exact as the histogram widens
+            width = 2.0 ** np.ceil(np.log2(width))
+            first = np.floor(lower / width) * width
+            self._edges = first + width * np.arange(bins + 1)
+        while lower < self._edges[0] or upper >= self._edges[-1]:
+            first, width = self._edges[0], self._edges[1] - self._edges[0]
+            merged = self._counts.reshape(-1, 2).sum(axis=1)
+            self._counts[:] = 0
+            if lower < first:
+                first -= bins * width
+                self._counts[(bins // 2):] = merged
+            else:
+                self._counts[:(bins // 2)] = merged
+            self._edges = first + 2.0 * width * np.arange(bins + 1)
+        index = np.searchsorted(self._edges, values, side="right") - 1
+        self._counts += np.bincount(
+            np.clip(index, 0, bins - 1), minlength=bins
+        )
+
+    def finish(self) -> GridStats:
+        """The statistics of all the slabs
+
+        :raises ValueError: if fewer planes than the grid holds were seen
+        """
+        if not self.done:
+            raise ValueError(
+                f"Received {self._nseen} of {self.dims[0]} planes"
+            )
+        edges = self._edges
+        if edges is None:
+            edges = np.histogram_bin_edges([], len(self._counts), (0.0, 1.0))
+        return GridStats(
+            self.dims,
+            self.spaces,
+            self.mins,
+            self._planes,
+            (self._counts.copy(), edges),
+        )
+
+
+def load_stats(fn: str) -> Optional[GridStats]:
+    """Statistics of a grid file from its sidecar, if it is up to date
+
+    :param fn: Path of the grid file
+    :returns: The statistics, or None if there is no sidecar or the grid
+              file changed since it was written
+    """
+    path = sidecar_path(fn)
+    if not os.path.exists(path):
+        return None
+    try:
+        stats = GridStats.read(path)
+    except (ValueError, KeyError):
+        return None
+    if stats.source != _file_stamp(fn):
+        return None
+    return stats
+
+
+def save_stats(stats: GridStats, fn: str) -> None:
+    """Write the sidecar of a grid file, stamped with its current state
+
+    :param stats: Statistics of the grid stored in the file
+    :param fn: Path of the grid file
+    """
+    stats.source = _file_stamp(fn)
+    stats.write(sidecar_path(fn))
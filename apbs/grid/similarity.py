@@ -0,0 +1,221 @@
+"""
+Similarity and difference measures between two scalar fields.
+
+Pulled over from tools/mesh/similarity.c, with the sums accumulated one
+slab at a time so the fields (and masks) can be streamed from disk.
+"""
+from typing import Optional, Union
+from .expression import SlabSource
+from .grid import Grid
+from .reduction import SLAB_BYTES, slab_planes
+import numpy as np
+
+
+class SimilarityReducer:
+    """
+    Accumulate comparisons of two same-shape fields slab by slab.
+
+    As in similarity.c, each field may be multiplied by its own mask (a
+    characteristic function with values between 0 and 1): the compared
+    values are ``u1 * m1`` and ``u2 * m2`` and the difference is
+    ``m1 * m2 * (u1 - u2)``. Boolean masks restrict the comparison to a
+    region. Statistics for the correlation are only taken over nodes where
+    both masks are nonzero. All sums accumulate in float64.
+
+    Attributes:
+        norm1_l2          : L2 norm of the first (masked) field
+        norm2_l2          : L2 norm of the second (masked) field
+        diff_l1           : L1 norm of the difference
+        diff_l2           : L2 norm of the difference
+        diff_linf         : L-infinity norm of the difference
+        relative_diff_l2  : diff_l2 relative to norm1_l2
+        inner_product     : L2 inner product of the fields
+        hodgkin           : Hodgkin similarity index
+        carbo             : Carbo similarity index
+        correlation       : Pearson correlation of the node values
+    """
+
+    def __init__(self, spaces):
+        """
+        :param spaces: Grid spacing in each direction
+        """
+        hx, hy, hz = (float(h) for h in spaces)
+        self._dvol = hx * hy * hz
+        self.count = 0
+        self._sq1 = 0.0
+        self._sq2 = 0.0
+        self._dot = 0.0
+        self._diff_abs = 0.0
+        self._diff_sq = 0.0
+        self._diff_max = 0.0
+        # Shifted sums for the correlation; the shift (the first values
+        # seen) keeps the one-pass variance from cancelling
+        self._shift = None
+        self._sum1 = 0.0
+        self._sum2 = 0.0
+        self._var1 = 0.0
+        self._var2 = 0.0
+        self._cov = 0.0
+
+    def update(
+        self,
+        slab1: np.ndarray,
+        slab2: np.ndarray,
+        mask1: Optional[np.ndarray] = None,
+        mask2: Optional[np.ndarray] = None,
+    ) -> None:
+        """Reduce the next pair of slabs
+
+        :param slab1: Slab of the first field
+        :param slab2: Matching slab of the second field
+        :param mask1: Optional mask of the first field, broadcastable to
+                      the slab
+        :param mask2: Optional mask of the second field, broadcastable to
+                      the slab
+        """
+        u1 = np.asarray(slab1, dtype=np.float64)
+        u2 = np.asarray(slab2, dtype=np.float64)
+        if u1.shape != u2.shape:
+            raise ValueError(f"Slab shapes {u1.shape} and {u2.shape} differ")
+        m1 = 1.0 if mask1 is None else np.asarray(mask1, dtype=np.float64)
+        m2 = 1.0 if mask2 is None else np.asarray(mask2, dtype=np.float64)
+
+        val1 = u1 * m1
+        val2 = u2 * m2
+        diff = np.subtract(u1, u2) * (m1 * m2)
+        self._sq1 += float(np.vdot(val1, val1))
+        self._sq2 += float(np.vdot(val2, val2))
+        self._dot += float(np.vdot(val1, val2))
+        np.abs(diff, out=diff)
+        self._diff_abs += float(diff.sum())
+        self._diff_sq += float(np.vdot(diff, diff))
+        if diff.size:
+            # np.maximum propagates NaN, as in SlabReducer.norm_linf
+            self._diff_max = float(np.maximum(self._diff_max, diff.max()))
+        del diff
+
+        if mask1 is None and mask2 is None:
+            val1, val2 = val1.ravel(), val2.ravel()
+        else:
+            region = np.broadcast_to((m1 * m2) != 0, u1.shape)
+            val1, val2 = val1[region], val2[region]
+        if not len(val1):
+            return
+        if self._shift is None:
+            self._shift = (float(val1[0]), float(val2[0]))
+        val1 -= self._shift[0]
+        val2 -= self._shift[1]
+        self.count += len(val1)
+        self._sum1 += float(val1.sum())
+        self._sum2 += float(val2.sum())
+        self._var1 += float(np.dot(val1, val1))
+        self._var2 += float(np.dot(val2, val2))
+        self._cov += float(np.dot(val1, val2))
+
+    @property
+    def norm1_l2(self) -> float:
+        return float(np.sqrt(self._sq1 * self._dvol))
+
+    @property
+    def norm2_l2(self) -> float:
+        return float(np.sqrt(self._sq2 * self._dvol))
+
+    @property
+    def diff_l1(self) -> float:
+        return self._diff_abs * self._dvol
+
+    @property
+    def diff_l2(self) -> float:
+        return float(np.sqrt(self._diff_sq * self._dvol))
+
+    @property
+    def diff_linf(self) -> float:
+        return self._diff_max
+
+    @property
+    def relative_diff_l2(self) -> float:
+        return _ratio(self.diff_l2, self.norm1_l2)
+
+    @property
+    def inner_product(self) -> float:
+        return self._dot * self._dvol
+
+    @property
+    def hodgkin(self) -> float:
+        return _ratio(2.0 * self._dot, self._sq1 + self._sq2)
+
+    @property
+    def carbo(self) -> float:
+        return _ratio(self._dot, float(np.sqrt(self._sq1 * self._sq2)))
+
+    @property
+    def correlation(self) -> float:
+        if not self.count:
+            return np.nan
+        n = self.count
+        cov = self._cov - self._sum1 * self._sum2 / n
+        var1 = self._var1 - self._sum1 ** 2 / n
+        var2 = self._var2 - self._sum2 ** 2 / n
+        return _ratio(cov, float(np.sqrt(max(var1, 0.0) * max(var2, 0.0))))
+
+
+def _ratio(num: float, den: float) -> float:
+    """num / den, or NaN when den vanishes"""
+    return num / den if den != 0.0 else np.nan
+
+
+def compare(
+    grid1: Union[Grid, str],
+    grid2: Union[Grid, str],
+    mask1: Union[Grid, str, np.ndarray, None] = None,
+    mask2: Union[Grid, str, np.ndarray, None] = None,
+    slab_bytes: int = SLAB_BYTES,
+) -> SimilarityReducer:
+    """Compare two same-shape fields in one pass over their slabs
+
+    Fields and masks given as paths (.dx, .dx.gz or .dxbin) are streamed,
+    so neither field is ever fully loaded; to compare a region only, pass
+    views from :meth:`Grid.box` (or a boolean mask such as the one from
+    :meth:`Grid.cylinder`).
+
+    :note: The coordinate transform option of similarity.c is not
+           supported; resample one field onto the other's lattice first.
+
+    :param grid1: First field (Grid or path)
+    :param grid2: Second field (Grid or path)
+    :param mask1: Optional mask of the first field: a Grid, a path or an
+                  array broadcastable to the data
+    :param mask2: Optional mask of the second field
+    :param slab_bytes: Upper bound on the bytes of all slabs held at once
+    :returns: The finished reducer
+    """
+    fields = [SlabSource(grid1), SlabSource(grid2)]
+    masks = [mask1, mask2]
+    streamed = [
+        idx
+        for idx, mask in enumerate(masks)
+        if isinstance(mask, (Grid, str))
+    ]
+    sources = fields + [SlabSource(masks[idx]) for idx in streamed]
+    dims = fields[0].dims
+    for source in sources[1:]:
+        if source.dims != dims:
+            raise ValueError(
+                f"Grid dimension mis-match: {dims} and {source.dims}"
+            )
+
+    planes = slab_planes(dims, 8, slab_bytes // (len(sources) + 2))
+    reducer = SimilarityReducer(fields[0].spaces)
+    start = 0
+    for group in zip(*(source.slabs(planes) for source in sources)):
+        stop = start + len(group[0])
+        slab_masks = list(masks)
+        for idx, slab in zip(streamed, group[2:]):
+            slab_masks[idx] = slab
+        for idx, mask in enumerate(slab_masks):
+            if isinstance(mask, np.ndarray) and idx not in streamed:
+                mask = np.broadcast_to(mask, dims)
+                slab_masks[idx] = mask[start:stop]
+        reducer.update(group[0], group[1], *slab_masks)
+        start = stop
+    return reducer
@@ -0,0 +1,362 @@
+"""
+UHBD scalar field I/O.
+
+Pulled over from Vgrid_writeUHBD in src/mg/vgrid.c and
+tools/mesh/uhbd_asc2bin.c, but whole planes are parsed, formatted and
+converted at once with numpy.
+"""
+from typing import IO, Iterable, Iterator, Tuple
+from .dx import format_exponential, iter_dx_values
+from .reduction import SLAB_BYTES, slab_planes
+import numpy as np
+
+# Values per line of the ASCII data section
+UHBD_LINE_VALUES = 6
+
+# Record of the binary header (Fortran unformatted, framed by the record
+# length before and after)
+UHBD_HEADER_DTYPE = np.dtype(
+    [
+        ("lead", "<i4"),
+        ("title", "S72"),
+        ("scale", "<f4"),
+        ("dum2", "<f4"),
+        ("grdflg", "<i4"),
+        ("idum2", "<i4"),
+        ("km", "<i4"),
+        ("one", "<i4"),
+        ("kmax", "<i4"),
+        ("im", "<i4"),
+        ("jm", "<i4"),
+        ("kmax2", "<i4"),
+        ("h", "<f4"),
+        ("origin", "<f4", 3),
+        ("dum", "<f4", 6),
+        ("idum", "<i4", 2),
+        ("trail", "<i4"),
+    ]
+)
+
+# Unframed header written by tools/mesh/uhbd_asc2bin.c (doubles)
+UHBD_RAW_HEADER_DTYPE = np.dtype(
+    [
+        ("title", "S72"),
+        ("scale", "<f8"),
+        ("dum2", "<f8"),
+        ("grdflg", "<i4"),
+        ("idum2", "<i4"),
+        ("km", "<i4"),
+        ("one", "<i4"),
+        ("kmax", "<i4"),
+        ("im", "<i4"),
+        ("jm", "<i4"),
+        ("kmax2", "<i4"),
+        ("h", "<f8"),
+        ("origin", "<f8", 3),
+        ("dum", "<f8", 6),
+        ("idum", "<i4", 2),
+    ]
+)
+
+
+class UHBDHeader:
+    """
+    Attributes:
+        dims   : Number of grid points in each direction
+        mins   : Grid origin (lower corner)
+        spaces : Grid spacing in each direction (UHBD grids are cubic)
+        title  : Title of the map
+        scale  : Scale factor of the values
+    """
+
+    def __init__(
+        self,
+        dims: Tuple[int, int, int],
+        mins: Tuple[float, float, float],
+        spacing: float,
+        title: str = "",
+        scale: float = 1.0,
+    ):
+        self.dims = dims
+        self.mins = mins
+        self.spaces = (spacing, spacing, spacing)
+        self.title = title
+        self.scale = scale
+
+    @property
+    def count(self) -> int:
+        """Number of grid values"""
+        nx, ny, nz = self.dims
+        return nx * ny * nz
+
+
+def _fields(line: str, widths) -> list:
+    """Split a fixed-width line (numbers may run into each other)"""
+    fields, pos = [], 0
+    for width in widths:
+        fields.append(line[pos:(pos + width)])
+        pos += width
+    return fields
+
+
+def _uniform_spacing(spaces) -> float:
+    """The spacing of a cubic lattice, which is all UHBD can describe"""
+    hx, hy, hz = (float(h) for h in spaces)
+    if not np.isclose(hx, hy) or not np.isclose(hx, hz):
+        raise ValueError(
+            f"UHBD format requires uniform grid spacing, got "
+            f"({hx}, {hy}, {hz})"
+        )
+    return hx
+
+
+def read_uhbd_header(stream: IO[str]) -> UHBDHeader:
+    """Parse the five header lines of an ASCII UHBD map
+
+    :param stream: Text stream at the start of the file
+    :return: The parsed header
+    """
+    title = stream.readline().strip()
+    line = _fields(stream.readline(), (12, 12, 7, 7, 7, 7, 7))
+    scale = float(line[0])
+    line = _fields(stream.readline(), (7, 7, 7, 12, 12, 12, 12))
+    try:
+        dims = tuple(int(field) for field in line[:3])
+        spacing = float(line[3])
+        origin = [float(field) for field in line[4:]]
+    except ValueError:
+        raise ValueError("Malformed UHBD grid header") from None
+    stream.readline()
+    stream.readline()
+    # The UHBD origin is the node before the first one (1-based indices)
+    mins = tuple(lo + spacing for lo in origin)
+    return UHBDHeader(dims, mins, spacing, title, scale)
+
+
+def read_uhbd_data(
+    stream: IO[str], header: UHBDHeader, dtype=np.float64
+) -> np.ndarray:
+    """Read the ASCII data section of a UHBD map
+
+    Each z-plane is a "k nx ny" line followed by its values, x fastest.
+    The section is parsed in large blocks into one preallocated array.
+
+    :param stream: Text stream positioned after the header
+    :param header: The header describing the data
+    :param dtype: Type of the returned array
+    :return: (nx, ny, nz) array
+    """
+    nx, ny, nz = header.dims
+    plane = nx * ny
+    items = np.empty(nz * (3 + plane))
+    pos = 0
+    for values in iter_dx_values(stream, len(items)):
+        items[pos:(pos + len(values))] = values
+        pos += len(values)
+    items = items.reshape(nz, 3 + plane)
+    expected = np.column_stack(
+        [np.arange(1, nz + 1), np.full(nz, nx), np.full(nz, ny)]
+    )
+    if not np.array_equal(items[:, :3], expected):
+        bad = np.flatnonzero(np.any(items[:, :3] != expected, axis=1))[0]
+        raise ValueError(f"Malformed UHBD plane header for plane {bad + 1}")
+    data = items[:, 3:].reshape(nz, ny, nx)
+    return np.ascontiguousarray(data.transpose(2, 1, 0), dtype=dtype)
+
+
+def format_uhbd_header(dims, spaces, mins, title: str = "") -> str:
+    """Format the UHBD header the way Vgrid_writeUHBD does
+
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction (must be uniform)
+    :param mins: Grid lower corner
+    :param title: Title of the map (at most 72 characters are kept)
+    :return: Header text, without the final newline
+    """
+    nx, ny, nz = (int(n) for n in dims)
+    h = _uniform_spacing(spaces)
+    origin = tuple(float(lo) - h for lo in mins)
+    return (
+        "%72s\n" % title[:72]
+        + "%12.5e%12.5e%7d%7d%7d%7d%7d\n" % (1.0, 0.0, -1, 0, nz, 1, nz)
+        + "%7d%7d%7d%12.5e%12.5e%12.5e%12.5e\n" % (nx, ny, nz, h, *origin)
+        + "%12.5e%12.5e%12.5e%12.5e\n" % (0.0, 0.0, 0.0, 0.0)
+        + "%12.5e%12.5e%7d%7d" % (0.0, 0.0, 0, 0)
+    )
+
+
+def format_uhbd_planes(planes: np.ndarray, first: int) -> str:
+    """Format consecutive z-planes as UHBD data lines
+
+    :param planes: (m, ny, nx) values, x fastest
+    :param first: 0-based index of the first plane
+    :return: Text of the planes, each preceded by its "k nx ny" line
+    """
+    count, ny, nx = planes.shape
+    chars = format_exponential(planes.ravel(), 5, 12)
+    rows = np.zeros((len(chars), chars.shape[1] + 2), dtype=np.uint8)
+    rows[:, 0] = ord(" ")
+    rows[:, 1:-1] = chars
+    column = np.arange(nx * ny) % UHBD_LINE_VALUES
+    newline = np.tile(column == UHBD_LINE_VALUES - 1, count)
+    rows[newline, -1] = ord("\n")
+
+    ends = np.cumsum(np.count_nonzero(rows, axis=1))[(nx * ny - 1)::(nx * ny)]
+    text = rows[rows != 0].tobytes().decode("ascii")
+    pieces, start = [], 0
+    for k, end in enumerate(ends):
+        pieces.append("\n%7d%7d%7d\n" % (first + k + 1, nx, ny))
+        pieces.append(text[start:end])
+        start = end
+    return "".join(pieces)
+
+
+def iter_z_planes(
+    data: np.ndarray, slab_bytes: int = SLAB_BYTES
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Walk (nx, ny, nz) data in blocks of z-planes, x fastest
+
+    :param data: (nx, ny, nz) array
+    :param slab_bytes: Approximate size of a block in bytes
+    :return: Iterator of (first plane, (m, ny, nx) block) pairs
+    """
+    nx, ny, nz = data.shape
+    step = slab_planes((nz, ny, nx), 8, slab_bytes)
+    for start in range(0, nz, step):
+        block = data[:, :, start:(start + step)]
+        yield start, np.asarray(block, dtype=np.float64).transpose(2, 1, 0)
+
+
+def write_uhbd_stream(
+    stream: IO[str], data: np.ndarray, dims, spaces, mins, title: str = ""
+) -> None:
+    """Write a complete ASCII UHBD map to a text stream
+
+    :param stream: Writable text stream
+    :param data: (nx, ny, nz) array (or array-like supporting slicing)
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction (must be uniform)
+    :param mins: Grid lower corner
+    :param title: Title of the map
+    """
+    stream.write(format_uhbd_header(dims, spaces, mins, title))
+    nx, ny, _ = (int(n) for n in dims)
+    for first, planes in iter_z_planes(data):
+        stream.write(format_uhbd_planes(planes, first))
+    if (nx * ny) % UHBD_LINE_VALUES:
+        stream.write("\n")
+
+
+def _plane_dtype(nx: int, ny: int, byteorder: str = "<") -> np.dtype:
+    """Records of one z-plane of a binary map: (k, nx, ny) then values"""
+    return np.dtype(
+        [
+            ("head", "i4", 5),
+            ("lead", "i4"),
+            ("values", "f4", (ny, nx)),
+            ("trail", "i4"),
+        ]
+    ).newbyteorder(byteorder)
+
+
+def read_uhbdbin(
+    stream: IO[bytes], dtype=np.float64
+) -> Tuple[UHBDHeader, np.ndarray]:
+    """Read a binary UHBD map
+
+    Both the Fortran unformatted layout used by UHBD itself (single
+    precision, framed records, either byte order) and the unframed double
+    precision layout written by uhbd_asc2bin are recognized. The planes
+    are read with one bulk read.
+
+    :param stream: Binary stream at the start of the file
+    :param dtype: Type of the returned array
+    :return: tuple of the header and the (nx, ny, nz) data
+    """
+    start = stream.tell()
+    lead = stream.read(4)
+    stream.seek(start)
+    size = UHBD_HEADER_DTYPE.itemsize - 8
+    framed = True
+    if int.from_bytes(lead, "little") == size:
+        header_dtype = UHBD_HEADER_DTYPE
+        byteorder = "<"
+    elif int.from_bytes(lead, "big") == size:
+        header_dtype = UHBD_HEADER_DTYPE.newbyteorder(">")
+        byteorder = ">"
+    else:
+        header_dtype = UHBD_RAW_HEADER_DTYPE
+        framed = False
+    record = np.fromfile(stream, header_dtype, 1)
+    if not len(record):
+        raise ValueError("Truncated UHBD grid header")
+    record = record[0]
+    dims = (int(record["im"]), int(record["jm"]), int(record["kmax"]))
+    spacing = float(record["h"])
+    header = UHBDHeader(
+        dims,
+        tuple(float(lo) + spacing for lo in record["origin"]),
+        spacing,
+        record["title"].decode("ascii", "replace").strip(),
+        float(record["scale"]),
+    )
+
+    nx, ny, nz = dims
+    if framed:
+        planes = np.fromfile(stream, _plane_dtype(nx, ny, byteorder), nz)
+        index = planes["head"][:, 1:4]
+    else:
+        raw = np.dtype([("head", "<i4", 3), ("values", "<f8", (ny, nx))])
+        planes = np.fromfile(stream, raw, nz)
+        index = planes["head"]
+    if len(planes) != nz:
+        raise ValueError(f"UHBD map holds {len(planes)} of {nz} planes")
+    expected = np.column_stack(
+        [np.arange(1, nz + 1), np.full(nz, nx), np.full(nz, ny)]
+    )
+    if not np.array_equal(index, expected):
+        raise ValueError("Malformed UHBD plane header")
+    data = planes["values"].transpose(2, 1, 0)
+    return header, np.ascontiguousarray(data, dtype=dtype)
+
+
+def write_uhbdbin_stream(
+    stream: IO[bytes],
+    blocks: Iterable[Tuple[int, np.ndarray]],
+    dims,
+    spaces,
+    mins,
+    title: str = "",
+) -> None:
+    """Write a binary UHBD map (Fortran unformatted, single precision)
+
+    :param stream: Writable binary stream
+    :param blocks: Blocks of z-planes from :func:`iter_z_planes`
+    :param dims: Number of grid points in each direction
+    :param spaces: Grid spacing in each direction (must be uniform)
+    :param mins: Grid lower corner
+    :param title: Title of the map
+    """
+    nx, ny, nz = (int(n) for n in dims)
+    h = _uniform_spacing(spaces)
+    record = np.zeros(1, UHBD_HEADER_DTYPE)
+    record["lead"] = record["trail"] = UHBD_HEADER_DTYPE.itemsize - 8
+    record["title"] = ("%72s" % title[:72]).encode("ascii", "replace")
+    record["scale"] = 1.0
+    record["grdflg"] = -1
+    record["km"] = record["kmax"] = record["kmax2"] = nz
+    record["one"] = 1
+    record["im"] = nx
+    record["jm"] = ny
+    record["h"] = h
+    record["origin"] = [float(lo) - h for lo in mins]
+    stream.write(record.tobytes())
+
+    dtype = _plane_dtype(nx, ny)
+    for first, block in blocks:
+        planes = np.zeros(len(block), dtype)
+        planes["head"] = [12, 0, nx, ny, 12]
+        planes["head"][:, 1] = np.arange(first + 1, first + len(block) + 1)
+        planes["lead"] = planes["trail"] = 4 * nx * ny
+        planes["values"] = block
+        stream.write(planes.tobytes())
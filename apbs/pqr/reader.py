@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from apbs.chemistry import Atom, AtomList
+from apbs.chemistry import AtomList
 from pyparsing import (
     Group,
     LineEnd,
@@ -14,6 +14,7 @@ from pyparsing import (
     printables,
 )
 
+import numpy as np
 import re
 
 
@@ -62,30 +63,41 @@ class PQRReader:
         :return: the list of Atoms in the pqr_string
         :rtype: AtomList
         """
-        atoms = []
-        idx: int = 1
+        positions = []
+        columns = {
+            name: []
+            for name in (
+                "charge",
+                "radius",
+                "field_name",
+                "atom_number",
+                "atom_name",
+                "residue_name",
+                "chain_id",
+                "residue_number",
+                "ins_code",
+            )
+        }
         matches = self.atom.parseString(pqr_string, parseAll=True)
         for match in matches:
             if re.search("REMARK|TER|END", match.field_name) is not None:
                 continue
-            atom = Atom(
-                field_name=match.field_name,
-                atom_number=int(match.atom_number),
-                atom_name=match.atom_name,
-                residue_name=match.residue_name,
-                chain_id=match.chain_id,
-                residue_number=int(match.residue_number),
-                ins_code=match.ins_code,
-                x=float(match.x),
-                y=float(match.y),
-                z=float(match.z),
-                charge=float(match.charge),
-                radius=float(match.radius),
-                id=int(idx),
-            )
-            atoms.append(atom)
-            idx += 1
-        return AtomList(atoms)
+            positions.append((float(match.x), float(match.y), float(match.z)))
+            for name, values in columns.items():
+                values.append(getattr(match, name))
+        if not positions:
+            return AtomList()
+        # Atom ids count from 1 in file order
+        return AtomList.from_arrays(
+            positions,
+            charges=np.array(columns.pop("charge"), dtype=np.float64),
+            radii=np.array(columns.pop("radius"), dtype=np.float64),
+            atom_number=np.array(columns.pop("atom_number"), dtype=np.int64),
+            residue_number=np.array(
+                columns.pop("residue_number"), dtype=np.int64
+            ),
+            **columns,
+        )
 
     def load(self, filename: str) -> AtomList:
         """
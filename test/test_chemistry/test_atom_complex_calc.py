@@ -1,16 +1,179 @@
-from apbs.chemistry import AtomComplexCalc
+from apbs.chemistry import (
+    AccessibilityFlag,
+    AtomComplexCalc,
+    AtomList,
+    CellList,
+)
+from apbs.chemistry import atom_complex_calc
+from apbs.geometry import Coordinate, CoordinateArray
+import numpy as np
 import pytest
 
 
+@pytest.fixture
+def calc() -> AtomComplexCalc:
+    rng = np.random.default_rng(4)
+    alist = AtomList.from_arrays(
+        rng.uniform(-4.0, 4.0, (40, 3)), radii=rng.uniform(1.0, 2.0, 40)
+    )
+    return AtomComplexCalc(alist, CellList(alist, 1.4), 1.0)
+
+
+def sample_points(count=3000, seed=5):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-8.0, 8.0, (count, 3))
+
+
+def point_overlaps(calc, point, radius, exclude=None):
+    """Reference point-by-point ivdwAccExclus over every atom"""
+    for atom in calc.alist:
+        if atom.id == exclude:
+            continue
+        if atom.euclidian_dist2(point) < (atom.radius + radius) ** 2:
+            return True
+    return False
+
+
+def point_mol_acc(calc, point, radius, surf):
+    """Reference point-by-point molAcc"""
+    if not point_overlaps(calc, point, radius):
+        return 1.0
+    if point_overlaps(calc, point, 0.0):
+        return 0.0
+    for idx in calc.clist.cell(Coordinate(*point)):
+        dist2 = ((surf[idx] - point) ** 2).sum(axis=1)
+        if (dist2 < radius ** 2).any():
+            return 1.0
+    return 0.0
+
+
 class TestAtomComplexCalc:
-    @pytest.mark.skip(reason="Needs test")
     def test_atom_surface(self):
-        pass
+        alist = AtomList.from_arrays(
+            [[0.0, 0.0, 0.0], [2.0, 0.0, 0.0]], radii=[1.0, 1.0]
+        )
+        sut = AtomComplexCalc(alist, CellList(alist, 1.4), 5.0)
+        ref = sut.ref_sphere
+        assert ref.npoints > 0
+
+        surf = sut.atom_surface(alist[0], ref, 1.4)
+        assert 0 < surf.npoints < ref.npoints
+        assert surf.is_on_surf.all()
+        # Every point is on the inflated sphere, outside the other atom's
+        assert np.sqrt(surf.points.norm2()) == pytest.approx(2.4)
+        assert (surf.points.dist2(alist[1].position) >= 2.4 ** 2).all()
+        assert surf.area == pytest.approx(
+            4.0 * np.pi * 2.4 ** 2 * surf.npoints / ref.npoints
+        )
+
+        # Without the other atom the whole sphere is accessible
+        alone = AtomComplexCalc(alist[:1], CellList(alist[:1], 1.4), 5.0)
+        surf = alone.atom_surface(alone.alist[0], alone.ref_sphere, 1.4)
+        assert surf.area == pytest.approx(4.0 * np.pi * 2.4 ** 2)
 
-    @pytest.mark.skip(reason="Needs test")
     def test_accessable_outside_inflated_venderwalls(self):
-        """
-        TODO: add test cases by grabbing data out of calls to the functions on
-        the C side of things.
-        """
-        pass
+        alist = AtomList.from_arrays(
+            [[0.0, 0.0, 0.0], [3.0, 0.0, 0.0]], radii=[1.0, 1.5]
+        )
+        sut = AtomComplexCalc(alist, CellList(alist, 1.4), 10.0)
+        ids = alist.ids
+
+        # Within 1.0 + 0.5 of the first atom only
+        point = Coordinate(-1.2, 0.0, 0.0)
+        assert not sut.accessible_outside_inflated_vdw_radius(point, 0.5, 0)
+        assert sut.accessible_outside_inflated_vdw_radius(point, 0.5, ids[0])
+
+        # Between both atoms
+        point = Coordinate(1.3, 0.0, 0.0)
+        assert not sut.accessible_outside_inflated_vdw_radius(
+            point, 0.5, ids[0]
+        )
+        assert sut.accessible_outside_inflated_vdw_radius(point, 0.0, 0)
+
+        # Far away
+        point = Coordinate(50.0, 0.0, 0.0)
+        assert sut.accessible_outside_inflated_vdw_radius(point, 1.4, 0)
+
+        with pytest.raises(RuntimeError):
+            sut.accessible_outside_inflated_vdw_radius(point, 2.0, 0)
+
+    def test_vdw_acc(self, calc):
+        points = sample_points()
+        expect = [not point_overlaps(calc, pt, 0.0) for pt in points]
+        assert calc.vdw_acc(points).tolist() == expect
+        expect = [not point_overlaps(calc, pt, 1.2) for pt in points]
+        assert calc.ivdw_acc(CoordinateArray(points), 1.2).tolist() == expect
+
+        with pytest.raises(RuntimeError):
+            calc.ivdw_acc(points, 1.5)
+
+    def test_mol_acc(self, calc, monkeypatch):
+        points = sample_points(1000)
+        offsets, surf = calc._surface_points(1.4)
+        surf = [surf[offsets[i]:offsets[i + 1]] for i in range(40)]
+        expect = [point_mol_acc(calc, pt, 1.4, surf) for pt in points]
+        acc = calc.mol_acc(points, 1.4)
+        assert acc.tolist() == expect
+        assert 0.0 < acc.mean() < 1.0
+        # The molecular surface lies between the vdW and inflated ones
+        assert (acc >= calc.ivdw_acc(points, 1.4)).all()
+        assert (acc <= calc.vdw_acc(points)).all()
+
+        # Same answers when evaluated in small pieces
+        monkeypatch.setattr(atom_complex_calc, "QUERY_POINTS", 37)
+        assert calc.mol_acc(points, 1.4).tolist() == expect
+
+    def test_grid_accessibility(self, calc, monkeypatch):
+        monkeypatch.setattr(atom_complex_calc, "QUERY_POINTS", 100)
+        dims, spaces, mins = (9, 10, 11), (1.0, 0.9, 0.8), (-4.0, -4.5, -4.0)
+        axes = [lo + h * np.arange(n) for n, h, lo in zip(dims, spaces, mins)]
+        points = np.stack(
+            np.meshgrid(*axes, indexing="ij"), axis=-1
+        ).reshape(-1, 3)
+        for flag in (
+            AccessibilityFlag.VanDerWaals,
+            AccessibilityFlag.InflatedVanDerWaals,
+            AccessibilityFlag.Molecular,
+        ):
+            mask = calc.grid_accessibility(dims, spaces, mins, flag, 1.4)
+            assert mask.shape == dims
+            expect = calc.accessibility(points, flag, 1.4)
+            assert mask.ravel().tolist() == expect.tolist()
+
+        with pytest.raises(ValueError):
+            calc.accessibility(points, 7, 1.4)
+
+    def test_sasa(self, calc, monkeypatch):
+        ref = calc.ref_sphere
+        areas = calc.atom_sasa(1.4)
+        assert areas.shape == (40,)
+        for atom in calc.alist:
+            surf = calc.atom_surface(atom, ref, 1.4)
+            assert calc.atom_sasa(1.4, atom) == pytest.approx(surf.area)
+            points = calc.atom_sas_points(1.4, atom._index)
+            assert np.array_equal(points.points.data, surf.points.data)
+        assert calc.total_sasa(1.4) == pytest.approx(areas.sum())
+        assert 0.0 < calc.total_sasa(1.4) < (
+            4.0 * np.pi * (calc.alist.radii + 1.4) ** 2
+        ).sum()
+
+        # Same answers when built in small pieces, and for a new radius
+        monkeypatch.setattr(atom_complex_calc, "SASA_POINTS", 50)
+        calc._dp.clear()
+        assert np.allclose(calc.atom_sasa(1.4), areas)
+        expect = sum(
+            calc.atom_surface(atom, ref, 1.0).area for atom in calc.alist
+        )
+        assert calc.total_sasa(1.0) == pytest.approx(expect)
+
+    def test_isolated_sasa(self):
+        alist = AtomList.from_arrays(
+            [[0.0, 0.0, 0.0], [9.0, 0.0, 0.0]], radii=[1.5, 0.0]
+        )
+        sut = AtomComplexCalc(alist, CellList(alist, 1.4), 3.0)
+        assert sut.atom_sasa(1.4, alist[0]) == pytest.approx(
+            4.0 * np.pi * 2.9 ** 2
+        )
+        assert sut.atom_sasa(1.4, 1) == 0.0
+        assert sut.atom_sas_points(1.4, 1).npoints == 0
+        assert sut.total_sasa(1.4) == pytest.approx(4.0 * np.pi * 2.9 ** 2)
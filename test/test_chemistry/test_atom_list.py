@@ -1,7 +1,8 @@
 from apbs.geometry import Coordinate
 from apbs.chemistry import Atom, AtomList
 from apbs.pqr import PQRReader
-from pytest import approx, fixture
+from pytest import approx, fixture, raises
+import numpy as np
 
 
 @fixture
@@ -71,3 +72,75 @@ def test_center(get_atom_list: AtomList):
     assert mi.x == 2.0
     assert mi.y == 5.0
     assert mi.z == 8.0
+
+
+def test_columns(get_atom_list: AtomList):
+
+    sut = get_atom_list
+    assert sut.positions.shape == (3, 3)
+    assert sut.positions.dtype == np.float64
+    assert sut.positions[:, 0] == approx([1.0, 2.0, 3.0])
+    assert sut.radii == approx([1.0, 2.0, 3.0])
+    assert list(sut.ids) == [1, 2, 3]
+    assert list(sut.codes("residue_name")) == [0, 0, 0]
+    assert sut.categories("residue_name") == ["ALK"]
+    assert list(sut.strings("atom_name")) == ["C", "C", "C"]
+
+
+def test_row_view(get_atom_list: AtomList):
+
+    sut = get_atom_list
+    a: Atom = sut[-1]
+    assert a.id == 3
+    assert sut.max_radius == 3.0
+
+    a.radius = 4.0
+    a.z = -1.0
+    a.residue_name = "GLY"
+    assert sut.radii[2] == 4.0
+    assert sut.positions[2, 2] == -1.0
+    assert sut.max_radius == 4.0
+    assert sut.min_coord.z == -1.0
+    assert sut.categories("residue_name") == ["ALK", "GLY"]
+    assert [atom.residue_name for atom in sut] == ["ALK", "ALK", "GLY"]
+
+
+def test_append():
+
+    atoms = [
+        Atom(field_name="ATOM", id=idx, x=-idx, y=0, z=idx, radius=idx)
+        for idx in range(1, 40)
+    ]
+    sut = AtomList(atoms[:1])
+    for atom in atoms[1:]:
+        sut.append(atom)
+    assert len(sut) == 39
+    assert sut.max_coord.x == -1.0
+    assert sut.max_radius == 39.0
+
+    # The appended atoms became views of the list
+    atoms[0].radius = 100.0
+    assert sut.max_radius == 100.0
+
+
+def test_from_arrays():
+
+    positions = np.arange(12.0).reshape(4, 3)
+    sut = AtomList.from_arrays(
+        positions,
+        charges=[1.0, -1.0, 0.5, 0.0],
+        residue_name=["ALA", "ALA", "GLY", "ALA"],
+    )
+    assert sut.count == 4
+    assert sut[2].position == Coordinate(6.0, 7.0, 8.0)
+    assert sut[2].residue_name == "GLY"
+    assert sut[0].field_name == "ATOM"
+    assert list(sut.ids) == [1, 2, 3, 4]
+
+    sub = sut[sut.charges > 0]
+    assert len(sub) == 2
+    assert list(sub.ids) == [1, 3]
+    assert list(sub.strings("residue_name")) == ["ALA", "GLY"]
+
+    with raises(ValueError):
+        AtomList.from_arrays(positions, bogus=[0, 0, 0, 0])
@@ -1,10 +1,80 @@
-from apbs.chemistry import CellList
-
-# from apbs.test.test_chemistry.test_atom_list import TestAtomList
+from apbs.chemistry import AtomList, CellList, DomainMode
+from apbs.chemistry.cell_list import hash_dims
+from apbs.geometry import Coordinate, CoordinateArray
+import numpy as np
 import pytest
 
 
-# class TestCellList(TestAtomList):
-#    @pytest.mark.skip(reason="Needs test")
-#    def test_cell_list_method(self):
-#        pass
+def random_atoms(count=200, seed=1) -> AtomList:
+    rng = np.random.default_rng(seed)
+    return AtomList.from_arrays(
+        rng.uniform(-10.0, 10.0, (count, 3)),
+        radii=rng.uniform(1.0, 2.0, count),
+    )
+
+
+def brute_force(alist, points, radius):
+    diff = points[:, np.newaxis, :] - alist.positions[np.newaxis, :, :]
+    dist2 = (diff ** 2).sum(axis=2)
+    return dist2 < (alist.radii + radius) ** 2
+
+
+class TestCellList:
+    def test_auto_domain(self):
+        alist = random_atoms()
+        sut = CellList(alist, 1.4, (10, 11, 12))
+        pad = 1.42 * (alist.max_radius + 1.4)
+        assert sut.lower_bound.x == pytest.approx(alist.min_coord.x - pad)
+        assert sut.upper_bound.z == pytest.approx(alist.max_coord.z + pad)
+        assert sut.n == 10 * 11 * 12
+        assert len(sut.cell_start) == sut.n + 1
+        assert sut.cell_start[-1] == len(sut.cell_atoms)
+        assert sut.stride.y == pytest.approx(
+            (sut.upper_bound.y - sut.lower_bound.y) / 10
+        )
+
+    def test_cells_cover_atoms(self):
+        alist = random_atoms()
+        sut = CellList(alist, 1.4, (9, 9, 9))
+        rng = np.random.default_rng(2)
+        points = rng.uniform(-12.0, 12.0, (500, 3))
+        expect = brute_force(alist, points, 1.4)
+        for point, hits in zip(points, expect):
+            cell = sut.cell(Coordinate(*point))
+            assert set(np.flatnonzero(hits)) <= set(cell)
+            # Atoms are listed once each, in atom order
+            assert (np.diff(cell) > 0).all()
+
+    def test_neighbors(self):
+        alist = random_atoms()
+        sut = CellList(alist, 1.4)
+        assert sut.npts == hash_dims(alist)
+        rng = np.random.default_rng(3)
+        points = rng.uniform(-15.0, 15.0, (1000, 3))
+        expect = brute_force(alist, points, 1.0)
+        offsets, atoms = sut.neighbors(CoordinateArray(points), 1.0)
+        assert len(offsets) == len(points) + 1
+        for idx, hits in enumerate(expect):
+            found = atoms[offsets[idx]:(offsets[idx + 1])]
+            assert sorted(found) == list(np.flatnonzero(hits))
+
+    def test_off_grid(self):
+        alist = random_atoms(20)
+        sut = CellList(
+            alist, 1.4, (5, 5, 5), DomainMode.Manual, (-5, -5, -5), (5, 5, 5)
+        )
+        assert sut.cell(Coordinate(8.0, 0.0, 0.0)) is None
+        offsets, atoms = sut.candidates([[0.0, 0.0, 0.0], [0.0, 0.0, 9.0]])
+        assert offsets[2] == offsets[1]
+        assert sut.cell_index([[0.0, 0.0, 9.0]]).tolist() == [-1]
+
+    def test_invalid(self):
+        alist = random_atoms(20)
+        with pytest.raises(ValueError):
+            CellList(alist, 1.4, (2, 5, 5))
+        with pytest.raises(ValueError):
+            CellList(alist, 1.4, mode=DomainMode.Manual)
+        with pytest.raises(ValueError):
+            CellList(AtomList(), 1.4)
+        with pytest.raises(ValueError):
+            CellList(alist, 1.4).neighbors([[0.0, 0.0, 0.0]], 2.0)
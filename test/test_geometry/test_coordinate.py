@@ -1,5 +1,5 @@
 import numpy as np
-from apbs.geometry import Coordinate
+from apbs.geometry import Coordinate, CoordinateArray
 import pytest
 
 
@@ -104,3 +104,70 @@ class TestCoordinate:
 
         c = Coordinate(-1, 2, 2)
         assert c.all(lambda x: x < 3)
+
+    def test_slots(self):
+        sut = Coordinate(1, 2, 3)
+        with pytest.raises(AttributeError):
+            sut.w = 4
+        assert tuple(sut) == (1, 2, 3)
+        assert 2.0 * sut == Coordinate(2, 4, 6)
+        assert -sut == Coordinate(-1, -2, -3)
+
+
+class TestCoordinateArray:
+    def test_ctor(self):
+        sut = CoordinateArray([Coordinate(1, 2, 3), Coordinate(4, 5, 6)])
+        assert len(sut) == 2
+        assert sut.data.dtype == np.float64
+        assert sut[1] == Coordinate(4, 5, 6)
+        assert sut.y.tolist() == [2, 5]
+        assert list(sut) == [Coordinate(1, 2, 3), Coordinate(4, 5, 6)]
+        assert len(CoordinateArray()) == 0
+
+        with pytest.raises(ValueError):
+            CoordinateArray.wrap(np.zeros(3))
+
+    def test_operators(self):
+        sut = CoordinateArray(np.arange(6.0).reshape(2, 3))
+        assert (sut + 1).data.tolist() == [[1, 2, 3], [4, 5, 6]]
+        assert (sut - Coordinate(0, 1, 2)).data.tolist() == [
+            [0, 0, 0],
+            [3, 3, 3],
+        ]
+        assert (sut * np.array([2.0, 3.0])).data.tolist() == [
+            [0, 2, 4],
+            [9, 12, 15],
+        ]
+        assert (2 * sut / sut[1:2]).data.tolist() == [
+            [0, 0.5, 0.8],
+            [2, 2, 2],
+        ]
+        assert (Coordinate(1, 1, 1) + sut).data.tolist() == [
+            [1, 2, 3],
+            [4, 5, 6],
+        ]
+        assert sut.dist2(Coordinate(0, 1, 2)).tolist() == [0, 27]
+
+        sut += 1
+        assert sut[0] == Coordinate(1, 2, 3)
+
+        with pytest.raises(RuntimeError):
+            sut + "1"
+
+    def test_comparisons(self):
+        sut = CoordinateArray([[0, 0, 0], [1, 1, 1], [2, 0, 2]])
+        assert (sut == Coordinate(1, 1, 1)).tolist() == [False, True, False]
+        assert (sut != Coordinate(1, 1, 1)).tolist() == [True, False, True]
+        assert (sut >= Coordinate(0, 0, 0)).tolist() == [True, True, True]
+        assert (sut > Coordinate(0, 0, 0)).tolist() == [False, True, False]
+        assert sut.any(lambda x: x > 1).tolist() == [False, False, True]
+        assert sut.all(lambda x: x > 0).tolist() == [False, True, False]
+
+    def test_views(self):
+        data = np.zeros((3, 3))
+        sut = CoordinateArray.wrap(data)
+        sut.x = [1, 2, 3]
+        sut[2] = Coordinate(7, 8, 9)
+        assert data.tolist() == [[1, 0, 0], [2, 0, 0], [7, 8, 9]]
+        sut[1:].z[:] = 5
+        assert data[:, 2].tolist() == [0, 5, 5]
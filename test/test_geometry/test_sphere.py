@@ -1,12 +1,24 @@
 from apbs.geometry import Sphere
 from apbs.geometry import Surface
+import numpy as np
 import pytest
 
 
 class TestSphere:
-    @pytest.mark.skip(reason="Needs to be implemented.")
     @pytest.mark.parametrize(
-        "npoints,expected", [(1e2, 0.0), (1e4, 0.0), (1e6, 0.0)]
+        "npoints,expected", [(1e2, 104), (1e4, 10086), (1e6, 999492)]
     )
     def test_spherical_distribution(self, npoints, expected):
         sut: Surface = Sphere.spherical_distribution(npoints)
+        assert sut.npoints == expected
+        assert sut.is_on_surf.all()
+        assert np.allclose(sut.points.norm2(), 1.0)
+        # The points are spread evenly over the sphere
+        assert np.abs(sut.points.data.mean(axis=0)).max() < 0.1
+
+    def test_cached_copies(self):
+        first = Sphere.spherical_distribution(500)
+        first.points.x = 0.0
+        second = Sphere.spherical_distribution(500)
+        assert second.points.norm2() == pytest.approx(1.0)
+        assert Sphere.spherical_distribution(1).npoints == 0
@@ -1,4 +1,4 @@
-from apbs.geometry import Surface
+from apbs.geometry import Coordinate, CoordinateArray, Surface, SurfacePoint
 import pytest
 
 
@@ -15,3 +15,33 @@ class TestSurface:
         tmp = 0
         with pytest.raises(IndexError):
             sut[idx] = tmp
+
+    def test_point_arrays(self):
+        sut = Surface(1.4, 3)
+        sut[1] = SurfacePoint(1, 2, 3, is_on_surf=True)
+        assert sut.points.data[1].tolist() == [1, 2, 3]
+        assert sut.is_on_surf.tolist() == [False, True, False]
+
+        point = sut[1]
+        assert point == Coordinate(1, 2, 3)
+        assert point.is_on_surf
+        assert [pt.is_on_surf for pt in sut.coords] == [False, True, False]
+
+        # Points read back are views that write through to the arrays
+        point.is_on_surf = False
+        assert not sut.is_on_surf[1]
+        sut.coords[-1].is_on_surf = True
+        sut[2].x = 4.0
+        sut.coords[0][2] = 5.0
+        assert sut.is_on_surf.tolist() == [False, False, True]
+        assert sut.points.data.tolist() == [[0, 0, 5], [1, 2, 3], [4, 0, 0]]
+        assert sut[2] == Coordinate(4, 0, 0)
+        assert isinstance(sut[2], SurfacePoint)
+        assert sut[0] + 1 == Coordinate(1, 1, 6)
+        with pytest.raises(AttributeError):
+            sut.coords.append(SurfacePoint(0, 0, 0))
+
+        sut = Surface(1.4, 2, points=CoordinateArray.zeros(2) + 1)
+        assert sut[-1] == Coordinate(1, 1, 1)
+        with pytest.raises(ValueError):
+            Surface(1.4, 3, points=CoordinateArray.zeros(2))
@@ -1,9 +1,29 @@
 from apbs.geometry import Coordinate
 from apbs.grid import Grid, CurvatureFlag
 from typing import List
+import numpy as np
 import pytest
 
 
+def lattice_grid(values, spaces, mins, dims=None, dtype=None) -> Grid:
+    """Grid of node values on a lattice, for tests
+
+    :param values: (nx, ny, nz) array of node values, or a function of the
+                   x, y and z node coordinate arrays (which needs dims)
+    :param spaces: Grid spacing in each direction
+    :param mins: Grid lower corner
+    :param dims: Number of grid points in each direction
+    :param dtype: Storage type of the data
+    :returns: The grid
+    """
+    if callable(values):
+        axes = [
+            lo + h * np.arange(n) for n, h, lo in zip(dims, spaces, mins)
+        ]
+        values = values(*np.meshgrid(*axes, indexing="ij"))
+    return Grid.from_array(values, spaces, mins, dtype=dtype)
+
+
 class TestGrid:
     def test_value(self, pt: Coordinate[float]):
         pass
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+from apbs.grid import ChunkCodec, ChunkedArray, Grid, evaluate
+from apbs.grid.resample import resample
+from . import lattice_grid
+import numpy as np
+import pytest
+
+
+def make_grid(dims=(21, 14, 9)):
+    return lattice_grid(
+        lambda x, y, z: np.sin(x) * np.cos(y) + 0.1 * z,
+        (0.5, 0.5, 0.5),
+        (-2.0, 1.0, 3.0),
+        dims,
+    )
+
+
+@pytest.fixture
+def grid():
+    return make_grid()
+
+
+@pytest.fixture
+def path(tmp_path, grid):
+    path = str(tmp_path / "grid.chk")
+    grid.write_chunked(path, "test", chunks=(8, 5, 4))
+    return path
+
+
+class TestChunked:
+    @pytest.mark.parametrize(
+        "codec", [ChunkCodec.Raw, ChunkCodec.Zlib, ChunkCodec.Lzma]
+    )
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_round_trip(self, tmp_path, grid, codec, workers):
+        path = str(tmp_path / "grid.chk")
+        grid.write_chunked(
+            path, chunks=(8, 5, 4), codec=codec, workers=workers
+        )
+        sut = Grid()
+        sut.read_chunked(path, lazy=False)
+        assert isinstance(sut.data, np.ndarray)
+        assert np.array_equal(sut.data, grid.data)
+        assert sut.lattice()[2] == pytest.approx([-2.0, 1.0, 3.0])
+
+    def test_float32(self, tmp_path, grid):
+        path = str(tmp_path / "grid.chk")
+        single = lattice_grid(
+            grid.data, (0.5, 0.5, 0.5), (0, 0, 0), dtype=np.float32
+        )
+        single.write_chunked(path)
+        with ChunkedArray(path) as sut:
+            assert sut.dtype == np.float32
+            assert np.array_equal(np.asarray(sut), grid.data.astype("f4"))
+
+    def test_compresses(self, tmp_path):
+        smooth = make_grid((64, 64, 64))
+        path = tmp_path / "grid.chk"
+        smooth.write_chunked(str(path))
+        assert path.stat().st_size < smooth.data.nbytes / 2
+
+    def test_slicing(self, path, grid):
+        with ChunkedArray(path) as sut:
+            for key in [
+                (slice(3, 17), slice(2, 11), slice(1, 8)),
+                (slice(None), 4),
+                (5,),
+                (slice(1, 20, 3), slice(None), slice(0, 9, 2)),
+                (slice(None, None, -1), 0, 0),
+                (-1, slice(-3, None), -2),
+            ]:
+                assert np.array_equal(sut[key], grid.data[key])
+            with pytest.raises(IndexError):
+                sut[21]
+
+    def test_region_reads_only_touched_blocks(self, path, grid):
+        with ChunkedArray(path) as sut:
+            region = sut[0:8, 5:10, 4:8]
+            assert np.array_equal(region, grid.data[0:8, 5:10, 4:8])
+            assert list(sut._cache) == [(0, 1, 1)]
+
+    def test_gather(self, path, grid):
+        rng = np.random.default_rng(2)
+        idx = [rng.integers(0, n, 50) for n in grid.data.shape]
+        with ChunkedArray(path, cache_blocks=2) as sut:
+            assert np.array_equal(sut[tuple(idx)], grid.data[tuple(idx)])
+            assert len(sut._cache) == 2
+
+    def test_lazy_grid(self, path, grid):
+        sut = Grid()
+        sut.read_chunked(path)
+        assert isinstance(sut.data, ChunkedArray)
+        rng = np.random.default_rng(4)
+        points = rng.uniform([-2.0, 1.0, 3.0], [8.0, 7.5, 7.0], (100, 3))
+        values, off = sut.values(points)
+        expect, expect_off = grid.values(points)
+        assert np.array_equal(off, expect_off)
+        assert values == pytest.approx(expect)
+
+        box = sut.box((0.0, 2.0, 4.0), (3.0, 4.0, 6.0))
+        expect = grid.box((0.0, 2.0, 4.0), (3.0, 4.0, 6.0))
+        assert np.array_equal(box.data, expect.data)
+        assert sut.integrate() == pytest.approx(grid.integrate())
+        assert sut.stats().max == grid.data.max()
+
+        out = str(path) + ".dx"
+        sut.write_dx(out)
+        again = Grid()
+        again.read_dx(out)
+        assert again.data == pytest.approx(grid.data, abs=1e-6)
+
+    def test_reductions_stay_chunked(self, path, grid, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError("decompressed the whole grid")
+
+        sut = Grid()
+        sut.read_chunked(path, cache_blocks=4)
+        monkeypatch.setattr(ChunkedArray, "__array__", fail)
+        # Walk the 21 x-planes in several slabs
+        for module in ("grid", "reduction"):
+            monkeypatch.setattr(
+                f"apbs.grid.{module}.slab_planes", lambda *args: 4
+            )
+        mask = grid.data > 0.2
+        assert sut.sum() == pytest.approx(grid.data.sum())
+        assert sut.mean(mask) == pytest.approx(grid.data[mask].mean())
+        for axis in range(3):
+            _, means = sut.axis_mean(axis, mask)
+            _, expect = grid.axis_mean(axis, mask)
+            assert np.allclose(means, expect, equal_nan=True)
+        assert np.allclose(sut.gradient_field(), grid.gradient_field())
+        result = evaluate(lambda a: 2.0 * a, [sut])
+        assert np.allclose(result.data, 2.0 * grid.data)
+
+    def test_not_chunked(self, tmp_path, grid):
+        path = str(tmp_path / "grid.dx")
+        grid.write_dx(path)
+        with pytest.raises(ValueError):
+            ChunkedArray(path)
+
+    def test_threads(self, tmp_path):
+        smooth = make_grid((64, 64, 64))
+        path = str(tmp_path / "grid.chk")
+        smooth.write_chunked(path, chunks=(8, 8, 8))
+        sut = Grid()
+        sut.read_chunked(path, cache_blocks=2)
+        spaces = (0.5, 0.5, 0.5)
+        mins = (-2.0, 1.0, 3.0)
+        args = (spaces, mins, (97, 80, 71), (0.3, 0.4, 0.45), mins)
+        expect = resample(smooth.data, *args)
+        for _ in range(3):
+            # Small slabs, so many threads read blocks at the same time
+            result = resample(sut.data, *args, workers=8, slab_bytes=1 << 15)
+            assert np.array_equal(result, expect)
+        assert np.array_equal(
+            sut.resample(dims=(97, 80, 71), workers=4).data,
+            smooth.resample(dims=(97, 80, 71)).data,
+        )
+
+        def blocks(seed):
+            rng = np.random.default_rng(seed)
+            for key in rng.integers(0, 8, (200, 3)):
+                block = sut.data.block(*key)
+                first = key * 8
+                src = smooth.data[tuple(slice(n, n + 8) for n in first)]
+                assert np.array_equal(block, src)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(blocks, range(8)))
+        sut.data.close()
@@ -0,0 +1,148 @@
+from apbs.grid import DXMath, Grid, SlabSource, evaluate
+import numpy as np
+import pytest
+from . import lattice_grid
+
+
+def make_grid(seed, dims=(6, 5, 4)):
+    rng = np.random.default_rng(seed)
+    return lattice_grid(
+        rng.uniform(0.5, 2.0, dims), (0.5, 1.0, 1.5), (-1.0, 0.0, 2.0)
+    )
+
+
+@pytest.fixture
+def grids():
+    return [make_grid(seed) for seed in range(3)]
+
+
+@pytest.fixture
+def paths(tmp_path, grids):
+    paths = [
+        str(tmp_path / "a.dx"),
+        str(tmp_path / "b.dxbin"),
+        str(tmp_path / "c.dx.gz"),
+    ]
+    grids[0].write_dx(paths[0])
+    grids[1].write_dxbin(paths[1])
+    grids[2].write_gz(paths[2])
+    return paths
+
+
+def expected(grids):
+    a, b, c = (np.asarray(grid.data) for grid in grids)
+    return (a - b) * c + 1.0
+
+
+class TestSlabSource:
+    @pytest.mark.parametrize("planes", [1, 4, 6, 10])
+    def test_slabs(self, paths, grids, planes):
+        for path, grid in zip(paths, grids):
+            source = SlabSource(path)
+            assert source.dims == (6, 5, 4)
+            assert source.spaces == pytest.approx((0.5, 1.0, 1.5))
+            assert source.mins == pytest.approx((-1.0, 0.0, 2.0))
+            slabs = list(source.slabs(planes, chunk_chars=64))
+            assert [len(slab) for slab in slabs[:-1]] == [planes] * (
+                len(slabs) - 1
+            )
+            assert np.concatenate(slabs) == pytest.approx(
+                np.asarray(grid.data), rel=1e-6
+            )
+
+
+class TestEvaluate:
+    def test_in_memory(self, grids):
+        result = evaluate(lambda a, b, c: (a - b) * c + 1.0, grids)
+        assert result.data == pytest.approx(expected(grids))
+        assert result.dims.x == 6 and result.spaces.z == 1.5
+        assert result.mins.x == -1.0
+
+    @pytest.mark.parametrize("slab_bytes", [1, 400, 1 << 20])
+    def test_streams_files(self, tmp_path, paths, grids, slab_bytes):
+        out = str(tmp_path / "out.dxbin")
+        evaluate(
+            lambda a, b, c: (a - b) * c + 1.0,
+            paths,
+            out,
+            slab_bytes=slab_bytes,
+        )
+        result = Grid()
+        result.read_dxbin(out)
+        assert result.data == pytest.approx(expected(grids), abs=1e-5)
+
+    def test_writes_dx(self, tmp_path, grids):
+        out = str(tmp_path / "out.dx")
+        evaluate(np.add, grids[:2], out)
+        result = Grid()
+        result.read_dx(out)
+        total = np.asarray(grids[0].data) + np.asarray(grids[1].data)
+        assert result.data == pytest.approx(total, rel=1e-6)
+
+        reference = str(tmp_path / "ref.dx")
+        Grid(
+            grids[0].dims,
+            grids[0].spaces,
+            grids[0].mins,
+            grids[0].maxs,
+            total,
+        ).write_dx(reference)
+        with open(out) as got, open(reference) as want:
+            assert got.read() == want.read()
+
+    def test_dimension_mismatch(self, grids):
+        with pytest.raises(ValueError):
+            evaluate(np.add, [grids[0], make_grid(0, dims=(6, 5, 3))])
+
+
+class TestDXMath:
+    def test_parse(self):
+        sut = DXMath.parse(
+            "# difference map\n"
+            "complex.dx\n"
+            "pep.dxbin -  % comment\n"
+            "2.5 *\n"
+            "rna.dx -\n"
+            "diff.dx =\n"
+        )
+        assert sut.operands == ["complex.dx", "pep.dxbin", 2.5, "rna.dx"]
+        assert sut.operators == ["-", "*", "-"]
+        assert sut.output == "diff.dx"
+
+    @pytest.mark.parametrize(
+        "text",
+        ["", "a.dx b.dx +", "a.dx b.dx", "a.dx b.dx % c.dx ="],
+    )
+    def test_parse_errors(self, text):
+        with pytest.raises(ValueError):
+            DXMath.parse(text)
+
+    def test_run(self, tmp_path, paths, grids):
+        out = str(tmp_path / "out.dx")
+        script = tmp_path / "dxmath.in"
+        script.write_text(
+            f"{paths[0]}\n{paths[1]} -\n{paths[2]} *\n1.0 +\n{out} =\n"
+        )
+        DXMath.read(str(script)).run(slab_bytes=500)
+        result = Grid()
+        result.read_dx(out)
+        assert result.data == pytest.approx(expected(grids), abs=1e-5)
+
+    @pytest.mark.parametrize("index", [0, 1, 2])
+    def test_overwrite_operand(self, tmp_path, paths, grids, index):
+        script = tmp_path / "dxmath.in"
+        script.write_text(
+            f"{paths[0]}\n{paths[1]} -\n{paths[2]} *\n1.0 +\n"
+            f"{paths[index]} =\n"
+        )
+        DXMath.read(str(script)).run(slab_bytes=500)
+        result = Grid()
+        read = [result.read_dx, result.read_dxbin, result.read_gz][index]
+        read(paths[index])
+        assert result.data == pytest.approx(expected(grids), abs=1e-5)
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "a.dx",
+            "b.dxbin",
+            "c.dx.gz",
+            "dxmath.in",
+        ]
@@ -0,0 +1,662 @@
+import gzip
+from apbs.geometry import Coordinate, CoordinateArray
+from apbs.grid import Grid, CurvatureFlag, SlabReducer, dx
+from apbs.grid.reduction import iter_slabs
+import numpy as np
+import pytest
+from . import lattice_grid
+
+
+def make_grid(dims=(5, 6, 7), spaces=(0.5, 1.0, 2.0), mins=(-1.0, 2.0, 0.0)):
+    """Build a grid holding the linear function u = x + 2y - 3z"""
+    maxs = [lo + h * (n - 1) for n, h, lo in zip(dims, spaces, mins)]
+    axes = [lo + h * np.arange(n) for n, h, lo in zip(dims, spaces, mins)]
+    x, y, z = np.meshgrid(*axes, indexing="ij")
+    return Grid(
+        Coordinate(*dims),
+        Coordinate(*spaces),
+        Coordinate(*mins),
+        Coordinate(*maxs),
+        x + 2.0 * y - 3.0 * z,
+    )
+
+
+def linear(points):
+    points = np.asarray(points)
+    return points[:, 0] + 2.0 * points[:, 1] - 3.0 * points[:, 2]
+
+
+class TestGridValues:
+    def test_values_interpolates(self):
+        sut = make_grid()
+        rng = np.random.default_rng(1)
+        points = rng.uniform((-1.0, 2.0, 0.0), (1.0, 7.0, 12.0), (100, 3))
+        values, off_grid = sut.values(points)
+        assert not off_grid.any()
+        assert values == pytest.approx(linear(points))
+
+    def test_values_off_grid(self):
+        sut = make_grid()
+        points = np.array(
+            [[-1.5, 3.0, 1.0], [0.0, 3.0, 12.5], [0.0, 3.0, 1.0]]
+        )
+        values, off_grid = sut.values(points)
+        assert off_grid.tolist() == [True, True, False]
+        assert values[:2].tolist() == [0.0, 0.0]
+        assert values[2] == pytest.approx(linear(points[2:])[0])
+
+    def test_values_snaps_to_edges(self):
+        sut = make_grid()
+        points = np.array(
+            [[-1.0 - 1e-7, 2.0 - 1e-7, 0.0], [1.0 + 1e-7, 7.0, 12.0 + 1e-7]]
+        )
+        values, off_grid = sut.values(points)
+        assert not off_grid.any()
+        assert values == pytest.approx(linear(points), abs=1e-5)
+
+    def test_value_matches_values(self):
+        sut = make_grid()
+        pt = Coordinate(0.25, 4.5, 3.0)
+        assert sut.value(pt) == pytest.approx(
+            linear([[0.25, 4.5, 3.0]])[0], abs=1e-5
+        )
+
+    def test_value_batch(self):
+        sut = make_grid()
+        rng = np.random.default_rng(2)
+        points = CoordinateArray(
+            rng.uniform((-1.0, 2.0, 0.0), (1.0, 7.0, 12.0), (50, 3))
+        )
+        assert sut.value(points) == pytest.approx(linear(points.data))
+
+
+def make_quadratic_grid():
+    """Build a grid holding u = x^2 + 2y^2 + 3z^2 + xy on a unit lattice"""
+    dims, mins = (6, 6, 6), (0.0, 0.0, 0.0)
+    x, y, z = np.meshgrid(*[np.arange(6.0)] * 3, indexing="ij")
+    return Grid(
+        Coordinate(*dims),
+        Coordinate(1.0, 1.0, 1.0),
+        Coordinate(*mins),
+        Coordinate(5.0, 5.0, 5.0),
+        x ** 2 + 2.0 * y ** 2 + 3.0 * z ** 2 + x * y,
+    )
+
+
+class TestGridDerivatives:
+    def test_gradient(self):
+        sut = make_grid()
+        points = np.array(
+            [[0.0, 4.0, 6.0], [-1.0, 2.0, 0.0], [1.0, 7.0, 12.0]]
+        )
+        grad, off_grid = sut.gradient(points)
+        assert not off_grid.any()
+        assert grad == pytest.approx(np.tile([1.0, 2.0, -3.0], (3, 1)))
+
+    def test_gradient_off_grid(self):
+        sut = make_grid()
+        grad, off_grid = sut.gradient(np.array([[5.0, 4.0, 6.0]]))
+        assert off_grid.tolist() == [True]
+        assert grad.tolist() == [[0.0, 0.0, 0.0]]
+
+    def test_gradient_field(self):
+        sut = make_grid()
+        points = np.array([[0.1, 4.3, 6.7], [-0.7, 2.5, 11.0]])
+        expect, _ = sut.gradient(points)
+        grad, off_grid = sut.gradient(points, use_field=True)
+        assert not off_grid.any()
+        assert grad == pytest.approx(expect)
+        assert sut.gradient_field() is sut.gradient_field()
+        sut.data = sut.data * 2.0
+        grad, _ = sut.gradient(points, use_field=True)
+        assert grad == pytest.approx(2.0 * expect)
+
+    @pytest.mark.parametrize(
+        "cflag,expect",
+        [
+            (CurvatureFlag.ReducedMaximalCurvature, 6.0),
+            (CurvatureFlag.MeanCurvature, 4.0),
+            (CurvatureFlag.GaussCurvature, 42.0),
+            (CurvatureFlag.TrueMaximalCurvature, None),
+        ],
+    )
+    def test_curvature(self, cflag, expect):
+        sut = make_quadratic_grid()
+        hess = np.array([[2.0, 1.0, 0.0], [1.0, 4.0, 0.0], [0.0, 0.0, 6.0]])
+        if expect is None:
+            expect = np.abs(np.linalg.eigvalsh(hess)).max()
+        points = np.array([[1.0, 2.0, 3.0], [4.0, 4.0, 1.0]])
+        curv, off_grid = sut.curvature(points, cflag)
+        assert not off_grid.any()
+        assert curv == pytest.approx([expect, expect])
+
+    def test_curvature_off_grid(self):
+        sut = make_quadratic_grid()
+        curv, off_grid = sut.curvature(
+            np.array([[0.0, 2.0, 3.0]]), CurvatureFlag.MeanCurvature
+        )
+        assert off_grid.tolist() == [True]
+        with pytest.raises(ValueError):
+            sut.curvature(np.zeros((1, 3)), 7)
+
+
+class TestGridReductions:
+    def setup_method(self):
+        rng = np.random.default_rng(7)
+        self.sut = make_grid()
+        self.sut.data = rng.normal(size=(5, 6, 7))
+        self.volume = 0.5 * 1.0 * 2.0
+
+    def test_integrate(self):
+        data = self.sut.data
+        weights = [np.ones(n) for n in data.shape]
+        for w in weights:
+            w[0] = w[-1] = 0.5
+        expect = np.einsum("ijk,i,j,k->", data, *weights) * self.volume
+        assert self.sut.integrate() == pytest.approx(expect)
+
+    def test_norms(self):
+        data = self.sut.data
+        assert self.sut.norml1() == pytest.approx(
+            np.abs(data).sum() * self.volume
+        )
+        assert self.sut.norml2() == pytest.approx(
+            np.sqrt((data ** 2).sum() * self.volume)
+        )
+        assert self.sut.norml_inf() == pytest.approx(np.abs(data).max())
+
+    def test_h1(self):
+        grad = self.sut.gradient_field()
+        semi = np.sqrt((grad ** 2).sum() * self.volume)
+        assert self.sut.seminormH1() == pytest.approx(semi)
+        assert self.sut.normH1() == pytest.approx(
+            np.sqrt(semi ** 2 + self.sut.norml2() ** 2)
+        )
+
+    @pytest.mark.parametrize("slab_bytes", [1, 6 * 7 * 8 * 2, 1 << 20])
+    def test_streamed_slabs(self, slab_bytes):
+        reducer = SlabReducer((5, 6, 7), (0.5, 1.0, 2.0), gradient=True)
+        for _, slab in self.sut.iter_slabs(slab_bytes):
+            reducer.update(slab)
+        assert reducer.integral == pytest.approx(self.sut.integrate())
+        assert reducer.seminorm_h1 == pytest.approx(self.sut.seminormH1())
+
+    @pytest.mark.parametrize("slab_bytes", [1, 1 << 20])
+    def test_nan_norms(self, slab_bytes):
+        reducer = SlabReducer((5, 6, 7), (0.5, 1.0, 2.0))
+        data = np.ones((5, 6, 7))
+        data[0, 0, 0] = 5.0
+        data[0, 3, 3] = np.nan
+        for _, slab in iter_slabs(data, slab_bytes):
+            reducer.update(slab)
+        assert np.isnan(reducer.norm_linf)
+        assert np.isnan(reducer.norm_l1)
+
+        data[0, 3, 3] = 1.0
+        data[4, 5, 6] = -np.inf
+        sut = lattice_grid(data, (0.5, 1.0, 2.0), (0, 0, 0))
+        assert sut.norml_inf() == np.inf
+
+    def test_incomplete_stream(self):
+        reducer = SlabReducer((5, 6, 7), (0.5, 1.0, 2.0))
+        reducer.update(self.sut.data[:2])
+        with pytest.raises(RuntimeError):
+            reducer.integral
+
+
+class TestGridLattice:
+    def test_from_array(self):
+        expect = make_grid()
+        sut = Grid.from_array(expect.data, (0.5, 1.0, 2.0), (-1.0, 2.0, 0.0))
+        assert sut.data is expect.data
+        assert sut.dims == expect.dims
+        assert sut.maxs == expect.maxs
+        dims, spaces, mins, maxs = sut.lattice()
+        assert dims.tolist() == [5, 6, 7]
+        assert spaces.tolist() == [0.5, 1.0, 2.0]
+        assert maxs.tolist() == [1.0, 7.0, 12.0]
+        with pytest.raises(ValueError):
+            Grid.from_array(np.zeros((3, 4)), (1, 1, 1), (0, 0, 0))
+
+
+class TestGridRegions:
+    def test_box_is_view(self):
+        sut = make_grid()
+        sub = sut.box((-0.6, 2.5, 1.0), (0.6, 5.0, 20.0))
+        assert np.shares_memory(sub.data, sut.data)
+        assert sub.data.shape == (3, 3, 6)
+        assert [sub.mins.x, sub.mins.y, sub.mins.z] == [-0.5, 3.0, 2.0]
+        assert [sub.maxs.x, sub.maxs.y, sub.maxs.z] == [0.5, 5.0, 12.0]
+        points = np.array([[-0.25, 4.5, 7.0], [0.0, 3.0, 2.0]])
+        values, off_grid = sub.values(points)
+        assert not off_grid.any()
+        assert values == pytest.approx(linear(points))
+
+    def test_box_empty(self):
+        with pytest.raises(ValueError):
+            make_grid().box((-0.9, 2.0, 0.0), (-0.6, 7.0, 12.0))
+
+    def test_slab(self):
+        sut = make_grid()
+        sub = sut.slab(1, 3.5, 5.0)
+        assert sub.data.shape == (5, 2, 7)
+        assert np.shares_memory(sub.data, sut.data)
+        assert sub.axis_coordinates(1).tolist() == [4.0, 5.0]
+
+    def test_cylinder(self):
+        sut = make_grid(dims=(9, 9, 4), spaces=(0.5, 0.5, 1.0))
+        sub, mask = sut.cylinder((0.0, 4.0, 0.0), 1.0, axis=2)
+        assert mask.shape == (5, 5, 1)
+        assert np.shares_memory(sub.data, sut.data)
+        x = sub.axis_coordinates(0)[:, np.newaxis]
+        y = sub.axis_coordinates(1)[np.newaxis, :]
+        inside = x ** 2 + (y - 4.0) ** 2 <= 1.0
+        assert mask[:, :, 0].tolist() == inside.tolist()
+
+    def test_sum_and_mean(self):
+        sut = make_grid()
+        assert sut.sum() == pytest.approx(sut.data.sum())
+        assert sut.mean() == pytest.approx(sut.data.mean())
+        mask = sut.data > 0
+        assert sut.mean(mask) == pytest.approx(sut.data[mask].mean())
+        assert np.isnan(sut.mean(np.zeros(sut.data.shape, dtype=bool)))
+
+    def test_axis_mean(self):
+        sut = make_grid()
+        z, means = sut.axis_mean(2)
+        assert z.tolist() == [0.0, 2.0, 4.0, 6.0, 8.0, 10.0, 12.0]
+        assert means == pytest.approx(sut.data.mean(axis=(0, 1)))
+
+    def test_axis_mean_masked(self):
+        sut = make_grid(dims=(9, 9, 4), spaces=(0.5, 0.5, 1.0))
+        sub, mask = sut.cylinder((0.0, 4.0, 0.0), 1.0, axis=2)
+        _, means = sub.axis_mean(2, mask)
+        expected = [
+            sub.data[:, :, k][mask[:, :, 0]].mean() for k in range(4)
+        ]
+        assert means == pytest.approx(expected)
+        mask = np.zeros((1, 1, 4), dtype=bool)
+        mask[..., 1] = True
+        _, means = sub.axis_mean(2, mask)
+        assert np.isnan(means[[0, 2, 3]]).all()
+
+
+class TestGridResample:
+    def nodes(self, grid):
+        axes = [grid.axis_coordinates(axis) for axis in range(3)]
+        return np.stack(np.meshgrid(*axes, indexing="ij"), -1).reshape(-1, 3)
+
+    def test_matches_values(self):
+        sut = make_quadratic_grid()
+        new = sut.resample(dims=(7, 4, 9), mins=(0.9, 0.1, 0.7))
+        expected, off_grid = sut.values(self.nodes(new))
+        assert not off_grid.any()
+        assert new.data.ravel() == pytest.approx(expected)
+        assert new.lattice()[3] == pytest.approx(sut.lattice()[3])
+
+    @pytest.mark.parametrize("order", [1, 3])
+    def test_linear_is_exact(self, order):
+        sut = make_grid()
+        new = sut.resample(spaces=(0.3, 0.7, 1.1), order=order)
+        assert new.dims.x == 7 and new.dims.y == 8 and new.dims.z == 11
+        expected = linear(self.nodes(new))
+        assert new.data.ravel() == pytest.approx(expected, abs=1e-5)
+
+    def test_cubic_upsampling(self):
+        sut = make_quadratic_grid()
+        _, spaces, _, _ = sut.lattice()
+        new = sut.resample(spaces=spaces / 3, order=3)
+        points = self.nodes(new)
+        x, y, z = points.T
+        exact = x ** 2 + 2.0 * y ** 2 + 3.0 * z ** 2 + x * y
+        cubic = np.abs(new.data.ravel() - exact)
+        linear_err = np.abs(sut.resample(spaces=spaces / 3).data.ravel())
+        linear_err = np.abs(linear_err - exact)
+        assert cubic.max() < linear_err.max()
+
+    def test_crop_and_fill(self):
+        sut = make_grid()
+        new = sut.resample(
+            spaces=(0.5, 1.0, 2.0),
+            mins=(-2.0, 3.0, 4.0),
+            maxs=(0.0, 5.0, 8.0),
+            fill=np.nan,
+        )
+        assert new.data.shape == (5, 3, 3)
+        assert np.isnan(new.data[:2]).all()
+        inner = new.data[2:]
+        points = self.nodes(new).reshape(5, 3, 3, 3)[2:].reshape(-1, 3)
+        assert inner.ravel() == pytest.approx(linear(points), abs=1e-5)
+
+    def test_workers_and_slabs(self):
+        from apbs.grid import resample
+
+        sut = make_quadratic_grid()
+        expected = sut.resample(dims=(13, 11, 9), order=3).data
+        got = resample.resample(
+            np.asarray(sut.data),
+            sut.lattice()[1],
+            sut.lattice()[2],
+            (13, 11, 9),
+            (sut.lattice()[3] - sut.lattice()[2]) / [12, 10, 8],
+            sut.lattice()[2],
+            order=3,
+            workers=3,
+            slab_bytes=1,
+        )
+        assert got == pytest.approx(expected)
+
+    def test_keeps_dtype(self, monkeypatch):
+        from apbs.grid import grid, resample
+
+        results = []
+
+        def spy(*args, **kwargs):
+            results.append(resample.resample(*args, **kwargs))
+            return results[-1]
+
+        monkeypatch.setattr(grid, "resample", spy)
+        expected = make_quadratic_grid().resample(dims=(13, 11, 9))
+        sut = make_quadratic_grid()
+        sut.data = sut.data.astype(np.float32)
+        sut.dtype = np.dtype(np.float32)
+        new = sut.resample(dims=(13, 11, 9))
+        assert results[-1].dtype == np.float32
+        assert new.data is results[-1]
+        assert new.dtype == np.float32
+        assert new.data == pytest.approx(expected.data, rel=1e-6)
+
+    def test_invalid(self):
+        sut = make_grid()
+        with pytest.raises(ValueError):
+            sut.resample(dims=(4, 4, 4), order=2)
+        with pytest.raises(ValueError):
+            sut.resample(mins=(1.0, 1.0, 1.0), maxs=(0.0, 2.0, 2.0))
+
+
+def write_c_dx(path, grid):
+    """Write a DX file the way Vgrid_writeDX does"""
+    nx, ny, nz = grid.data.shape
+    flat = grid.data.ravel()
+    with open(path, "w") as fobj:
+        fobj.write("# Data from APBS\n# \n# test\n# \n")
+        fobj.write(f"object 1 class gridpositions counts {nx} {ny} {nz}\n")
+        fobj.write(
+            "origin %12.6e %12.6e %12.6e\n"
+            % (grid.mins.x, grid.mins.y, grid.mins.z)
+        )
+        fobj.write("delta %12.6e %12.6e %12.6e\n" % (grid.spaces.x, 0, 0))
+        fobj.write("delta %12.6e %12.6e %12.6e\n" % (0, grid.spaces.y, 0))
+        fobj.write("delta %12.6e %12.6e %12.6e\n" % (0, 0, grid.spaces.z))
+        fobj.write(
+            f"object 2 class gridconnections counts {nx} {ny} {nz}\n"
+        )
+        fobj.write(
+            "object 3 class array type double rank 0 items "
+            f"{flat.size} data follows\n"
+        )
+        for idx in range(0, flat.size, 3):
+            fobj.write(
+                "".join("%12.6e " % val for val in flat[idx:(idx + 3)])
+                + "\n"
+            )
+        fobj.write('attribute "dep" string "positions"\n')
+        fobj.write(
+            'object "regular positions regular connections" class field\n'
+        )
+        fobj.write('component "positions" value 1\n')
+        fobj.write('component "connections" value 2\n')
+        fobj.write('component "data" value 3\n')
+
+
+class TestGridDX:
+    def test_read_dx(self, tmp_path):
+        expect = make_grid()
+        write_c_dx(tmp_path / "grid.dx", expect)
+
+        sut = Grid()
+        sut.read_dx(tmp_path / "grid.dx")
+        assert sut.dims == Coordinate(5, 6, 7)
+        assert sut.spaces == Coordinate(0.5, 1.0, 2.0)
+        assert sut.mins == Coordinate(-1.0, 2.0, 0.0)
+        assert sut.maxs == Coordinate(1.0, 7.0, 12.0)
+        assert sut.data.dtype == np.float64
+        assert sut.data.flags.c_contiguous
+        assert sut.data == pytest.approx(expect.data, rel=1e-6)
+
+    def test_read_dx_small_chunks(self, tmp_path):
+        expect = make_grid()
+        write_c_dx(tmp_path / "grid.dx", expect)
+        with open(tmp_path / "grid.dx") as stream:
+            header = dx.read_dx_header(stream)
+            values = list(dx.iter_dx_values(stream, header.count, 17))
+        assert len(values) > 1
+        assert np.concatenate(values) == pytest.approx(
+            expect.data.ravel(), rel=1e-6
+        )
+
+    def test_read_dx_truncated(self, tmp_path):
+        write_c_dx(tmp_path / "grid.dx", make_grid())
+        lines = open(tmp_path / "grid.dx").readlines()
+        with open(tmp_path / "bad.dx", "w") as fobj:
+            fobj.writelines(lines[:20] + lines[-5:])
+        with pytest.raises(ValueError):
+            Grid().read_dx(tmp_path / "bad.dx")
+
+    @pytest.mark.parametrize("mmap", [True, False])
+    def test_dxbin_round_trip(self, tmp_path, mmap):
+        expect = make_grid()
+        expect.write_dxbin(tmp_path / "grid.dxbin", title="round trip")
+
+        sut = Grid()
+        sut.read_dxbin(tmp_path / "grid.dxbin", mmap=mmap)
+        assert isinstance(sut.data, np.memmap) == mmap
+        assert sut.dims == expect.dims
+        assert sut.mins == expect.mins
+        assert sut.spaces == expect.spaces
+        assert (sut.data == expect.data).all()
+        points = np.array([[0.1, 3.3, 4.4], [0.9, 6.5, 11.9]])
+        assert sut.values(points)[0] == pytest.approx(linear(points))
+        assert sut.integrate() == pytest.approx(expect.integrate())
+
+    def test_read_dxbin_checks(self, tmp_path):
+        grid = make_grid()
+        grid.write_dx(tmp_path / "grid.dx")
+        with pytest.raises(ValueError):
+            Grid().read_dxbin(tmp_path / "grid.dx")
+
+        grid.write_dxbin(tmp_path / "grid.dxbin")
+        raw = open(tmp_path / "grid.dxbin", "rb").read()
+        offset = raw.index(b"data follows\n") + len(b"data follows\n")
+        with open(tmp_path / "short.dxbin", "wb") as fobj:
+            fobj.write(raw[:(offset + 8 * grid.data.size - 8)])
+        for mmap in (True, False):
+            with pytest.raises(ValueError):
+                Grid().read_dxbin(tmp_path / "short.dxbin", mmap=mmap)
+
+    @pytest.mark.parametrize(
+        "write,read",
+        [
+            ("write_dxbin", "read_dxbin"),
+            ("write_dx", "read_dx"),
+            ("write_gz", "read_gz"),
+            ("write_uhbdbin", "read_uhbdbin"),
+        ],
+    )
+    def test_write_over_mapped_source(self, tmp_path, write, read):
+        expect = lattice_grid(make_grid().data, (1.0, 1.0, 1.0), (0, 0, 0))
+        fn = tmp_path / "grid.dxbin"
+        expect.write_dxbin(fn)
+        sut = Grid()
+        sut.read_dxbin(fn)
+        getattr(sut, write)(fn, title="x")
+        assert sut.data == pytest.approx(expect.data)
+        result = Grid()
+        getattr(result, read)(fn)
+        assert result.data == pytest.approx(expect.data, rel=1e-6)
+        assert [path.name for path in tmp_path.iterdir()] == ["grid.dxbin"]
+
+    def test_dxbin_layout(self, tmp_path):
+        """The payload is raw little-endian doubles in z-fastest order"""
+        expect = make_grid()
+        expect.write_dxbin(tmp_path / "grid.dxbin")
+        raw = open(tmp_path / "grid.dxbin", "rb").read()
+        offset = raw.index(b"data follows\n") + len(b"data follows\n")
+        payload = np.frombuffer(raw, "<f8", expect.data.size, offset)
+        assert (payload == expect.data.ravel()).all()
+        assert raw[offset + payload.nbytes:].startswith(b"\nattribute")
+
+    def test_gz_round_trip(self, tmp_path):
+        expect = make_grid()
+        expect.write_gz(tmp_path / "grid.dx.gz", title="compressed")
+
+        with gzip.open(tmp_path / "grid.dx.gz", "rt") as stream:
+            text = stream.read()
+        assert text.startswith("# Data from APBS")
+        assert "items 210 data follows\n" in text
+        assert text.endswith('component "data" value 3\n')
+
+        sut = Grid()
+        sut.read_gz(tmp_path / "grid.dx.gz")
+        assert sut.dims == expect.dims
+        assert sut.maxs == expect.maxs
+        assert sut.data == pytest.approx(expect.data, rel=1e-6)
+
+    def test_read_gz_of_c_output(self, tmp_path):
+        expect = make_grid()
+        write_c_dx(tmp_path / "grid.dx", expect)
+        with open(tmp_path / "grid.dx", "rb") as src:
+            with gzip.open(tmp_path / "grid.dx.gz", "wb") as dst:
+                dst.write(src.read())
+        sut = Grid()
+        sut.read_gz(tmp_path / "grid.dx.gz")
+        assert sut.data == pytest.approx(expect.data, rel=1e-6)
+
+    @pytest.mark.parametrize("block_values", [3, 7, 100])
+    def test_dx_blocks(self, block_values):
+        data = np.arange(2 * 5 * 7, dtype=float).reshape(2, 5, 7)
+        blocks = list(dx.iter_dx_blocks(iter(data), block_values))
+        assert all(len(block) % 3 == 0 for block in blocks[:-1])
+        text = "".join(dx.format_dx_values(block) for block in blocks)
+        lines = text.splitlines()
+        assert len(lines) == 24
+        assert lines[0] == "0.000000e+00 1.000000e+00 2.000000e+00 "
+        assert lines[-1] == "6.900000e+01 "
+
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_write_dx_matches_c(self, tmp_path, workers):
+        expect = make_grid()
+        expect.data = np.random.default_rng(3).normal(size=(5, 6, 7))
+        write_c_dx(tmp_path / "c.dx", expect)
+        expect.write_dx(tmp_path / "py.dx", title="test", workers=workers)
+
+        c_lines = open(tmp_path / "c.dx").readlines()
+        py_lines = open(tmp_path / "py.dx").readlines()
+        # Only the package string in the first comment may differ
+        assert py_lines[1:] == c_lines[1:]
+
+        sut = Grid()
+        sut.read_dx(tmp_path / "py.dx")
+        assert sut.data == pytest.approx(expect.data, rel=1e-6)
+
+    def test_format_dx_values(self):
+        values = np.array(
+            [
+                0.0,
+                -0.0,
+                1.0,
+                -2.5e-7,
+                9.9999995,
+                0.99999949,
+                1.2345675e100,
+                -3.0e-150,
+                5e-324,
+                np.nan,
+                -np.inf,
+                123456789.0,
+                0.5e-5,
+                7.0,
+            ]
+        )
+        expect = "".join("%12.6e " % val for val in values)
+        text = dx.format_dx_values(values)
+        assert text.replace("\n", "") == expect
+        assert text.count("\n") == 5
+        assert text.endswith("7.000000e+00 \n")
+
+
+class TestGridFloat32:
+    def setup_method(self):
+        rng = np.random.default_rng(9)
+        self.ref = make_grid()
+        self.ref.data = rng.normal(size=(5, 6, 7))
+        self.sut = make_grid()
+        self.sut.dtype = np.dtype(np.float32)
+        self.sut.data = self.ref.data.astype(np.float32)
+
+    def test_construction(self):
+        sut = Grid(data=[[[1.0]]], dtype=np.float32)
+        assert sut.data.dtype == np.float32
+        assert Grid().dtype == np.float64
+
+    def test_reductions_accumulate_in_float64(self):
+        big = lattice_grid(
+            np.full((200, 100, 100), 0.1),
+            (1, 1, 1),
+            (0, 0, 0),
+            dtype=np.float32,
+        )
+        expect = float(np.float32(0.1)) * 2e6
+        assert big.sum() == pytest.approx(expect, rel=1e-12)
+        assert big.norml1() == pytest.approx(expect, rel=1e-12)
+
+        data = self.sut.data.astype(np.float64)
+        self.ref.data = data
+        assert self.sut.integrate() == pytest.approx(self.ref.integrate())
+        assert self.sut.norml2() == pytest.approx(self.ref.norml2())
+        assert self.sut.seminormH1() == pytest.approx(self.ref.seminormH1())
+
+    def test_interpolation_in_float64(self):
+        points = np.array([[0.1, 3.3, 4.1], [0.7, 5.5, 9.9]])
+        values, _ = self.sut.values(points)
+        assert values.dtype == np.float64
+        expect, _ = self.ref.values(points)
+        assert values == pytest.approx(expect, rel=1e-6)
+
+    def test_derived_grids_keep_dtype(self):
+        assert self.sut.box((0, 3, 2), (1, 6, 8)).data.dtype == np.float32
+        resampled = self.sut.resample(dims=(3, 3, 3))
+        assert resampled.data.dtype == np.float32
+
+    @pytest.mark.parametrize(
+        "name, write, read",
+        [
+            ("grid.dx", "write_dx", "read_dx"),
+            ("grid.dx.gz", "write_gz", "read_gz"),
+            ("grid.dxbin", "write_dxbin", "read_dxbin"),
+        ],
+    )
+    def test_read_write(self, tmp_path, name, write, read):
+        path = str(tmp_path / name)
+        getattr(self.ref, write)(path)
+        sut = Grid(dtype=np.float32)
+        getattr(sut, read)(path)
+        assert sut.data.dtype == np.float32
+        assert sut.data == pytest.approx(self.ref.data, rel=1e-6)
+
+        getattr(sut, write)(path)
+        again = Grid()
+        getattr(again, read)(path)
+        assert again.data.dtype == np.float64
+        assert again.data == pytest.approx(sut.data, rel=1e-6)
+
+    def test_uhbd(self, tmp_path):
+        self.ref = lattice_grid(self.ref.data, (0.5, 0.5, 0.5), (0, 0, 0))
+        path = str(tmp_path / "grid.bin")
+        self.ref.write_uhbdbin(path)
+        sut = Grid(dtype=np.float32)
+        sut.read_uhbdbin(path)
+        assert sut.data.dtype == np.float32
+        self.ref.write_uhbd(path)
+        sut.read_uhbd(path)
+        assert sut.data.dtype == np.float32
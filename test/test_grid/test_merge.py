@@ -0,0 +1,177 @@
+from apbs.grid import (
+    Grid,
+    ParallelLayout,
+    merge_dx,
+    merge_dx_to_file,
+    merge_grids,
+)
+from apbs.grid.merge import check_blocks, iter_pe_grids, pe_path
+import numpy as np
+import pytest
+from . import lattice_grid
+
+INPUT = """read
+    mol pqr mol.pqr
+end
+elec name para
+    mg-para
+    pdime 3 2 1
+    ofrac 0.1
+    dime 13 13 7
+    fglen 16.5 10.5 12.0
+    cglen 40.0 40.0 40.0
+end
+quit
+"""
+
+
+@pytest.fixture
+def layout():
+    return ParallelLayout((3, 2, 1), (13, 13, 7), 0.1, (16.5, 10.5, 12.0))
+
+
+def make_global(layout):
+    rng = np.random.default_rng(3)
+    return lattice_grid(
+        rng.uniform(-1.0, 1.0, layout.dims), layout.spaces, (-5.0, 1.0, 2.5)
+    )
+
+
+def split(grid, layout):
+    """Cut the global grid into the overlap-trimmed map of every rank"""
+    _, spaces, mins, _ = grid.lattice()
+    blocks = []
+    for rank in range(layout.size):
+        index = layout.place(rank, layout.block_dims)
+        first = np.array([s.start for s in index])
+        data = grid.data[index].copy()
+        blocks.append(lattice_grid(data, spaces, mins + spaces * first))
+    return blocks
+
+
+@pytest.fixture
+def run(tmp_path, layout):
+    """Write an input file and per-processor maps of a fake mg-para run"""
+    inputpath = tmp_path / "apbs.in"
+    inputpath.write_text(INPUT)
+    root = str(tmp_path / "pot-PE")
+    grid = make_global(layout)
+    for rank, block in enumerate(split(grid, layout)):
+        block.write_dx(pe_path(root, rank))
+    return str(inputpath), root, grid
+
+
+class TestParallelLayout:
+    def test_from_input(self, tmp_path, layout):
+        path = tmp_path / "apbs.in"
+        path.write_text(INPUT)
+        sut = ParallelLayout.from_input(str(path))
+        assert sut.size == 6
+        assert sut.block_dims.tolist() == [11, 11, 7]
+        assert sut.dims.tolist() == [33, 22, 7]
+        assert sut.spaces == pytest.approx([0.515625, 0.5, 2.0])
+        assert sut.ofrac.tolist() == [0.1, 0.1, 0.0]
+
+    def test_missing_keyword(self, tmp_path):
+        path = tmp_path / "apbs.in"
+        path.write_text(INPUT.replace("ofrac", "# ofrac"))
+        with pytest.raises(ValueError):
+            ParallelLayout.from_input(str(path))
+
+    def test_place(self, layout):
+        assert layout.position(4).tolist() == [1, 1, 0]
+        assert layout.place(4, (11, 11, 7)) == (
+            slice(11, 22),
+            slice(11, 22),
+            slice(0, 7),
+        )
+        with pytest.raises(ValueError):
+            layout.place(5, (10, 11, 7))
+
+
+class TestMerge:
+    def test_merge_grids(self, layout):
+        grid = make_global(layout)
+        merged = merge_grids(split(grid, layout), layout)
+        assert np.array_equal(merged.data, grid.data)
+        assert merged.lattice()[1] == pytest.approx(layout.spaces)
+        assert merged.lattice()[2] == pytest.approx([-5.0, 1.0, 2.5])
+
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_merge_dx(self, run, workers):
+        inputpath, root, grid = run
+        merged = merge_dx(inputpath, root, workers)
+        assert merged.data == pytest.approx(grid.data, rel=1e-6)
+        assert merged.lattice()[2] == pytest.approx([-5.0, 1.0, 2.5])
+
+    def test_iter_pe_grids(self, run, layout):
+        _, root, _ = run
+        ranks = [rank for rank, _ in iter_pe_grids(root, layout.size, 2)]
+        assert sorted(ranks) == list(range(layout.size))
+
+    def test_missing_block(self, layout):
+        blocks = split(make_global(layout), layout)
+        with pytest.raises(ValueError):
+            merge_grids(blocks[:-1], layout)
+
+    def test_uncovered(self, layout):
+        blocks = split(make_global(layout), layout)
+        blocks[1].data = blocks[1].data[:, :-1, :]
+        with pytest.raises(ValueError, match="unaccessed"):
+            merge_grids(blocks, layout)
+
+    def test_overlap(self, layout):
+        blocks = split(make_global(layout), layout)
+        blocks[0].data = np.pad(blocks[0].data, ((0, 1), (0, 0), (0, 0)))
+        with pytest.raises(ValueError, match="Multiple"):
+            merge_grids(blocks, layout)
+
+
+class TestMergeToFile:
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_dxbin(self, tmp_path, run, workers):
+        inputpath, root, grid = run
+        out = str(tmp_path / "merged.dxbin")
+        merge_dx_to_file(inputpath, root, out, "merged", workers)
+        merged = Grid()
+        merged.read_dxbin(out)
+        assert merged.data == pytest.approx(grid.data, rel=1e-6)
+        assert merged.lattice()[2] == pytest.approx([-5.0, 1.0, 2.5])
+
+    @pytest.mark.parametrize("name", ["merged.dx", "merged.dx.gz"])
+    def test_matches_in_memory_merge(self, tmp_path, run, name):
+        inputpath, root, _ = run
+        out = tmp_path / name
+        merge_dx_to_file(inputpath, root, str(out), "merged")
+        reference = tmp_path / "reference.dx"
+        merge_dx(inputpath, root).write_dx(str(reference), "merged")
+        got = Grid()
+        if name.endswith(".gz"):
+            got.read_gz(str(out))
+        else:
+            assert out.read_text() == reference.read_text()
+            got.read_dx(str(out))
+        assert got.data == pytest.approx(merge_dx(inputpath, root).data)
+        # The temporary DXBIN file is removed
+        assert not list(tmp_path.glob("*.dxbin"))
+
+    def test_check_blocks(self, layout):
+        shapes = [tuple(layout.block_dims)] * layout.size
+        assert len(check_blocks(layout, shapes)) == 6
+        shapes[0] = (12, 11, 7)
+        with pytest.raises(ValueError, match="Multiple"):
+            check_blocks(layout, shapes)
+        shapes[0] = (11, 10, 7)
+        with pytest.raises(ValueError, match="unaccessed"):
+            check_blocks(layout, shapes)
+
+    def test_bad_layout_writes_nothing(self, tmp_path, run):
+        inputpath, root, _ = run
+        grid = Grid()
+        grid.read_dx(pe_path(root, 2))
+        grid = lattice_grid(grid.data[:, 1:, :], grid.spaces, grid.mins)
+        grid.write_dx(pe_path(root, 2))
+        out = tmp_path / "merged.dx"
+        with pytest.raises(ValueError, match="unaccessed"):
+            merge_dx_to_file(inputpath, root, str(out))
+        assert not out.exists()
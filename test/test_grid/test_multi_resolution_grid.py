@@ -0,0 +1,75 @@
+from apbs.geometry import Coordinate
+from apbs.grid import CurvatureFlag, MultiResolutionGrid
+import numpy as np
+import pytest
+from . import lattice_grid
+
+
+def make_grid(center, spacing, npoints, offset):
+    """Grid of u = x + 2y - 3z + offset centered at center"""
+    mins = [c - spacing * (npoints - 1) / 2 for c in center]
+    return lattice_grid(
+        lambda x, y, z: x + 2.0 * y - 3.0 * z + offset,
+        [spacing] * 3,
+        mins,
+        [npoints] * 3,
+    )
+
+
+@pytest.fixture
+def hierarchy():
+    coarse = make_grid((0.0, 0.0, 0.0), 2.0, 11, 100.0)
+    medium = make_grid((1.0, 1.0, 1.0), 1.0, 9, 10.0)
+    fine = make_grid((1.0, 1.0, 1.0), 0.25, 9, 0.0)
+    # Added out of order on purpose
+    return MultiResolutionGrid([coarse, fine, medium])
+
+
+def linear(points):
+    return points[:, 0] + 2.0 * points[:, 1] - 3.0 * points[:, 2]
+
+
+class TestMultiResolutionGrid:
+    def test_sorted_finest_first(self, hierarchy):
+        spacings = [grid.spaces.x for grid in hierarchy.grids]
+        assert spacings == [0.25, 1.0, 2.0]
+
+    def test_levels(self, hierarchy):
+        points = np.array(
+            [[1.0, 1.0, 1.0], [4.0, 1.0, 1.0], [-9.0, 0.0, 0.0], [20, 0, 0]]
+        )
+        assert hierarchy.levels(points).tolist() == [0, 1, 2, -1]
+
+    def test_values(self, hierarchy):
+        points = np.array(
+            [[1.2, 0.7, 1.4], [4.5, 1.0, -2.0], [-9.0, 0.0, 8.0], [20, 0, 0]]
+        )
+        values, off_grid = hierarchy.values(points)
+        assert off_grid.tolist() == [False, False, False, True]
+        offsets = np.array([0.0, 10.0, 100.0, 0.0])
+        expect = linear(points) + offsets
+        expect[3] = 0.0
+        assert values == pytest.approx(expect)
+        assert hierarchy.value(Coordinate(1.2, 0.7, 1.4)) == pytest.approx(
+            expect[0], abs=1e-5
+        )
+        with pytest.raises(RuntimeError):
+            hierarchy.value(Coordinate(20.0, 0.0, 0.0))
+
+    def test_gradient_falls_through(self, hierarchy):
+        # On the fine grid edge the centered stencil still works one-sided,
+        # but a point outside every box is reported off grid
+        points = np.array([[2.0, 1.0, 1.0], [50.0, 0.0, 0.0]])
+        grad, off_grid = hierarchy.gradient(points)
+        assert off_grid.tolist() == [False, True]
+        assert grad[0] == pytest.approx([1.0, 2.0, -3.0])
+
+    def test_curvature_falls_through(self, hierarchy):
+        # The fine grid cannot center a stencil on its edge, so the medium
+        # grid answers instead
+        points = np.array([[2.0, 1.0, 1.0]])
+        curv, off_grid = hierarchy.curvature(
+            points, CurvatureFlag.MeanCurvature
+        )
+        assert not off_grid.any()
+        assert curv == pytest.approx([0.0], abs=1e-9)
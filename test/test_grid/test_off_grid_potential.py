@@ -0,0 +1,185 @@
+from apbs.chemistry import Atom, AtomList
+from apbs.geometry import Coordinate
+from apbs.grid import (
+    BoundaryFlag,
+    CurvatureFlag,
+    MultiResolutionGrid,
+    OffGridPotential,
+)
+from apbs.grid.off_grid_potential import UNIT_EC, UNIT_EPS0, UNIT_KB
+import numpy as np
+import pytest
+from . import lattice_grid
+
+TEMPERATURE = 300.0
+DIELECTRIC = 78.0
+KAPPA = 0.1
+
+
+def make_grid():
+    """Grid of u = x + 2y - 3z over [-2, 2]^3"""
+    return lattice_grid(
+        lambda x, y, z: x + 2.0 * y - 3.0 * z,
+        [0.5, 0.5, 0.5],
+        [-2.0, -2.0, -2.0],
+        [9, 9, 9],
+    )
+
+
+@pytest.fixture
+def atoms():
+    return AtomList(
+        [
+            Atom(
+                id=idx,
+                field_name="ATOM",
+                x=x,
+                y=y,
+                z=z,
+                charge=charge,
+                radius=radius,
+            )
+            for idx, (x, y, z, charge, radius) in enumerate(
+                [
+                    (-1.0, 0.0, 0.0, 1.0, 1.5),
+                    (1.0, 0.5, 0.0, -0.5, 2.0),
+                    (0.0, 0.0, 1.0, 0.25, 1.0),
+                ]
+            )
+        ]
+    )
+
+
+def vopot_pot(atoms, pt, bcfl, kappa=KAPPA):
+    """Scalar transcription of the off-grid branch of Vopot_pot"""
+    xkappa = 1.0e10 * kappa
+    if bcfl == BoundaryFlag.SingleDebyeHuckel:
+        center = np.array([atoms.center.x, atoms.center.y, atoms.center.z])
+        radius = 0.0
+        for atom in atoms:
+            pos = np.array([atom.x, atom.y, atom.z])
+            radius = max(radius, np.linalg.norm(pos - center) + atom.radius)
+        charge = sum(atom.charge for atom in atoms)
+        sources = [(center, charge, radius)]
+    else:
+        sources = [
+            (np.array([atom.x, atom.y, atom.z]), atom.charge, atom.radius)
+            for atom in atoms
+        ]
+    u = 0.0
+    for position, charge, radius in sources:
+        size = 1.0e-10 * radius
+        dist = 1.0e-10 * np.linalg.norm(position - pt)
+        val = UNIT_EC * charge / (4 * np.pi * UNIT_EPS0 * DIELECTRIC * dist)
+        if xkappa != 0.0:
+            val *= np.exp(-xkappa * (dist - size)) / (1 + xkappa * size)
+        u += val * UNIT_EC / (UNIT_KB * TEMPERATURE)
+    return u
+
+
+def make_potential(grid, atoms, bcfl=BoundaryFlag.MultipleDebyeHuckel):
+    return OffGridPotential(
+        grid,
+        atoms,
+        bcfl=bcfl,
+        dielectric=DIELECTRIC,
+        kappa=KAPPA,
+        temperature=TEMPERATURE,
+    )
+
+
+OFF_GRID = np.array(
+    [[5.0, 0.0, 0.0], [-3.0, 4.0, 1.0], [0.0, 0.0, -12.5], [2.5, 2.5, 2.5]]
+)
+
+
+class TestOffGridPotential:
+    def test_on_grid_interpolates(self, atoms):
+        potential = make_potential(make_grid(), atoms)
+        points = np.array([[0.1, -0.3, 0.7], [1.9, 1.2, -2.0]])
+        expected = points[:, 0] + 2.0 * points[:, 1] - 3.0 * points[:, 2]
+        assert potential.values(points) == pytest.approx(expected)
+        assert potential.value(Coordinate(0.0, 0.0, 0.0)) == pytest.approx(
+            0.0, abs=1e-6
+        )
+
+    @pytest.mark.parametrize(
+        "bcfl",
+        [BoundaryFlag.SingleDebyeHuckel, BoundaryFlag.MultipleDebyeHuckel],
+    )
+    def test_debye_huckel_matches_vopot(self, atoms, bcfl):
+        potential = make_potential(make_grid(), atoms, bcfl)
+        expected = [vopot_pot(atoms, pt, bcfl) for pt in OFF_GRID]
+        assert potential.values(OFF_GRID) == pytest.approx(expected)
+
+    def test_unscreened(self, atoms):
+        potential = make_potential(make_grid(), atoms)
+        potential.kappa = 0.0
+        expected = [
+            vopot_pot(atoms, pt, BoundaryFlag.MultipleDebyeHuckel, 0.0)
+            for pt in OFF_GRID
+        ]
+        assert potential.values(OFF_GRID) == pytest.approx(expected)
+
+    def test_zero(self, atoms):
+        potential = make_potential(make_grid(), atoms, BoundaryFlag.Zero)
+        assert potential.values(OFF_GRID) == pytest.approx(0.0)
+        assert potential.gradient(OFF_GRID) == pytest.approx(0.0)
+
+    def test_blocked_evaluation(self, atoms, monkeypatch):
+        from apbs.grid import off_grid_potential
+
+        potential = make_potential(make_grid(), atoms)
+        expected = potential.values(OFF_GRID)
+        monkeypatch.setattr(off_grid_potential, "PAIR_BLOCK", 4)
+        assert potential.values(OFF_GRID) == pytest.approx(expected)
+
+    def test_gradient(self, atoms):
+        potential = make_potential(make_grid(), atoms)
+        grad = potential.gradient(OFF_GRID)
+        h = 1e-5
+        for axis in range(3):
+            step = np.zeros(3)
+            step[axis] = h
+            fd = (
+                potential.values(OFF_GRID + step)
+                - potential.values(OFF_GRID - step)
+            ) / (2 * h)
+            assert grad[:, axis] == pytest.approx(fd, rel=1e-5)
+        inside = np.array([[0.1, -0.3, 0.7]])
+        assert potential.gradient(inside)[0] == pytest.approx([1, 2, -3])
+
+    def test_curvature(self, atoms):
+        potential = make_potential(make_grid(), atoms)
+        curv, off_grid = potential.curvature(
+            OFF_GRID, CurvatureFlag.MeanCurvature
+        )
+        assert not off_grid.any()
+        h = 1e-3
+        laplacian = -6 * potential.values(OFF_GRID)
+        for axis in range(3):
+            step = np.zeros(3)
+            step[axis] = h
+            laplacian += potential.values(OFF_GRID + step)
+            laplacian += potential.values(OFF_GRID - step)
+        assert curv == pytest.approx(laplacian / h ** 2, rel=1e-4)
+
+        _, off_grid = potential.curvature(
+            OFF_GRID, CurvatureFlag.GaussCurvature
+        )
+        assert off_grid.all()
+
+    def test_multi_resolution_grid(self, atoms):
+        potential = make_potential(MultiResolutionGrid([make_grid()]), atoms)
+        points = np.vstack([OFF_GRID, [[0.5, 0.5, 0.5]]])
+        vals = potential.values(points)
+        expected = [
+            vopot_pot(atoms, pt, BoundaryFlag.MultipleDebyeHuckel)
+            for pt in OFF_GRID
+        ]
+        assert vals[:-1] == pytest.approx(expected)
+        assert vals[-1] == pytest.approx(-0.0, abs=1e-9)
+
+    def test_invalid_flag(self, atoms):
+        with pytest.raises(ValueError):
+            make_potential(make_grid(), atoms, bcfl=4)
@@ -0,0 +1,186 @@
+from apbs.grid import Grid, GridStats, load_stats
+from apbs.grid.sidecar import sidecar_path
+import numpy as np
+import pytest
+from . import lattice_grid
+
+
+@pytest.fixture
+def grid():
+    rng = np.random.default_rng(7)
+    data = rng.normal(0.0, 1.0, (12, 6, 5))
+    data[3] += 10.0
+    return lattice_grid(data, (0.5, 1.0, 0.25), (1.0, 2.0, 3.0))
+
+
+class TestGridStats:
+    def test_statistics(self, grid):
+        sut = GridStats.from_data(
+            grid.data, (0.5, 1.0, 0.25), (1.0, 2.0, 3.0), slab_bytes=1
+        )
+        data = grid.data
+        assert sut.min == data.min()
+        assert sut.max == data.max()
+        assert sut.mean == pytest.approx(data.mean())
+        assert sut.integral == pytest.approx(grid.integrate())
+        assert sut.norm_l1 == pytest.approx(grid.norml1())
+        assert sut.norm_l2 == pytest.approx(grid.norml2())
+        assert sut.norm_linf == pytest.approx(grid.norml_inf())
+        counts, edges = sut.histogram()
+        assert counts.sum() == data.size
+        assert np.array_equal(counts, np.histogram(data, edges)[0])
+
+    def test_planes(self, grid):
+        sut = grid.stats()
+        assert sut.planes(lower=5.0).tolist() == [3]
+        assert 3 not in sut.planes(upper=5.0)
+        assert len(sut.planes()) == 12
+        assert sut.value_range(3, 4) == (
+            grid.data[3].min(),
+            grid.data[3].max(),
+        )
+
+    def test_cached(self, grid):
+        assert grid.stats() is grid.stats()
+        grid.data = grid.data * 2.0
+        assert grid.stats().max == grid.data.max()
+
+
+class TestSidecar:
+    @pytest.mark.parametrize(
+        "name, write, read",
+        [
+            ("pot.dx", "write_dx", "read_dx"),
+            ("pot.dx.gz", "write_gz", "read_gz"),
+            ("pot.dxbin", "write_dxbin", "read_dxbin"),
+        ],
+    )
+    def test_written_with_grid(self, tmp_path, grid, name, write, read):
+        path = str(tmp_path / name)
+        getattr(grid, write)(path, sidecar=True)
+        stats = load_stats(path)
+        assert stats is not None
+        assert stats.integral == pytest.approx(grid.integrate())
+        assert np.array_equal(stats.hist_counts, grid.stats().hist_counts)
+
+        sut = Grid()
+        getattr(sut, read)(path, sidecar=True)
+        assert sut._dp["stats"].max == pytest.approx(grid.data.max())
+
+    def test_first_read_writes_sidecar(self, tmp_path, grid):
+        path = str(tmp_path / "pot.dx")
+        grid.write_dx(path)
+        assert load_stats(path) is None
+        sut = Grid()
+        sut.read_dx(path, sidecar=True)
+        stats = load_stats(path)
+        assert stats.sum == pytest.approx(sut.data.sum())
+
+    def test_stale_sidecar(self, tmp_path, grid):
+        path = str(tmp_path / "pot.dx")
+        grid.write_dx(path, sidecar=True)
+        grid.data = grid.data + 1.0
+        grid.write_dx(path, "changed")
+        assert load_stats(path) is None
+        sut = Grid()
+        sut.read_dx(path, sidecar=True)
+        assert sut.stats().mean == pytest.approx(grid.data.mean(), rel=1e-5)
+        assert load_stats(path) is not None
+
+    def test_bad_version(self, tmp_path, grid):
+        path = str(tmp_path / "pot.dx")
+        grid.write_dx(path, sidecar=True)
+        side = tmp_path / "pot.dx.stats.json"
+        assert str(side) == sidecar_path(path)
+        side.write_text(side.read_text().replace('"version": 1', '"v": 0'))
+        assert load_stats(path) is None
+
+    @pytest.mark.parametrize(
+        "value,linf", [(np.nan, np.nan), (-np.inf, np.inf), (30.0, 30.0)]
+    )
+    def test_norms_agree(self, tmp_path, grid, value, linf):
+        """Norms are the same with and without cached statistics"""
+        grid.data[3, 2, 2] = value
+        norms = ("integrate", "norml1", "norml2", "norml_inf")
+        streamed = [getattr(grid, name)() for name in norms]
+        grid.stats()
+        cached = [getattr(grid, name)() for name in norms]
+        path = str(tmp_path / "pot.dx")
+        grid.write_dx(path, sidecar=True)
+        again = Grid()
+        again.read_dx(path, sidecar=True)
+        loaded = [getattr(again, name)() for name in norms]
+        np.testing.assert_allclose(cached, streamed)
+        np.testing.assert_allclose(loaded, streamed, rtol=1e-6)
+        np.testing.assert_equal(streamed[-1], linf)
+
+    def test_non_finite(self, tmp_path, grid):
+        grid.data[2, 1, 1] = np.nan
+        grid.data[5, 2, 3] = np.inf
+        grid.data[7] = np.nan
+        sut = grid.stats()
+        finite = grid.data[np.isfinite(grid.data)]
+        assert sut.min == finite.min()
+        assert sut.max == np.inf
+        assert sut.value_range(2, 3) == (
+            np.nanmin(grid.data[2]),
+            np.nanmax(grid.data[2]),
+        )
+        assert np.isnan(sut.value_range(7, 8)[0])
+        counts, edges = sut.histogram()
+        assert counts.sum() == finite.size
+        assert edges[0] <= finite.min() and edges[-1] > finite.max()
+        assert np.isnan(sut.norm_linf)
+
+        path = str(tmp_path / "pot.dx")
+        grid.write_dx(path, sidecar=True)
+        again = Grid()
+        again.read_dx(path, sidecar=True)
+        assert again.stats().hist_counts.sum() == finite.size
+
+    def test_single_pass(self, tmp_path, grid, monkeypatch):
+        walks = []
+        iter_slabs = Grid.iter_slabs
+
+        def counted(self, *args, **kwargs):
+            walks.append(self)
+            return iter_slabs(self, *args, **kwargs)
+
+        monkeypatch.setattr(Grid, "iter_slabs", counted)
+        path = str(tmp_path / "pot.dx")
+        grid.write_dx(path, sidecar=True)
+        assert len(walks) == 1
+
+        # The first read with a sidecar gathers the stats while parsing
+        load_stats(path)
+        (tmp_path / "pot.dx.stats.json").unlink()
+        sut = Grid()
+        sut.read_dx(path, sidecar=True)
+        assert len(walks) == 1
+        assert load_stats(path) is not None
+
+        # Integrals and norms come from the loaded sidecar
+        expect = sut.reduce()
+        walks.clear()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("rescanned the data")
+
+        monkeypatch.setattr(Grid, "reduce", fail)
+        again = Grid()
+        again.read_dx(path, sidecar=True)
+        assert again.integrate() == pytest.approx(expect.integral)
+        assert again.norml1() == pytest.approx(expect.norm_l1)
+        assert again.norml2() == pytest.approx(expect.norm_l2)
+        assert again.norml_inf() == pytest.approx(expect.norm_linf)
+        assert not walks
+
+    def test_histogram_grows(self):
+        rng = np.random.default_rng(3)
+        data = rng.normal(0.0, 1.0, (40, 4, 3))
+        data *= np.linspace(0.01, 100.0, 40)[:, None, None]
+        data[0] = 5.0
+        sut = GridStats.from_data(data, (1, 1, 1), (0, 0, 0), slab_bytes=1)
+        counts, edges = sut.histogram()
+        assert np.array_equal(counts, np.histogram(data, edges)[0])
+        assert edges[-1] - edges[0] < 4.0 * np.ptp(data)
@@ -0,0 +1,108 @@
+from apbs.grid import SimilarityReducer, compare
+import numpy as np
+import pytest
+from . import lattice_grid
+
+
+def make_grid(data, spaces=(0.5, 1.0, 2.0)):
+    return lattice_grid(data, spaces, (0.0, 0.0, 0.0))
+
+
+@pytest.fixture
+def fields():
+    rng = np.random.default_rng(11)
+    u1 = rng.uniform(-1.0, 1.0, (9, 7, 5))
+    u2 = 0.5 * u1 + rng.uniform(-0.1, 0.1, u1.shape) + 0.2
+    return u1, u2
+
+
+class TestSimilarity:
+    def test_metrics(self, fields):
+        u1, u2 = fields
+        sut = compare(make_grid(u1), make_grid(u2))
+        dvol = 0.5 * 1.0 * 2.0
+        diff = u1 - u2
+        assert sut.diff_l2 == pytest.approx(np.sqrt((diff ** 2).sum() * dvol))
+        assert sut.diff_l1 == pytest.approx(np.abs(diff).sum() * dvol)
+        assert sut.diff_linf == pytest.approx(np.abs(diff).max())
+        assert sut.norm1_l2 == pytest.approx(np.sqrt((u1 ** 2).sum() * dvol))
+        ip = (u1 * u2).sum()
+        assert sut.inner_product == pytest.approx(ip * dvol)
+        assert sut.hodgkin == pytest.approx(
+            2 * ip / ((u1 ** 2).sum() + (u2 ** 2).sum())
+        )
+        assert sut.carbo == pytest.approx(
+            ip / np.sqrt((u1 ** 2).sum() * (u2 ** 2).sum())
+        )
+        assert sut.correlation == pytest.approx(
+            np.corrcoef(u1.ravel(), u2.ravel())[0, 1]
+        )
+
+    def test_identical(self, fields):
+        u1, _ = fields
+        sut = compare(make_grid(u1), make_grid(u1.copy()))
+        assert sut.diff_l2 == 0.0
+        assert sut.hodgkin == pytest.approx(1.0)
+        assert sut.carbo == pytest.approx(1.0)
+        assert sut.correlation == pytest.approx(1.0)
+
+    def test_slabs_match_single_pass(self, fields):
+        u1, u2 = fields
+        whole = SimilarityReducer((1.0, 1.0, 1.0))
+        whole.update(u1, u2)
+        sut = compare(
+            make_grid(u1, (1.0, 1.0, 1.0)),
+            make_grid(u2, (1.0, 1.0, 1.0)),
+            slab_bytes=4 * u1[0].nbytes,
+        )
+        for name in ("diff_l2", "diff_linf", "hodgkin", "correlation"):
+            assert getattr(sut, name) == pytest.approx(getattr(whole, name))
+
+    def test_nan(self, fields):
+        u1, u2 = fields
+        u1[0, 0, 0] = 50.0
+        u2[0, 1, 1] = np.nan
+        sut = compare(
+            make_grid(u1), make_grid(u2), slab_bytes=4 * u1[0].nbytes
+        )
+        assert np.isnan(sut.diff_linf)
+        assert np.isnan(sut.diff_l2)
+
+    def test_mask(self, fields):
+        u1, u2 = fields
+        mask = np.zeros(u1.shape, dtype=bool)
+        mask[2:6, 1:4] = True
+        sut = compare(make_grid(u1), make_grid(u2), mask, mask)
+        region = compare(
+            make_grid(u1[2:6, 1:4].copy()), make_grid(u2[2:6, 1:4].copy())
+        )
+        assert sut.diff_l2 == pytest.approx(region.diff_l2)
+        assert sut.carbo == pytest.approx(region.carbo)
+        assert sut.correlation == pytest.approx(region.correlation)
+        assert sut.count == mask.sum()
+
+    def test_region_views(self, fields):
+        u1, u2 = fields
+        g1, g2 = make_grid(u1), make_grid(u2)
+        lower, upper = (1.0, 1.0, 2.0), (3.0, 5.0, 6.0)
+        sut = compare(g1.box(lower, upper), g2.box(lower, upper))
+        diff = u1[2:7, 1:6, 1:4] - u2[2:7, 1:6, 1:4]
+        assert sut.diff_linf == pytest.approx(np.abs(diff).max())
+
+    def test_files(self, tmp_path, fields):
+        u1, u2 = fields
+        path1 = str(tmp_path / "u1.dx")
+        path2 = str(tmp_path / "u2.dxbin")
+        mask = str(tmp_path / "mask.dx")
+        make_grid(u1).write_dx(path1)
+        make_grid(u2).write_dxbin(path2)
+        make_grid(np.ones(u1.shape)).write_dx(mask)
+        sut = compare(path1, path2, mask, slab_bytes=u1[0].nbytes)
+        reference = compare(make_grid(u1), make_grid(u2))
+        assert sut.diff_l2 == pytest.approx(reference.diff_l2, rel=1e-5)
+        assert sut.carbo == pytest.approx(reference.carbo, rel=1e-5)
+
+    def test_dimension_mismatch(self, fields):
+        u1, u2 = fields
+        with pytest.raises(ValueError):
+            compare(make_grid(u1), make_grid(u2[:-1].copy()))
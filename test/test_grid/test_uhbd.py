@@ -0,0 +1,119 @@
+from apbs.grid import Grid
+import numpy as np
+import pytest
+from . import lattice_grid
+
+
+def reference_uhbd(grid, title):
+    """Text of Vgrid_writeUHBD, one value at a time"""
+    nx, ny, nz = grid.data.shape
+    h = grid.spaces.x
+    xmin, ymin, zmin = grid.mins.x, grid.mins.y, grid.mins.z
+    text = "%72s\n" % title
+    text += "%12.5e%12.5e%7d%7d%7d%7d%7d\n" % (1.0, 0.0, -1, 0, nz, 1, nz)
+    text += "%7d%7d%7d%12.5e%12.5e%12.5e%12.5e\n" % (
+        nx, ny, nz, h, xmin - h, ymin - h, zmin - h
+    )
+    text += "%12.5e%12.5e%12.5e%12.5e\n" % (0.0, 0.0, 0.0, 0.0)
+    text += "%12.5e%12.5e%7d%7d" % (0.0, 0.0, 0, 0)
+    icol = 0
+    for k in range(nz):
+        text += "\n%7d%7d%7d\n" % (k + 1, nx, ny)
+        icol = 0
+        for j in range(ny):
+            for i in range(nx):
+                icol += 1
+                text += " %12.5e" % grid.data[i, j, k]
+                if icol == 6:
+                    icol = 0
+                    text += "\n"
+    if icol != 0:
+        text += "\n"
+    return text
+
+
+@pytest.fixture(params=[(5, 4, 3), (4, 3, 2)])
+def grid(request):
+    rng = np.random.default_rng(5)
+    data = rng.standard_normal(request.param) * 10.0 ** rng.integers(
+        -5, 5, request.param
+    )
+    data[0, 0, 0] = 0.0
+    return lattice_grid(data, (0.5, 0.5, 0.5), (-1.0, 2.0, -3.25))
+
+
+class TestUHBD:
+    def test_matches_vgrid(self, tmp_path, grid):
+        path = tmp_path / "pot.grd"
+        grid.write_uhbd(str(path), "potential")
+        assert path.read_text() == reference_uhbd(grid, "potential")
+
+    def test_round_trip(self, tmp_path, grid):
+        path = str(tmp_path / "pot.grd")
+        grid.write_uhbd(path, "potential")
+        sut = Grid()
+        sut.read_uhbd(path)
+        assert sut.data.shape == grid.data.shape
+        assert sut.data == pytest.approx(grid.data, rel=1e-5)
+        assert sut.lattice()[1] == pytest.approx([0.5, 0.5, 0.5])
+        assert sut.lattice()[2] == pytest.approx([-1.0, 2.0, -3.25])
+
+    def test_binary_round_trip(self, tmp_path, grid):
+        path = str(tmp_path / "pot.bin")
+        grid.write_uhbdbin(path, "potential")
+        sut = Grid()
+        sut.read_uhbdbin(path)
+        assert sut.data == pytest.approx(grid.data, rel=1e-6)
+        assert sut.lattice()[2] == pytest.approx([-1.0, 2.0, -3.25])
+        # Header record plus two records per plane
+        nx, ny, nz = grid.data.shape
+        size = (160 + 8) + nz * ((12 + 8) + (4 * nx * ny + 8))
+        assert (tmp_path / "pot.bin").stat().st_size == size
+
+    def test_big_endian(self, tmp_path, grid):
+        path = tmp_path / "pot.bin"
+        grid.write_uhbdbin(str(path))
+        raw = np.frombuffer(path.read_bytes(), dtype=np.uint8).copy()
+        # Every field of the records is 4 bytes wide, except the title
+        words = np.concatenate([raw[:4], raw[76:]]).view("<u4")
+        swapped = words.byteswap().view(np.uint8)
+        path.write_bytes(
+            swapped[:4].tobytes() + raw[4:76].tobytes()
+            + swapped[4:].tobytes()
+        )
+        sut = Grid()
+        sut.read_uhbdbin(str(path))
+        assert sut.data == pytest.approx(grid.data, rel=1e-6)
+
+    def test_asc2bin_layout(self, tmp_path, grid):
+        """Unframed doubles, as written by tools/mesh/uhbd_asc2bin.c"""
+        nx, ny, nz = grid.data.shape
+        h = 0.5
+        ints = np.array([-1, 0, nz, 1, nz, nx, ny, nz], dtype="<i4")
+        text = ("%72s" % "potential").encode()
+        text += np.array([1.0, 0.0], "<f8").tobytes() + ints.tobytes()
+        text += np.array(
+            [h, -1.0 - h, 2.0 - h, -3.25 - h] + [0.0] * 6, "<f8"
+        ).tobytes()
+        text += np.zeros(2, "<i4").tobytes()
+        for k in range(nz):
+            text += np.array([k + 1, nx, ny], "<i4").tobytes()
+            text += grid.data[:, :, k].T.astype("<f8").tobytes()
+        path = tmp_path / "pot.bin"
+        path.write_bytes(text)
+        sut = Grid()
+        sut.read_uhbdbin(str(path))
+        assert np.array_equal(sut.data, grid.data)
+        assert sut.lattice()[2] == pytest.approx([-1.0, 2.0, -3.25])
+
+    def test_requires_uniform_spacing(self, tmp_path, grid):
+        grid = lattice_grid(grid.data, (0.5, 0.5, 1.0), (0, 0, 0))
+        with pytest.raises(ValueError):
+            grid.write_uhbd(str(tmp_path / "pot.grd"))
+
+    def test_truncated(self, tmp_path, grid):
+        path = tmp_path / "pot.bin"
+        grid.write_uhbdbin(str(path))
+        path.write_bytes(path.read_bytes()[:-10])
+        with pytest.raises(ValueError):
+            Grid().read_uhbdbin(str(path))
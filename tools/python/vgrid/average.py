@@ -1,11 +1,5 @@
-from .vgrid import (
-    startVio,
-    Vgrid_ctor,
-    Vgrid_readDX,
-    Vgrid_value,
-)
+from apbs.grid import Grid
 import sys
-import math
 from sys import stdout, stderr
 
 """
@@ -27,8 +21,6 @@ def main():
 
     # *************** CHECK INVOCATION *******************
 
-    startVio()
-
     if len(sys.argv) != 2:
         stderr.write(
             "\n*** Syntax error: got %d arguments, expected 2.\n\n"
@@ -43,21 +35,14 @@ def main():
     # *************** APBS INITIALIZATION *******************
 
     stdout.write(header)
-    data = []
 
     stdout.write("main:  Reading data from %s... \n" % inpath)
-    grid = Vgrid_ctor(0, 0, 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, data)
-    Vgrid_readDX(grid, "FILE", "ASC", "", inpath)
-
-    nx = grid.nx
-    ny = grid.ny
-    nz = grid.nz
-    hx = grid.hx
-    hy = grid.hy
-    hzed = grid.hzed
-    xmin = grid.xmin
-    ymin = grid.ymin
-    zmin = grid.zmin
+    grid = Grid()
+    grid.read_dx(inpath)
+
+    nx, ny, nz = grid.dims.x, grid.dims.y, grid.dims.z
+    hx, hy, hzed = grid.spaces.x, grid.spaces.y, grid.spaces.z
+    xmin, ymin, zmin = grid.mins.x, grid.mins.y, grid.mins.z
 
     stdout.write("#     nx = %d, ny = %d, nz = %d\n" % (nx, ny, nz))
     stdout.write("#     hx = %g, hy = %g, hz = %g\n" % (hx, hy, hzed))
@@ -75,43 +60,21 @@ def main():
 
     # *************** AVERAGE **********************
 
-    xminAVG = xcentAVG - 0.5 * xlenAVG
-    xmaxAVG = xcentAVG + 0.5 * xlenAVG
-    yminAVG = ycentAVG - 0.5 * ylenAVG
-    ymaxAVG = ycentAVG + 0.5 * ylenAVG
-    zminAVG = zcentAVG - 0.5 * zlenAVG
-    zmaxAVG = zcentAVG + 0.5 * zlenAVG
-    imin = int(math.floor((xminAVG - xmin) / hx))
-    imin = max(imin, 0)
-    jmin = int(math.floor((yminAVG - ymin) / hy))
-    jmin = max(jmin, 0)
-    kmin = int(math.floor((zminAVG - zmin) / hzed))
-    kmin = max(kmin, 0)
-    imax = int(math.ceil((xmaxAVG - xmin) / hx))
-    imax = min(imax, nx - 1)
-    jmax = int(math.ceil((ymaxAVG - ymin) / hy))
-    jmax = min(jmax, ny - 1)
-    kmax = int(math.ceil((zmaxAVG - zmin) / hzed))
-    kmax = min(kmax, nz - 1)
+    lower = (
+        xcentAVG - 0.5 * xlenAVG,
+        ycentAVG - 0.5 * ylenAVG,
+        zcentAVG - 0.5 * zlenAVG,
+    )
+    upper = (
+        xcentAVG + 0.5 * xlenAVG,
+        ycentAVG + 0.5 * ylenAVG,
+        zcentAVG + 0.5 * zlenAVG,
+    )
+    ypos, averages = grid.box(lower, upper).axis_mean(1)
 
     stdout.write("#  \tY POS\t\tAVERAGE\n")
-    for j in range(jmin, jmax):
-        avg = 0.0
-        navg = 0
-        for k in range(kmin, kmax):
-            for i in range(imin, imax):
-                pt = [i, j, k]
-                val = 0.0
-                ret, value = Vgrid_value(grid, pt, val)
-                if ret:
-                    avg = avg + value
-                    navg = navg + 1
-
-        if navg != 0:
-            avg = avg / navg
-            stdout.write("   \t%e\t\t%e\n" % ((hy * j + ymin), avg))
-        else:
-            stdout.write("   \t%e\t\t%s\n" % ((hy * j + ymin), "nan"))
+    for y, avg in zip(ypos, averages):
+        stdout.write("   \t%e\t\t%e\n" % (y, avg))
 
 
 if __name__ == "__main__":